@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# airtimer.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+
+import math
+import threading
+import time
+
+
+class AirTimer:
+    """
+    On-air timer based on the monotonic clock
+
+    The elapsed time is derived from the start timestamp plus the time accumulated in earlier runs,
+    so a stalled event loop delays the display but never loses seconds.
+    """
+
+    def __init__(self, clock=time.monotonic, wallClock=time.time):
+        self.clock = clock
+        self.wallClock = wallClock
+        # monotonic start of the current run, None if stopped
+        self.started = None
+        # the same as Unix time, for clients that count on their own, see published()
+        self.startedAt = None
+        # seconds from earlier runs since the last reset
+        self.accumulated = 0.0
+        # countdown length in seconds, 0 counts up
+        self.countdown = 0
+        # state() is also called from the HTTP server threads
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    def start(self):
+        with self.lock:
+            if self.started is None:
+                self.started = self.clock()
+                self.startedAt = self.wallClock()
+
+    def stop(self):
+        with self.lock:
+            if self.started is not None:
+                self.accumulated += self.clock() - self.started
+                self.started = None
+                self.startedAt = None
+
+    def reset(self):
+        with self.lock:
+            self.accumulated = 0.0
+            if self.started is not None:
+                self.started = self.clock()
+                self.startedAt = self.wallClock()
+
+    def set_countdown(self, seconds):
+        with self.lock:
+            self.countdown = max(0, seconds)
+            self.accumulated = 0.0
+            if self.started is not None:
+                self.started = self.clock()
+                self.startedAt = self.wallClock()
+
+    def snapshot(self):
+        # consistent (running, elapsed, countdown)
+        with self.lock:
+            started = self.started
+            elapsed = self.accumulated
+            countdown = self.countdown
+        if started is not None:
+            elapsed += self.clock() - started
+        return started is not None, elapsed, countdown
+
+    def elapsed(self):
+        return self.snapshot()[1]
+
+    def remaining(self):
+        running, elapsed, countdown = self.snapshot()
+        return self.remaining_of(elapsed, countdown)
+
+    @staticmethod
+    def remaining_of(elapsed, countdown):
+        if not countdown:
+            return None
+        return max(0.0, countdown - elapsed)
+
+    def expired(self):
+        running, elapsed, countdown = self.snapshot()
+        return bool(countdown) and elapsed >= countdown
+
+    def seconds(self):
+        running, elapsed, countdown = self.snapshot()
+        return self.seconds_of(elapsed, countdown)
+
+    @classmethod
+    def seconds_of(cls, elapsed, countdown):
+        # displayed value, elapsed seconds or remaining seconds on countdown
+        if countdown:
+            return math.ceil(cls.remaining_of(elapsed, countdown))
+        return int(elapsed)
+
+    def state(self):
+        # all values from one snapshot, the timer may be changed by the GUI thread meanwhile
+        running, elapsed, countdown = self.snapshot()
+        remaining = self.remaining_of(elapsed, countdown)
+        return {
+            "running": running,
+            "elapsed": round(elapsed, 3),
+            "countdown": countdown,
+            "remaining": None if remaining is None else round(remaining, 3),
+            "seconds": self.seconds_of(elapsed, countdown),
+        }
+
+    def published(self):
+        # only changes on start, stop, reset and countdown changes, clients derive the running seconds from it
+        with self.lock:
+            return {
+                "running": self.started is not None,
+                "elapsed": round(self.accumulated, 3),
+                "started": None if self.startedAt is None else round(self.startedAt, 3),
+                "countdown": self.countdown,
+            }
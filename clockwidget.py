@@ -77,6 +77,7 @@
 #
 #############################################################################
 
+import math
 import time as pytime
 
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -89,6 +90,12 @@ class ClockWidget(QtWidgets.QWidget):
     # digiHourColor = QtGui.QColor(255, 0, 0, 255)
     # digiSecondColor = QtGui.QColor(255, 0, 0, 255)
 
+    # decimal to segment conversion table
+    segments = [0b0111111, 0b0000110, 0b1011011, 0b1001111, 0b1100110, 0b1101101, 0b1111101, 0b0000111, 0b1111111,
+                0b1101111]
+    # dot positions per (digit, dotOffset, slant)
+    digitDotCache = {}
+
     def __init__(self, parent=None):
         super(ClockWidget, self).__init__(parent)
 
@@ -104,8 +111,6 @@ class ClockWidget(QtWidgets.QWidget):
 
         self.imagepath = ""
 
-        self.setLogo()
-
         self.timeZoneOffset = 0
         self.clockMode = 1
         self.isAmPm = False
@@ -113,18 +118,78 @@ class ClockWidget(QtWidgets.QWidget):
         self.staticColon = False
         self.counter = 0
 
+        # pre-rendered digits, colon and rings, see glyph()
+        self.glyphCache = {}
+        self.clockTransform = QtGui.QTransform()
+        # persistent layer with hour marks, logo and the seconds lit so far, see updateRingLayer()
+        self.ringLayer = None
+        self.ringLayerKey = None
+        self.ringLayerSeconds = 0
+        # cost of the last frame: number of draw operations and paint time in ms
+        self.paintOps = 0
+        self.paintTime = 0.0
+        # optional source of the displayed time, see setTimeSource()
+        self.timeSource = None
+        # time to display and the digital clock state last scheduled for repaint, see tick()
+        self.time = self.currentTime()
+        self.shownState = None
+        # cached analog clock face with all ticks, see updateFaceLayer()
+        self.faceLayer = None
+        self.faceLayerKey = None
+
+        # optional smooth second hand in analog mode
+        self.smoothSeconds = False
+        self.sweepFps = 10
+        self.sweepFpsEffective = self.sweepFps
+        self.sweepBudget = 10.0
+        self.sweepPaintTime = 0.0
+        # number of times the frame rate was halved because the paint time was over budget, and doubled again
+        self.sweepBudgetDrops = 0
+        self.sweepRecoveries = 0
+        # consecutive frames well under budget, see sweep()
+        self.sweepGoodFrames = 0
+        self.sweepTimer = QtCore.QTimer(self)
+        self.sweepTimer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.sweepTimer.timeout.connect(self.sweep)
+
+        self.setLogo()
+
+        # the local timer is re-armed for the next half second on every tick, see setExternalTick()
         self.timer = QtCore.QTimer(self)
-        self.timer.timeout.connect(self.update)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.timerTick)
+        self.externalTick = False
         self.resyncTime()
 
+    def setTimeSource(self, timeSource):
+        # any object with a qdatetime() method, e.g. an NTP corrected clock, instead of the system clock
+        self.timeSource = timeSource
+        self.tick()
+
+    def currentTime(self):
+        if self.timeSource is not None:
+            return self.timeSource.qdatetime().time()
+        return QtCore.QTime.currentTime()
+
     def resyncTime(self):
-        # sync local timer with system clock
-        while QtCore.QTime.currentTime().msec() > 5:
-            pytime.sleep(0.001)
-        self.timer.start(500)
+        # arm local timer for the next half second of the system clock
+        self.timer.start(500 - self.currentTime().msec() % 500)
+
+    def timerTick(self):
+        self.tick()
+        self.resyncTime()
+
+    def setExternalTick(self, external):
+        # tick() is driven by the owner's scheduler instead of the local timer
+        self.externalTick = external
+        if external:
+            self.timer.stop()
+        else:
+            self.resyncTime()
 
     def updateTime(self):
-        self.timeChanged.emit(QtCore.QTime.currentTime())
+        self.timeChanged.emit(self.currentTime())
 
     @QtCore.pyqtSlot(int)
     def getTimeZone(self):
@@ -150,9 +215,11 @@ class ClockWidget(QtWidgets.QWidget):
             self.clockMode = 1
         else:
             self.clockMode = 0
+        self.updateSweepTimer()
+        self.repaintAll()
 
     def resetClockMode(self):
-        self.clockMode = 1
+        self.setClockMode(1)
 
     def getClockMode(self):
         return self.clockMode
@@ -162,9 +229,11 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(bool)
     def setAmPm(self, mode):
         self.isAmPm = mode
+        self.repaintAll()
 
     def resetAmPm(self):
         self.isAmPm = False
+        self.repaintAll()
 
     def getAmPm(self):
         return self.isAmPm
@@ -174,9 +243,13 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(bool)
     def setShowSeconds(self, value):
         self.showSeconds = value
+        self.ringLayer = None
+        self.repaintAll()
 
     def resetShowSeconds(self):
         self.showSeconds = False
+        self.ringLayer = None
+        self.repaintAll()
 
     def getShowSeconds(self):
         return self.showSeconds
@@ -186,9 +259,11 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(bool)
     def setStaticColon(self, value):
         self.staticColon = value
+        self.repaintAll()
 
     def resetStaticColon(self):
         self.staticColon = False
+        self.repaintAll()
 
     def getStaticColon(self):
         return self.staticColon
@@ -198,9 +273,11 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(QtGui.QColor)
     def setDigiHourColor(self, color=QtGui.QColor(50, 50, 255, 255)):
         self.digiHourColor = color
+        self.invalidateCache()
 
     def resetDigiHourColor(self):
         self.digiHourColor = QtGui.QColor(50, 50, 255, 255)
+        self.invalidateCache()
 
     def getDigiHourColor(self):
         return self.digiHourColor
@@ -210,9 +287,11 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(QtGui.QColor)
     def setDigiSecondColor(self, color=QtGui.QColor(50, 50, 255, 255)):
         self.digiSecondColor = color
+        self.invalidateCache()
 
     def resetDigiSecondColor(self):
         self.digiSecondColor = QtGui.QColor(50, 50, 255, 255)
+        self.invalidateCache()
 
     def getDigiSecondColor(self):
         return self.digiSecondColor
@@ -222,32 +301,141 @@ class ClockWidget(QtWidgets.QWidget):
     @QtCore.pyqtSlot(QtGui.QColor)
     def setDigiDigitColor(self, color=QtGui.QColor(50, 50, 255, 255)):
         self.digiDigitColor = color
+        self.invalidateCache()
 
     def resetDigiDigitColor(self):
         self.digiDigitColor = QtGui.QColor(50, 50, 255, 255)
+        self.invalidateCache()
 
     def getDigiDigitColor(self):
         return self.digiDigitColor
 
     colorDigiDigit = QtCore.pyqtProperty(QtGui.QColor, getDigiDigitColor, setDigiDigitColor, resetDigiDigitColor)
 
-    def paintEvent(self, event):
+    def invalidateCache(self):
+        self.glyphCache.clear()
+        self.ringLayer = None
+        self.faceLayer = None
+        self.repaintAll()
+
+    def repaintAll(self):
+        # the next tick will not compare against the previous state
+        self.shownState = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self.invalidateCache()
+        super(ClockWidget, self).resizeEvent(event)
+
+    def tick(self):
+        # advance the displayed time and only repaint the parts of the digital clock that changed
+        self.time = self.currentTime()
+        if self.clockMode == 0:
+            self.update()
+            return
+
+        state = self.digitalState(self.time)
+        shownState = self.shownState
+        self.shownState = state
+        if shownState is None:
+            self.update()
+            return
+
+        self.clockTransform = self.clockGeometry()
+        region = QtGui.QRegion()
+        for name, value in state.items():
+            if shownState.get(name) == value:
+                continue
+            if name == "ring":
+                if value > shownState[name]:
+                    dots = range(shownState[name], value)
+                else:
+                    # minute rollover, the whole ring changes
+                    dots = range(60)
+                ringDots = self.ringDots(88, 60)
+                for dot in dots:
+                    region = region.united(self.dirtyRect(ringDots[dot:dot + 1], 1.6))
+            else:
+                region = region.united(self.dirtyRect(*self.glyphArea(name)))
+        if not region.isEmpty():
+            self.update(region)
+
+    def digitalState(self, time):
+        hour = time.hour()
+        if self.isAmPm and hour > 12:
+            hour -= 12
+        state = {"hour": hour, "minute": time.minute(),
+                 "colon": time.msec() < 500 or self.staticColon,
+                 "ring": time.second() + 1}
+        if self.showSeconds:
+            state["second"] = time.second()
+        return state
+
+    def glyphArea(self, name):
+        # dots covering every glyph that can be painted for this part of the digital clock
+        digitSpacing = 28
+        digitSpacingY = 45
+        secondsOffsetX = -3.5
+        eight = self.digitDots(8)
+        if name == "hour":
+            return [(x + digitSpacing * offset, y) for x, y in eight for offset in (-2, -1)], 1.6
+        if name == "minute":
+            return [(x + digitSpacing * offset, y) for x, y in eight for offset in (1, 2)], 1.6
+        if name == "second":
+            return [(x + digitSpacing * offset + secondsOffsetX, y + digitSpacingY)
+                    for x, y in self.digitDots(8, 3) for offset in (-0.3, 0.3)], 0.8
+        dotOffset = 4.5
+        dotSlant = dotOffset / 15
+        return [(dotSlant * 2 * currentRow, -(dotOffset * currentRow)) for currentRow in (+1.5, -1.2)], 1.6
+
+    def dirtyRect(self, dots, dotSize):
+        margin = dotSize + 1
+        left = min(x for x, y in dots) - margin
+        top = min(y for x, y in dots) - margin
+        right = max(x for x, y in dots) + margin
+        bottom = max(y for x, y in dots) + margin
+        rect = self.clockTransform.mapRect(QtCore.QRectF(left, top, right - left, bottom - top))
+        return QtGui.QRegion(rect.toAlignedRect().adjusted(-1, -1, 1, 1))
+
+    def clockGeometry(self):
+        # transformation from clock coordinates (-100..100) to widget coordinates
         side = min(self.width(), self.height())
-        self.time = QtCore.QTime.currentTime()
+        transform = QtGui.QTransform()
+        transform.translate(self.width() / 2, self.height() / 2)
+        transform.scale(side / 200.0, side / 200.0)
+        return transform
+
+    def paintEvent(self, event):
+        paintStart = pytime.perf_counter()
+        self.paintOps = 0
 
         painter = QtGui.QPainter(self)
         painter.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
-        painter.translate(self.width() / 2, self.height() / 2)
-        painter.scale(side / 200.0, side / 200.0)
+        self.clockTransform = self.clockGeometry()
+        painter.setTransform(self.clockTransform)
 
         if self.clockMode == 0:
             self.paintAnalog(painter)
         else:
             self.paintDigital(painter)
+        painter.end()
+        self.paintTime = (pytime.perf_counter() - paintStart) * 1000
 
     def paintAnalog(self, painter):
         time = self.time
         # analog clock mode
+        # ticks come from the cached face layer, only the hands are painted per frame
+        painter.save()
+        painter.resetTransform()
+        self.updateFaceLayer()
+        painter.drawPixmap(0, 0, self.faceLayer)
+        self.paintOps += 1
+        painter.restore()
+
+        seconds = time.second()
+        if self.sweepTimer.isActive():
+            seconds += time.msec() / 1000.0
+
         painter.setPen(QtCore.Qt.NoPen)
         painter.setBrush(self.hourColor)
         # set hour hand length and minute hand length
@@ -257,50 +445,146 @@ class ClockWidget(QtWidgets.QWidget):
         # draw hour hand
         painter.save()
         painter.rotate(30.0 * (time.hour() + time.minute() / 60.0))
-        painter.drawRoundedRect(-4, 4, 8, hhl, 4.0, 4.0)
+        painter.drawRoundedRect(QtCore.QRectF(-4, 4, 8, hhl), 4.0, 4.0)
         painter.restore()
 
         # draw second hand
         painter.save()
-        painter.rotate(6.0 * time.second())
-        painter.drawRoundedRect(-1, 1, 2, shl, 1.0, 1.0)
+        painter.rotate(6.0 * seconds)
+        painter.drawRoundedRect(QtCore.QRectF(-1, 1, 2, shl), 1.0, 1.0)
         painter.restore()
 
-        painter.setPen(self.hourColor)
-
-        for i in range(12):
-            painter.drawRoundedRect(88, -1, 8, 2, 1.0, 1.0)
-            painter.rotate(30.0)
-
-        painter.setPen(QtCore.Qt.NoPen)
         painter.setBrush(self.minuteColor)
 
         # draw minute hand
         sizefactor = 1.3
         painter.save()
-        painter.rotate(6.0 * (time.minute() + time.second() / 60.0))
-        painter.drawRoundedRect(-4 / sizefactor, 4 / sizefactor, 8 / sizefactor, mhl, 4.0 / sizefactor,
-                                4.0 / sizefactor)
+        painter.rotate(6.0 * (time.minute() + seconds / 60.0))
+        painter.drawRoundedRect(QtCore.QRectF(-4 / sizefactor, 4 / sizefactor, 8 / sizefactor, mhl),
+                                4.0 / sizefactor, 4.0 / sizefactor)
         painter.restore()
 
-        # draw center circle
+        # draw center circle, it covers the ends of the hands
         painter.setBrush(self.circleColor)
-        painter.save()
-        painter.drawEllipse(-6, -6, 12, 12)
-        painter.restore()
+        painter.drawEllipse(QtCore.QRectF(-6, -6, 12, 12))
+        self.paintOps += 4
+        # end analog clock mode
+
+    def updateFaceLayer(self):
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr, self.hourColor.rgba(), self.minuteColor.rgba())
+        if self.faceLayer is not None and key == self.faceLayerKey:
+            return
+
+        self.faceLayer = QtGui.QPixmap(max(1, math.ceil(self.width() * dpr)), max(1, math.ceil(self.height() * dpr)))
+        self.faceLayer.setDevicePixelRatio(dpr)
+        self.faceLayer.fill(QtCore.Qt.transparent)
+        self.faceLayerKey = key
+
+        painter = QtGui.QPainter(self.faceLayer)
+        painter.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
+        painter.setTransform(self.clockTransform)
+        painter.setPen(self.hourColor)
+        painter.setBrush(self.hourColor)
+
+        for i in range(12):
+            painter.drawRoundedRect(QtCore.QRectF(88, -1, 8, 2), 1.0, 1.0)
+            painter.rotate(30.0)
 
         painter.setPen(self.minuteColor)
 
         for j in range(60):
             if (j % 5) != 0:
-                painter.drawLine(92, 0, 96, 0)
+                painter.drawLine(QtCore.QLineF(92, 0, 96, 0))
             painter.rotate(6.0)
-        # end analog clock mode
+        painter.end()
+
+    @QtCore.pyqtSlot(bool)
+    def setSmoothSeconds(self, value):
+        self.smoothSeconds = value
+        self.updateSweepTimer()
+
+    def resetSmoothSeconds(self):
+        self.setSmoothSeconds(False)
+
+    def getSmoothSeconds(self):
+        return self.smoothSeconds
+
+    clockSmoothSeconds = QtCore.pyqtProperty("int", getSmoothSeconds, setSmoothSeconds, resetSmoothSeconds)
+
+    @QtCore.pyqtSlot(int)
+    def setSweepFps(self, value):
+        self.sweepFps = max(1, value)
+        self.sweepFpsEffective = self.sweepFps
+        self.updateSweepTimer()
+
+    def resetSweepFps(self):
+        self.setSweepFps(10)
+
+    def getSweepFps(self):
+        return self.sweepFps
+
+    clockSweepFps = QtCore.pyqtProperty("int", getSweepFps, setSweepFps, resetSweepFps)
+
+    @QtCore.pyqtSlot(float)
+    def setSweepBudget(self, value):
+        # max. paint time per sweep frame in ms
+        self.sweepBudget = max(0.1, value)
+        self.sweepFpsEffective = self.sweepFps
+        self.updateSweepTimer()
+
+    def resetSweepBudget(self):
+        self.setSweepBudget(10.0)
+
+    def getSweepBudget(self):
+        return self.sweepBudget
+
+    clockSweepBudget = QtCore.pyqtProperty("double", getSweepBudget, setSweepBudget, resetSweepBudget)
+
+    def updateSweepTimer(self):
+        # the smooth second hand only runs in analog mode and while visible, it is pointless at 2 fps or less
+        if self.clockMode == 0 and self.smoothSeconds and self.isVisible() and self.sweepFps > 2:
+            self.sweepTimer.start(int(1000 / self.sweepFpsEffective))
+        else:
+            self.sweepTimer.stop()
+
+    def sweep(self):
+        self.time = self.currentTime()
+        self.repaint()
+        # exponential average of the paint time, halve the frame rate while it is over budget, down to 2 fps, and
+        # double it again after 2 seconds well under budget
+        self.sweepPaintTime = 0.9 * self.sweepPaintTime + 0.1 * self.paintTime
+        if self.sweepPaintTime > self.sweepBudget:
+            self.sweepGoodFrames = 0
+            if self.sweepFpsEffective > 2:
+                self.sweepFpsEffective = max(2, self.sweepFpsEffective // 2)
+                self.sweepPaintTime = 0.0
+                self.sweepBudgetDrops += 1
+                self.updateSweepTimer()
+        elif self.sweepPaintTime < self.sweepBudget / 2 and self.sweepFpsEffective < self.sweepFps:
+            self.sweepGoodFrames += 1
+            if self.sweepGoodFrames >= 2 * self.sweepFpsEffective:
+                self.sweepFpsEffective = min(self.sweepFps, self.sweepFpsEffective * 2)
+                self.sweepGoodFrames = 0
+                self.sweepRecoveries += 1
+                self.updateSweepTimer()
+        else:
+            self.sweepGoodFrames = 0
+
+    def showEvent(self, event):
+        self.updateSweepTimer()
+        super(ClockWidget, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self.sweepTimer.stop()
+        super(ClockWidget, self).hideEvent(event)
 
     @QtCore.pyqtSlot(str)
     def setLogo(self, logofile=""):
         self.imagepath = logofile
         self.image = QtGui.QImage(logofile)
+        self.ringLayer = None
+        self.repaintAll()
 
     def getLogo(self):
         return self.imagepath
@@ -313,17 +597,19 @@ class ClockWidget(QtWidgets.QWidget):
     def paintDigital(self, painter):
         # digital clock mode
         time = self.time
-        dotSize = 1.6
-
-        # draw digits and colon
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.setBrush(self.digiDigitColor)
-        painter.setPen(self.digiDigitColor)
 
         digitSpacing = 28
         digitSpacingY = 45
         secondsOffsetX = -3.5
 
+        # all dots are blitted from pre-rendered glyphs in device coordinates
+        painter.resetTransform()
+
+        # hour marks, logo and seconds ring
+        self.updateRingLayer(time.second() + 1)
+        painter.drawPixmap(0, 0, self.ringLayer)
+        self.paintOps += 1
+
         if self.isAmPm and time.hour() > 12:
             if time.hour() >= 12:
                 hourStr = "%02d" % (time.hour() - 12)
@@ -331,50 +617,64 @@ class ClockWidget(QtWidgets.QWidget):
                 hourStr = "%02d" % time.hour()
         else:
             hourStr = "%02d" % time.hour()
-        self.drawDigit(painter, digitSpacing * -2, 0, hourStr[0:1])
-        self.drawDigit(painter, digitSpacing * -1, 0, hourStr[1:2])
+        self.blitGlyph(painter, self.digitGlyph(hourStr[0:1]), digitSpacing * -2, 0)
+        self.blitGlyph(painter, self.digitGlyph(hourStr[1:2]), digitSpacing * -1, 0)
 
         self.drawColon(painter, 0, 0)
 
         minuteStr = "%02d" % time.minute()
-        self.drawDigit(painter, digitSpacing * 1, 0, minuteStr[0:1])
-        self.drawDigit(painter, digitSpacing * 2, 0, minuteStr[1:2])
+        self.blitGlyph(painter, self.digitGlyph(minuteStr[0:1]), digitSpacing * 1, 0)
+        self.blitGlyph(painter, self.digitGlyph(minuteStr[1:2]), digitSpacing * 2, 0)
 
         if self.showSeconds:
             secondStr = "%02d" % time.second()
-            self.drawDigit(painter, (digitSpacing * -0.3) + secondsOffsetX, digitSpacingY, secondStr[0:1], 0.8, 3)
-            self.drawDigit(painter, (digitSpacing * 0.3) + secondsOffsetX, digitSpacingY, secondStr[1:2], 0.8, 3)
-
-        # set painter to 12 o'clock position
-        painter.rotate(-90.0)
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.setBrush(self.digiHourColor)
-        painter.setPen(self.digiHourColor)
-
-        # draw hour marks
-        painter.save()
-        for i in range(12):
-            painter.drawEllipse(QtCore.QPointF(95, 0), dotSize, dotSize)
-            painter.rotate(30.0)
-        painter.restore()
+            self.blitGlyph(painter, self.digitGlyph(secondStr[0:1], 0.8, 3),
+                           (digitSpacing * -0.3) + secondsOffsetX, digitSpacingY)
+            self.blitGlyph(painter, self.digitGlyph(secondStr[1:2], 0.8, 3),
+                           (digitSpacing * 0.3) + secondsOffsetX, digitSpacingY)
 
-        painter.setPen(QtCore.Qt.NoPen)
-        painter.setBrush(self.digiSecondColor)
-        painter.setPen(self.digiSecondColor)
-
-        # draw seconds
-        painter.save()
-        # draw zero second
-        # painter.drawEllipse(QtCore.QPointF(88,0), dotSize, dotSize)
-        # painter.rotate(6.0)
-        second = time.second() + 1
-        if second == 0: second = 60
-        for j in range(0, second):
-            painter.drawEllipse(QtCore.QPointF(88, 0), dotSize, dotSize)
-            painter.rotate(6.0)
-        painter.restore()
+        # end digital clock mode
 
-        # add logo
+    def updateRingLayer(self, second):
+        # the seconds ring only grows during a minute, so only newly lit seconds are added to the layer
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr, self.digiHourColor.rgba(), self.digiSecondColor.rgba(),
+               self.showSeconds)
+        if self.ringLayer is None or key != self.ringLayerKey or second < self.ringLayerSeconds:
+            self.ringLayer = QtGui.QPixmap(max(1, math.ceil(self.width() * dpr)),
+                                           max(1, math.ceil(self.height() * dpr)))
+            self.ringLayer.setDevicePixelRatio(dpr)
+            self.ringLayer.fill(QtCore.Qt.transparent)
+            self.ringLayerKey = key
+            self.ringLayerSeconds = 0
+
+            painter = QtGui.QPainter(self.ringLayer)
+            painter.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
+            self.blitGlyph(painter, self.ringGlyph("hourmarks", 95, 12, 1.6, self.digiHourColor), 0, 0)
+            painter.setTransform(self.clockTransform)
+            self.drawLogo(painter)
+            painter.end()
+
+        if second > self.ringLayerSeconds:
+            painter = QtGui.QPainter(self.ringLayer)
+            painter.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
+            self.drawSeconds(painter, self.ringLayerSeconds, second)
+            painter.end()
+            self.ringLayerSeconds = second
+
+    def drawSeconds(self, painter, first, last):
+        # light the dots of the seconds ring from first up to (excluding) last
+        secondsRing = self.ringGlyph("seconds", 88, 60, 1.6, self.digiSecondColor)
+        if last - first < 60:
+            path = QtGui.QPainterPath()
+            path.moveTo(0, 0)
+            path.arcTo(QtCore.QRectF(-100, -100, 200, 200), 93.0 - 6.0 * first, -6.0 * (last - first))
+            path.closeSubpath()
+            painter.setClipPath(self.clockTransform.map(path))
+        self.blitGlyph(painter, secondsRing, 0, 0)
+        painter.setClipping(False)
+
+    def drawLogo(self, painter):
         image_max_h = 40
         image_max_w = 100
         image = self.image
@@ -382,9 +682,6 @@ class ClockWidget(QtWidgets.QWidget):
         image_h = image.height()
 
         if image_w > 0 and image_h > 1:
-            painter.save()
-            painter.rotate(90)
-
             if self.showSeconds:
                 # logo position and width when showing seconds
                 paint_x = 0
@@ -404,153 +701,109 @@ class ClockWidget(QtWidgets.QWidget):
                 paint_w = (float(image_h) / float(image_w)) * paint_h
 
             painter.drawImage(QtCore.QRectF(paint_x - (paint_w / 2), paint_y - (paint_h / 2), paint_w, paint_h), image)
-            painter.restore()
+            self.paintOps += 1
+
+    def glyph(self, key, dots, dotSize, color, bounds=None):
+        # return a cached pixmap of the given dots, rendered for the current widget size
+        key = key + (dotSize, color.rgba(), self.devicePixelRatioF(), self.width(), self.height())
+        glyph = self.glyphCache.get(key)
+        if glyph is None:
+            glyph = self.renderGlyph(dots, dotSize, color, bounds)
+            self.glyphCache[key] = glyph
+        return glyph
+
+    def renderGlyph(self, dots, dotSize, color, bounds=None):
+        scale = min(self.width(), self.height()) / 200.0
+        dpr = self.devicePixelRatioF()
+        margin = dotSize + 1
+        if bounds is None:
+            bounds = dots
+        left = min(x for x, y in bounds) - margin
+        top = min(y for x, y in bounds) - margin
+        right = max(x for x, y in bounds) + margin
+        bottom = max(y for x, y in bounds) + margin
+
+        pixmap = QtGui.QPixmap(max(1, math.ceil((right - left) * scale * dpr)),
+                               max(1, math.ceil((bottom - top) * scale * dpr)))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.scale(scale, scale)
+        painter.translate(-left, -top)
+        painter.setPen(color)
+        painter.setBrush(color)
+        for x, y in dots:
+            painter.drawEllipse(QtCore.QPointF(x, y), dotSize, dotSize)
+        painter.end()
+        return pixmap, QtCore.QPointF(left, top)
+
+    def blitGlyph(self, painter, glyph, posX, posY):
+        # painter has to be in device coordinates, posX/posY are clock coordinates
+        pixmap, origin = glyph
+        pos = self.clockTransform.map(QtCore.QPointF(posX + origin.x(), posY + origin.y()))
+        dpr = pixmap.devicePixelRatioF()
+        painter.drawPixmap(QtCore.QPointF(round(pos.x() * dpr) / dpr, round(pos.y() * dpr) / dpr), pixmap)
+        self.paintOps += 1
+
+    def digitGlyph(self, value, dotSize=1.6, dotOffset=4.5, slant=19):
+        value = int(value)
+        color = self.digiDigitColor
+        return self.glyph(("digit", value, dotOffset, slant), self.digitDots(value, dotOffset, slant), dotSize,
+                          color)
 
-        # end digital clock mode
+    def ringGlyph(self, name, radius, count, dotSize, color):
+        # keep the glyph centered on the clock origin
+        bounds = [(-radius, -radius), (radius, radius)]
+        return self.glyph((name, radius, count), self.ringDots(radius, count), dotSize, color, bounds)
+
+    @staticmethod
+    def ringDots(radius, count):
+        # ring of dots, starting at 12 o'clock
+        return [(radius * math.cos(math.radians(-90 + (360 / count) * i)),
+                 radius * math.sin(math.radians(-90 + (360 / count) * i))) for i in range(count)]
 
     def drawColon(self, painter, digitStartPosX=0, digitStartPosY=0):
         # paint colon only half a second
         if self.time.msec() < 500 or self.staticColon:
-            dotSize = 1.6
-            dotOffset = 4.5  # spacing between the dots
-            dotSlant = dotOffset / 15  # horizontal slant of each row
-            currentRow = +1.5
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX + (dotSlant * 2 * currentRow), digitStartPosY - (dotOffset * currentRow)),
-                dotSize, dotSize)
-            currentRow = -1.2
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX + (dotSlant * 2 * currentRow), digitStartPosY - (dotOffset * currentRow)),
-                dotSize, dotSize)
-
-    def drawDigit(self, painter, digitStartPosX=0.0, digitStartPosY=0.0, value=8, dotSize=1.6, dotOffset=4.5, slant=19):
-        value = int(value)
-        # draw dots from one 7segment digit
-        dotSlant = dotOffset / slant  # horizontal slant of each row
+            self.blitGlyph(painter, self.colonGlyph(), digitStartPosX, digitStartPosY)
 
-        # decimal to segment conversion table
-        segments = [0b0111111, 0b0000110, 0b1011011, 0b1001111, 0b1100110, 0b1101101, 0b1111101, 0b0000111, 0b1111111,
-                    0b1101111]
-
-        if segments[value] & 1 << 6:
-            # segment g
-            currentRow = 0  # center row
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 0:
-            # segment a
-            currentRow = 9  # top row
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 3:
-            # segment d
-            currentRow = -9  # bottom row
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX - (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 0.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-            painter.drawEllipse(QtCore.QPointF(digitStartPosX + (dotOffset * 1.5) + (dotSlant * currentRow),
-                                               digitStartPosY - (dotOffset / 2 * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 5:
-            # segment f
-            yOffset = -0.75
-            xOffset = +0.75
-            currentRow = 1
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 2
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 3
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 4
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 1:
-            # segment b
-            yOffset = -1.2
-            xOffset = -0.5
-            currentRow = 1
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 2
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 3
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = 4
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 4:
-            # segment e
-            yOffset = +1.2
-            xOffset = +0.5
-            currentRow = -1
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -2
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -3
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -4
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset - (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-
-        if segments[value] & 1 << 2:
-            # segment c
-            yOffset = +0.75
-            xOffset = -0.75
-            currentRow = -1
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -2
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -3
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
-            currentRow = -4
-            painter.drawEllipse(
-                QtCore.QPointF(digitStartPosX - xOffset + (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
-                               digitStartPosY - yOffset - (dotOffset * currentRow)), dotSize, dotSize)
+    def colonGlyph(self):
+        dotSize = 1.6
+        dotOffset = 4.5  # spacing between the dots
+        dotSlant = dotOffset / 15  # horizontal slant of each row
+        dots = [(dotSlant * 2 * currentRow, -(dotOffset * currentRow)) for currentRow in (+1.5, -1.2)]
+        return self.glyph(("colon",), dots, dotSize, self.digiDigitColor)
+
+    @classmethod
+    def digitDots(cls, value, dotOffset=4.5, slant=19):
+        # dot positions of one 7segment digit, relative to the center of the digit
+        key = (value, dotOffset, slant)
+        if key in cls.digitDotCache:
+            return cls.digitDotCache[key]
+
+        dotSlant = dotOffset / slant  # horizontal slant of each row
+        segments = cls.segments[value]
+        dots = []
+
+        # horizontal segments g (center row), a (top row) and d (bottom row)
+        for segment, currentRow in ((6, 0), (0, 9), (3, -9)):
+            if segments & 1 << segment:
+                for column in (-1.5, -0.5, 0.5, 1.5):
+                    dots.append(((dotOffset * column) + (dotSlant * currentRow), -(dotOffset / 2 * currentRow)))
+
+        # vertical segments f, b (upper half) and e, c (lower half)
+        for segment, side, xOffset, yOffset, rows in ((5, -1, +0.75, -0.75, (1, 2, 3, 4)),
+                                                      (1, +1, -0.5, -1.2, (1, 2, 3, 4)),
+                                                      (4, -1, +0.5, +1.2, (-1, -2, -3, -4)),
+                                                      (2, +1, -0.75, +0.75, (-1, -2, -3, -4))):
+            if segments & 1 << segment:
+                for currentRow in rows:
+                    dots.append((-xOffset + side * (dotOffset * 2.0) + (dotSlant * 2 * currentRow),
+                                 -yOffset - (dotOffset * currentRow)))
+
+        cls.digitDotCache[key] = dots
+        return dots
 
 
 if __name__ == '__main__':
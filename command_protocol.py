@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# command_protocol.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+# Batch framing of UDP datagrams, see README.md
+#
+# text:   UTF-8 commands COMMAND:VALUE, one per line
+# binary: a 0x00 marker byte followed by (opcode, value) byte pairs, for high rate LED/AIR state changes
+#
+# All commands of one datagram are applied in one pass of the event loop, so they show up in a single repaint.
+#
+# target: a text line "@TARGET,TARGET:COMMAND:VALUE" is only applied by screens with one of these ids or tags,
+#         "@*:" addresses every screen, lines without a prefix too
+
+BINARY_MARKER = 0x00
+
+# binary opcodes and values, decoded into the same commands as their text form
+OPCODES = {
+    0x01: b"LED1",
+    0x02: b"LED2",
+    0x03: b"LED3",
+    0x04: b"LED4",
+    0x11: b"AIR1",
+    0x12: b"AIR2",
+    0x13: b"AIR3",
+    0x14: b"AIR4",
+}
+VALUES = ("OFF", "ON", "RESET", "TOGGLE")
+
+OPCODE_BY_COMMAND = {command.decode(): opcode for opcode, command in OPCODES.items()}
+
+TARGET_PREFIX = b"@"
+ALL_TARGETS = b"*"
+
+
+def decode_text(data):
+    commands = []
+    for line in data.splitlines():
+        command, separator, value = line.partition(b":")
+        if not separator:
+            continue
+        try:
+            commands.append((command, value.decode("utf_8")))
+        except UnicodeDecodeError:
+            print("ERROR: invalid UTF-8 in command", command)
+    return commands
+
+
+def decode_binary(data):
+    commands = []
+    for i in range(1, len(data) - 1, 2):
+        command = OPCODES.get(data[i])
+        value = data[i + 1]
+        if command is None or value >= len(VALUES):
+            print("ERROR: invalid binary command %02x:%02x" % (data[i], value))
+            continue
+        commands.append((command, VALUES[value]))
+    return commands
+
+
+def decode_datagram(data):
+    # list of (command, value) tuples, command as bytes and value as str
+    if data[:1] == bytes((BINARY_MARKER,)):
+        return decode_binary(data)
+    return decode_text(data)
+
+
+def filter_targets(data, targets):
+    # (data without the lines for other screens and without target prefixes, command names of the other lines)
+    # targets is a set of lower case ids and tags of this screen, including ALL_TARGETS
+    if data[:1] != TARGET_PREFIX and b"\n" + TARGET_PREFIX not in data:
+        return data, []
+    if data[:1] == bytes((BINARY_MARKER,)):
+        return data, []
+    lines = []
+    skipped = []
+    for line in data.splitlines():
+        if line[:1] == TARGET_PREFIX:
+            addressed, separator, line = line[1:].partition(b":")
+            if not separator:
+                continue
+            if targets.isdisjoint(target.strip() for target in addressed.lower().split(b",")):
+                skipped.append(line.partition(b":")[0])
+                continue
+        lines.append(line)
+    return b"\n".join(lines), skipped
+
+
+def encode_text(commands):
+    return "\n".join("%s:%s" % (command, value) for command, value in commands).encode("utf_8")
+
+
+def encode_binary(commands):
+    data = bytearray((BINARY_MARKER,))
+    for command, value in commands:
+        if command not in OPCODE_BY_COMMAND or value not in VALUES:
+            raise ValueError("no binary encoding for %s:%s" % (command, value))
+        data += bytes((OPCODE_BY_COMMAND[command], VALUES.index(value)))
+    return bytes(data)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# command_server.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import time
+from functools import partial
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtNetwork import QAbstractSocket, QHostAddress, QTcpServer
+
+# unread bytes buffered per connection, beyond that the kernel stops accepting data and the sender blocks,
+# also the longest accepted line
+TCP_READ_BUFFER = 65536
+# a connection that does not read its acks is not served until these are written
+TCP_MAX_UNACKED = 65536
+# lines served per connection and event loop pass, so one connection can't freeze the screen
+TCP_LINES_PER_PASS = 256
+TCP_MAX_CONNECTIONS = 64
+
+
+class TcpCommandServer(QObject):
+    """
+    Persistent TCP connections with the line protocol of the UDP commands, see README.md
+
+    Every line is acknowledged with one line in the same order, "OK COMMAND" or "ERR COMMAND reason", so
+    clients can pipeline commands. Runs in the GUI thread, all socket I/O is non-blocking.
+    """
+
+    def __init__(self, handler, parent=None):
+        super(TcpCommandServer, self).__init__(parent)
+        # handler(data, received) -> list of results, see MainScreen.parse_cmd()
+        self.handler = handler
+        self.server = QTcpServer(self)
+        self.server.setMaxPendingConnections(TCP_MAX_CONNECTIONS)
+        self.server.newConnection.connect(self.accept)
+        self.clients = set()
+        # connections with unserved lines, in order of arrival
+        self.ready = {}
+        self.serveTimer = QTimer(self)
+        self.serveTimer.setSingleShot(True)
+        self.serveTimer.setInterval(0)
+        self.serveTimer.timeout.connect(self.serve)
+        self.stats = {"connections": 0, "rejected": 0, "lines": 0, "errors": 0, "throttled": 0}
+
+    def listen(self, port):
+        if not self.server.listen(QHostAddress.Any, port):
+            print("ERROR: Starting TCP Server on port", port, self.server.errorString())
+            return False
+        return True
+
+    def close(self):
+        self.server.close()
+        for client in list(self.clients):
+            client.abort()
+        self.clients.clear()
+        self.ready.clear()
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            client = self.server.nextPendingConnection()
+            if len(self.clients) >= TCP_MAX_CONNECTIONS:
+                self.stats["rejected"] += 1
+                client.write(b"ERR - too many connections\n")
+                client.disconnectFromHost()
+                continue
+            client.setReadBufferSize(TCP_READ_BUFFER)
+            client.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+            client.setSocketOption(QAbstractSocket.KeepAliveOption, 1)
+            client.readyRead.connect(partial(self.schedule, client))
+            # acks were written, a throttled connection may continue
+            client.bytesWritten.connect(partial(self.schedule, client))
+            client.disconnected.connect(partial(self.drop, client))
+            self.clients.add(client)
+            self.stats["connections"] += 1
+
+    def drop(self, client):
+        # lines sent right before the client closed the connection are applied, no one reads their acks
+        while client.canReadLine():
+            line = bytes(client.readLine()).rstrip(b"\r\n")
+            if line:
+                self.execute(line, time.perf_counter())
+        self.clients.discard(client)
+        self.ready.pop(client, None)
+        client.deleteLater()
+
+    def schedule(self, client, *args):
+        if client in self.clients:
+            self.ready[client] = True
+            if not self.serveTimer.isActive():
+                self.serveTimer.start()
+
+    def serve(self):
+        # one pass over all connections with pending lines, the rest is served after other events
+        for client in list(self.ready):
+            del self.ready[client]
+            if self.serve_client(client):
+                self.ready[client] = True
+        if self.ready:
+            self.serveTimer.start()
+
+    def serve_client(self, client):
+        # True if the client has more lines to serve
+        for i in range(TCP_LINES_PER_PASS):
+            if client.bytesToWrite() > TCP_MAX_UNACKED:
+                # continued from bytesWritten
+                self.stats["throttled"] += 1
+                return False
+            if not client.canReadLine():
+                if client.bytesAvailable() >= TCP_READ_BUFFER:
+                    self.stats["errors"] += 1
+                    client.write(b"ERR - line too long\n")
+                    client.disconnectFromHost()
+                return False
+            line = bytes(client.readLine()).rstrip(b"\r\n")
+            if line:
+                client.write(self.execute(line, time.perf_counter()))
+        return client.canReadLine()
+
+    def execute(self, line, received):
+        self.stats["lines"] += 1
+        if line[:1] == b"\x00":
+            # binary batches may contain newline bytes, they are not supported here
+            self.stats["errors"] += 1
+            return b"ERR - binary commands are not supported on TCP\n"
+        results = self.handler(line, received)
+        if not results:
+            self.stats["errors"] += 1
+            return b"ERR - invalid command\n"
+        result = results[0]
+        command = result["command"].encode("utf_8", "replace")
+        if result["status"] == "ok":
+            return b"OK " + command + b"\n"
+        self.stats["errors"] += 1
+        return b"ERR " + command + b" " + result["status"].encode() + b"\n"
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# latency_tracer.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import collections
+import threading
+import time
+
+from PyQt5.QtCore import QEvent, QObject
+
+# upper bounds of the histogram buckets in ms
+TRACE_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# most recent latencies per command and stage, for the percentiles
+TRACE_SAMPLES = 1000
+# commands whose widgets are not repainted within this time (hidden or unchanged) are no longer traced
+TRACE_PAINT_TIMEOUT = 1.0
+# stages of a command, all measured from its receipt
+TRACE_STAGES = ("dispatch", "paint")
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(TRACE_BUCKETS) + 1)
+        self.samples = collections.deque(maxlen=TRACE_SAMPLES)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        bucket = 0
+        while bucket < len(TRACE_BUCKETS) and milliseconds >= TRACE_BUCKETS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.samples.append(milliseconds)
+        self.count += 1
+        self.max = max(self.max, milliseconds)
+
+    def state(self):
+        samples = sorted(self.samples)
+        labels = ["<%g" % bound for bound in TRACE_BUCKETS] + [">=%g" % TRACE_BUCKETS[-1]]
+        return {
+            "count": self.count,
+            "p50_ms": round(samples[len(samples) // 2], 3),
+            "p90_ms": round(samples[int(len(samples) * 0.9)], 3),
+            "p99_ms": round(samples[int(len(samples) * 0.99)], 3),
+            "max_ms": round(self.max, 3),
+            "histogram_ms": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class LatencyTracer(QObject):
+    """
+    Optional command latency tracing, from receipt over dispatch in parse_cmd to the next paint of the widgets
+    that show the command
+
+    All tracing calls come from the GUI thread, state() and reset() may be called from any thread.
+    """
+
+    def __init__(self, parent=None):
+        super(LatencyTracer, self).__init__(parent)
+        self.enabled = False
+        self.lock = threading.Lock()
+        # command -> widgets that show it, widget -> commands it shows
+        self.widgets = {}
+        self.commands = {}
+        # command -> receipt times of commands that were not dispatched yet
+        self.received = {}
+        # command -> (receipt, dispatch) times of commands that were not painted yet
+        self.unpainted = {}
+        # (command, stage) -> LatencyHistogram
+        self.histograms = {}
+        self.timeouts = 0
+
+    def watch(self, command, *widgets):
+        self.widgets[command] = widgets
+        for widget in widgets:
+            self.commands.setdefault(widget, []).append(command)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        for widget in self.commands:
+            if enabled:
+                widget.installEventFilter(self)
+            else:
+                widget.removeEventFilter(self)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.received = {}
+            self.unpainted = {}
+            self.histograms = {}
+            self.timeouts = 0
+
+    def add(self, command, stage, seconds):
+        histogram = self.histograms.get((command, stage))
+        if histogram is None:
+            histogram = self.histograms[(command, stage)] = LatencyHistogram()
+        histogram.add(seconds)
+
+    def receive(self, command, received):
+        with self.lock:
+            self.received.setdefault(command, []).append(received)
+
+    def dispatch(self, command):
+        # the handler of command was called
+        now = time.perf_counter()
+        with self.lock:
+            received = self.received.pop(command, ())
+            for receipt in received:
+                self.add(command, "dispatch", now - receipt)
+            if command not in self.widgets:
+                return
+            unpainted = self.unpainted.setdefault(command, [])
+            if unpainted and now - unpainted[0][1] > TRACE_PAINT_TIMEOUT:
+                self.timeouts += len(unpainted)
+                del unpainted[:]
+            unpainted.extend((receipt, now) for receipt in received)
+
+    def eventFilter(self, widget, event):
+        if event.type() == QEvent.Paint:
+            now = time.perf_counter()
+            with self.lock:
+                for command in self.commands.get(widget, ()):
+                    for receipt, dispatched in self.unpainted.pop(command, ()):
+                        self.add(command, "paint", now - receipt)
+        return False
+
+    def state(self):
+        with self.lock:
+            commands = {}
+            for (command, stage), histogram in sorted(self.histograms.items()):
+                commands.setdefault(command.decode(), {})[stage] = histogram.state()
+            return {"enabled": self.enabled, "timeouts": self.timeouts, "commands": commands}
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# ntp_monitor.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import collections
+import math
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ntplib
+
+# seconds between two checks of a server
+NTP_INTERVAL = 60
+# a failed check is retried after NTP_RETRY seconds, doubled on every further failure up to NTP_MAX_BACKOFF
+NTP_RETRY = 2
+NTP_MAX_BACKOFF = 600
+NTP_TIMEOUT = 2
+# servers queried at the same time
+NTP_MAX_QUERIES = 8
+# samples kept per server, the jitter is computed over the last NTP_JITTER_SAMPLES
+NTP_HISTORY = 128
+NTP_JITTER_SAMPLES = 8
+# larger offsets of the system clock raise a warning
+NTP_MAX_OFFSET = 0.3
+
+
+class NtpServer:
+    # a configured server "host" or "host:port" and its sample history
+    def __init__(self, address):
+        self.address = address
+        host, separator, port = address.rpartition(":")
+        if separator and port.isdigit() and "]" not in port:
+            self.host, self.port = host.strip("[]"), int(port)
+        else:
+            self.host, self.port = address, "ntp"
+        self.samples = collections.deque(maxlen=NTP_HISTORY)
+        # consecutive failures and the last error
+        self.failures = 0
+        self.lastError = ""
+        # next check on the monotonic clock, the first one after a second like before
+        self.due = time.monotonic() + 1
+
+    def record(self, response, error):
+        now = time.monotonic()
+        if error:
+            self.failures += 1
+            self.lastError = error
+            self.due = now + min(NTP_RETRY * 2 ** (self.failures - 1), NTP_MAX_BACKOFF)
+            return
+        self.failures = 0
+        self.lastError = ""
+        self.due = now + NTP_INTERVAL
+        self.samples.append({
+            "time": time.time(),
+            "monotonic": now,
+            "offset": response.offset,
+            "delay": response.delay,
+            "stratum": response.stratum,
+        })
+
+    def jitter(self):
+        # RMS of the differences between successive offsets
+        offsets = [sample["offset"] for sample in list(self.samples)[-NTP_JITTER_SAMPLES:]]
+        if len(offsets) < 2:
+            return 0.0
+        return math.sqrt(sum((b - a) ** 2 for a, b in zip(offsets, offsets[1:])) / (len(offsets) - 1))
+
+    def state(self):
+        return {
+            "failures": self.failures,
+            "last_error": self.lastError,
+            # None while a check is in flight
+            "next_check_in": None if math.isinf(self.due) else round(max(0.0, self.due - time.monotonic()), 1),
+            "jitter": self.jitter(),
+            "samples": [{key: value for key, value in sample.items() if key != "monotonic"}
+                        for sample in self.samples],
+        }
+
+
+class NtpMonitor:
+    """
+    Checks the system clock against several NTP servers from one long-lived thread
+
+    Due servers are queried concurrently, failing servers are retried with exponential backoff. The result is
+    published as a new status dict after every check, status() and history() can be called from any thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # notified on configuration changes and stop()
+        self.wakeup = threading.Condition(self.lock)
+        self.servers = []
+        self.enabled = False
+        self.running = False
+        self.thread = None
+        self.client = ntplib.NTPClient()
+        self.currentStatus = self.make_status(False, "")
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="oas-ntp", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        if self.thread is not None:
+            self.thread.join(NTP_TIMEOUT + 1)
+            self.thread = None
+
+    def configure(self, addresses, enabled):
+        # servers that stay configured keep their history
+        with self.lock:
+            known = {server.address: server for server in self.servers}
+            self.servers = [known.get(address) or NtpServer(address) for address in addresses]
+            self.enabled = enabled and bool(self.servers)
+            self.publish()
+            self.wakeup.notify()
+
+    @staticmethod
+    def make_status(synchronized, message, server=None, sample=None, jitter=None):
+        return {
+            "synchronized": synchronized,
+            "message": message,
+            "server": server,
+            "offset": sample["offset"] if sample else None,
+            "delay": sample["delay"] if sample else None,
+            "jitter": jitter,
+            "time": sample["time"] if sample else None,
+            "monotonic": sample["monotonic"] if sample else None,
+        }
+
+    def publish(self):
+        # pick the reachable server with the shortest round trip, called with the lock held
+        if not self.enabled:
+            self.currentStatus = self.make_status(False, "")
+            return
+        reachable = [server for server in self.servers if server.samples and not server.failures]
+        if not reachable:
+            if any(server.failures for server in self.servers):
+                message = "Clock not NTP synchronized"
+            else:
+                message = "waiting for NTP status check"
+            self.currentStatus = self.make_status(False, message)
+            return
+        server = min(reachable, key=lambda server: server.samples[-1]["delay"])
+        sample = server.samples[-1]
+        if abs(sample["offset"]) > NTP_MAX_OFFSET:
+            self.currentStatus = self.make_status(False, "Clock not NTP synchronized: offset too big",
+                                                  server.address, sample, server.jitter())
+        else:
+            self.currentStatus = self.make_status(True, "", server.address, sample, server.jitter())
+
+    def status(self):
+        # the status dict is replaced, never changed
+        return self.currentStatus
+
+    def history(self):
+        with self.lock:
+            status = {key: value for key, value in self.currentStatus.items() if key != "monotonic"}
+            return {"status": status, "servers": {server.address: server.state() for server in self.servers}}
+
+    def query(self, server):
+        try:
+            return self.client.request(server.host, port=server.port, timeout=NTP_TIMEOUT), None
+        except ntplib.NTPException as error:
+            return None, str(error)
+        except (socket.gaierror, OSError) as error:
+            return None, "socket error: %s" % error
+
+    def check(self, server):
+        # runs in the query pool, ntplib blocks until the answer or the timeout
+        response, error = self.query(server)
+        if error:
+            print("NTP error: %s while checking %s" % (error, server.address))
+        elif abs(response.offset) > NTP_MAX_OFFSET:
+            print("offset too big: %f while checking %s" % (response.offset, server.address))
+        with self.lock:
+            server.record(response, error)
+            self.publish()
+            self.wakeup.notify()
+
+    def run(self):
+        # hands due servers to the query pool, a slow server does not hold back the others
+        pool = ThreadPoolExecutor(max_workers=NTP_MAX_QUERIES, thread_name_prefix="oas-ntp-query")
+        with self.lock:
+            while self.running:
+                now = time.monotonic()
+                servers = self.servers if self.enabled else []
+                for server in servers:
+                    if server.due <= now:
+                        # not picked up again while in flight
+                        server.due = float("inf")
+                        pool.submit(self.check, server)
+                due = min((server.due for server in servers), default=now + NTP_INTERVAL)
+                # woken up by check() if all servers are in flight
+                self.wakeup.wait(None if math.isinf(due) else due - now)
+        pool.shutdown(wait=False)
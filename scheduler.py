@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# scheduler.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import math
+import time
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+class TickScheduler(QObject):
+    """
+    Single timer that fires on every half second boundary of the wall clock, the system clock by default
+
+    The next boundary is always computed from the clock itself, so late ticks never add up.
+    Lateness is measured on the monotonic clock.
+    """
+
+    # emitted on every half second, True on a full second
+    sigHalfSecond = pyqtSignal(bool)
+
+    def __init__(self, parent=None, clock=time.time):
+        super(TickScheduler, self).__init__(parent)
+        self.clock = clock
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire)
+        # wall clock boundary the timer is armed for and the same point on the monotonic clock
+        self.boundary = None
+        self.due = None
+        self.ticks = 0
+        self.missed = 0
+        self.lastLateness = 0.0
+        self.maxLateness = 0.0
+        self.totalLateness = 0.0
+
+    def start(self):
+        self.arm()
+
+    def stop(self):
+        self.timer.stop()
+
+    def arm(self):
+        wall = self.clock()
+        self.boundary = (math.floor(wall * 2) + 1) / 2
+        self.due = time.monotonic() + self.boundary - wall
+        self.timer.start(max(0, math.ceil((self.boundary - wall) * 1000)))
+
+    def fire(self):
+        now = time.monotonic()
+        wall = self.clock()
+        if wall < self.boundary - 0.5:
+            # system clock was stepped back, realign
+            self.arm()
+            return
+        if wall < self.boundary:
+            # timers may fire a little early, wait for the boundary
+            self.timer.start(max(0, math.ceil((self.boundary - wall) * 1000)))
+            return
+
+        lateness = now - self.due
+        # most recent boundary, differs from self.boundary if we stalled or the clock was stepped
+        boundary = math.floor(wall * 2) / 2
+        self.missed += max(0, int((boundary - self.boundary) * 2))
+        self.ticks += 1
+        self.lastLateness = lateness
+        self.maxLateness = max(self.maxLateness, lateness)
+        self.totalLateness += lateness
+        # arm for the next boundary before dispatching, so slow handlers don't shift the schedule
+        self.arm()
+
+        self.sigHalfSecond.emit(boundary == int(boundary))
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "last_lateness_ms": round(self.lastLateness * 1000, 3),
+            "max_lateness_ms": round(self.maxLateness * 1000, 3),
+            "avg_lateness_ms": round(self.totalLateness * 1000 / self.ticks, 3) if self.ticks else 0.0,
+        }
@@ -46,9 +46,11 @@ from PyQt5.QtGui import QPalette, QColor
 from PyQt5.QtWidgets import QWidget, QColorDialog, QFileDialog, QErrorMessage, QMessageBox
 
 from settings import Ui_Settings
+from settings_store import convert_value
 from utils import TimerUpdateMessageBox
 from version import versionString
 from weatherwidget import WeatherWidget as ww
+from weather_data import OWM_GROUP_MAX, OWM_URL, WeatherData, owm_group_url, owm_url
 
 try:
     from distribution import distributionString, update_url
@@ -246,7 +248,8 @@ class Settings(QWidget, Ui_Settings):
 
         settings.beginGroup("NTP")
         self.checkBox_NTPCheck.setChecked(settings.value('ntpcheck', True, type=bool))
-        self.NTPCheckServer.setText(settings.value('ntpcheckserver', 'pool.ntp.org'))
+        self.NTPCheckServer.setText(convert_value(settings.value('ntpcheckserver'), 'pool.ntp.org'))
+        self.checkBox_NTPCorrection.setChecked(settings.value('ntpcorrection', False, type=bool))
         settings.endGroup()
 
         settings.beginGroup("LEDS")
@@ -310,6 +313,10 @@ class Settings(QWidget, Ui_Settings):
         settings.beginGroup("Network")
         self.udpport.setText(settings.value('udpport', '3310'))
         self.httpport.setText(settings.value('httpport', '8010'))
+        self.tcpport.setText(settings.value('tcpport', '3310'))
+        self.multicastGroups.setText(convert_value(settings.value('multicastgroups'), ''))
+        self.screenId.setText(settings.value('screenid', ''))
+        self.screenTags.setText(convert_value(settings.value('screentags'), ''))
         settings.endGroup()
 
         settings.beginGroup("Formatting")
@@ -323,13 +330,15 @@ class Settings(QWidget, Ui_Settings):
         settings.beginGroup("WeatherWidget")
         self.owmWidgetEnabled.setChecked(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmAPIKey.setText(settings.value('owmAPIKey', ""))
-        self.owmCityID.setText(settings.value('owmCityID', "2643743"))
+        self.owmCityID.setText(convert_value(settings.value('owmCityID'), "2643743"))
         self.owmLanguage.setCurrentIndex(self.owmLanguage.findText(settings.value('owmLanguage', "English")))
         self.owmUnit.setCurrentIndex(self.owmUnit.findText(settings.value('owmUnit', "Celsius")))
+        self.owmRotation.setValue(settings.value('owmRotation', 15, type=int))
         self.owmAPIKey.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmCityID.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmLanguage.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmUnit.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
+        self.owmRotation.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmTestAPI.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         self.owmTestOutput.setEnabled(settings.value('owmWidgetEnabled', False, type=bool))
         settings.endGroup()
@@ -360,6 +369,7 @@ class Settings(QWidget, Ui_Settings):
         settings.beginGroup("NTP")
         settings.setValue('ntpcheck', self.checkBox_NTPCheck.isChecked())
         settings.setValue('ntpcheckserver', self.NTPCheckServer.displayText())
+        settings.setValue('ntpcorrection', self.checkBox_NTPCorrection.isChecked())
         settings.endGroup()
 
         settings.beginGroup("LEDS")
@@ -417,6 +427,10 @@ class Settings(QWidget, Ui_Settings):
         settings.beginGroup("Network")
         settings.setValue('udpport', self.udpport.displayText())
         settings.setValue('httpport', self.httpport.displayText())
+        settings.setValue('tcpport', self.tcpport.displayText())
+        settings.setValue('multicastgroups', self.multicastGroups.displayText())
+        settings.setValue('screenid', self.screenId.displayText())
+        settings.setValue('screentags', self.screenTags.displayText())
         settings.endGroup()
 
         settings.beginGroup("Formatting")
@@ -431,6 +445,7 @@ class Settings(QWidget, Ui_Settings):
         settings.setValue('owmCityID', self.owmCityID.displayText())
         settings.setValue('owmLanguage', self.owmLanguage.currentText())
         settings.setValue('owmUnit', self.owmUnit.currentText())
+        settings.setValue('owmRotation', self.owmRotation.value())
         settings.endGroup()
 
         settings.beginGroup("Timers")
@@ -531,18 +546,25 @@ class Settings(QWidget, Ui_Settings):
 
     def makeOWMTestCall(self):
         appid = self.owmAPIKey.displayText()
-        cityID = self.owmCityID.displayText()
+        cities = [city.strip() for city in self.owmCityID.displayText().split(",") if city.strip()] or [""]
         units = ww.owm_units.get(self.owmUnit.currentText())
         lang = ww.owm_languages.get(self.owmLanguage.currentText())
-        url = "http://api.openweathermap.org/data/2.5/weather?id=" + cityID + "&units=" + units + "&lang=" + lang + "&appid=" + appid
+        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
+        base_url = settings.value("WeatherWidget/owmURL", OWM_URL)
+        if len(cities) > 1:
+            # several cities in rotation are fetched with one group request, like WeatherData.fetch_group()
+            url = owm_group_url(cities[:OWM_GROUP_MAX], units, lang, appid, url=base_url)
+        else:
+            url = owm_url(cities[0], units, lang, appid, url=base_url)
 
+        # the test call bypasses the weather cache but shares its network manager
         req = QtNetwork.QNetworkRequest(QUrl(url))
-        self.nam = QtNetwork.QNetworkAccessManager()
-        self.nam.finished.connect(self.handleOWMResponse)
-        self.nam.get(req)
+        reply = WeatherData.instance().manager.get(req)
+        reply.finished.connect(lambda: self.handleOWMResponse(reply))
 
     def handleOWMResponse(self, reply):
         er = reply.error()
+        reply.deleteLater()
 
         if er == QtNetwork.QNetworkReply.NoError:
             bytes_string = reply.readAll()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# settings_store.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import threading
+
+from PyQt5.QtCore import QSettings
+
+# all runtime config values with their defaults, the type of the default is the type of the value
+DEFAULTS = {
+    "General": {
+        "stationname": "Radio Eriwan",
+        "slogan": "Your question is our motivation",
+        "stationcolor": "#FFAA00",
+        "slogancolor": "#FFAA00",
+        "fullscreen": True,
+        "updatecheck": False,
+        "updatekey": "",
+        "updateincludebeta": False,
+        "latencytracing": False,
+    },
+    "NTP": {
+        "ntpcheck": True,
+        "ntpcheckserver": "pool.ntp.org",
+        "ntpcorrection": False,
+    },
+    "LEDS": {
+        "inactivebgcolor": "#222222",
+        "inactivetextcolor": "#555555",
+    },
+    "LED1": {
+        "used": True,
+        "text": "ON AIR",
+        "activebgcolor": "#FF0000",
+        "activetextcolor": "#FFFFFF",
+        "autoflash": False,
+        "timedflash": False,
+    },
+    "LED2": {
+        "used": True,
+        "text": "PHONE",
+        "activebgcolor": "#DCDC00",
+        "activetextcolor": "#FFFFFF",
+        "autoflash": False,
+        "timedflash": False,
+    },
+    "LED3": {
+        "used": True,
+        "text": "DOORBELL",
+        "activebgcolor": "#00C8C8",
+        "activetextcolor": "#FFFFFF",
+        "autoflash": False,
+        "timedflash": False,
+    },
+    "LED4": {
+        "used": True,
+        "text": "EAS ACTIVE",
+        "activebgcolor": "#FF00FF",
+        "activetextcolor": "#FFFFFF",
+        "autoflash": False,
+        "timedflash": False,
+    },
+    "Clock": {
+        "digital": True,
+        "showSeconds": False,
+        "staticColon": False,
+        "useTextClock": True,
+        "digitalhourcolor": "#3232FF",
+        "digitalsecondcolor": "#FF9900",
+        "digitaldigitcolor": "#3232FF",
+        "logopath": ":/astrastudio_logo/images/astrastudio_transparent.png",
+        "smoothSeconds": False,
+        "sweepFps": 10,
+        "sweepBudget": 10.0,
+    },
+    "Network": {
+        "udpport": 3310,
+        "httpport": 8010,
+        "tcpport": 3310,
+        "multicastgroups": "",
+        "screenid": "",
+        "screentags": "",
+        "httpworkers": 32,
+    },
+    "Formatting": {
+        "dateFormat": "dddd, dd. MMMM yyyy",
+        "textClockLanguage": "English",
+        "isAmPm": False,
+    },
+    "WeatherWidget": {
+        "owmWidgetEnabled": False,
+        "owmAPIKey": "",
+        "owmCityID": "2643743",
+        "owmLanguage": "English",
+        "owmUnit": "Celsius",
+        "owmURL": "http://api.openweathermap.org/data/2.5/weather",
+        "owmRotation": 15,
+    },
+    "Timers": {
+        "TimerAIR1Enabled": True,
+        "TimerAIR2Enabled": True,
+        "TimerAIR3Enabled": True,
+        "TimerAIR4Enabled": True,
+    },
+}
+
+
+def convert_value(value, default):
+    # convert a raw config value to the type of its default
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.lower() in ("true", "1", "yes", "on")
+        return bool(value)
+    if isinstance(default, float):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+    if isinstance(default, int):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+    if value is None:
+        return default
+    if isinstance(value, list):
+        # unquoted comma separated values in .ini files are read as lists
+        return ",".join(value)
+    return str(value)
+
+
+class SettingsStore:
+    """
+    In-memory snapshot of the OnAirScreen config
+
+    The backing config file is only parsed on reload(), all hot paths read from memory.
+    """
+
+    def __init__(self):
+        self.config = {}
+        # number of in-memory reads and number of times the backing config was parsed
+        self.reads = 0
+        self.backend_reads = 0
+        # value() is also called from the HTTP server thread
+        self.statsLock = threading.Lock()
+        self.fileName = ""
+        self.reload()
+
+    @staticmethod
+    def open():
+        return QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
+
+    def reload(self):
+        settings = self.open()
+        config = {}
+        for group, values in DEFAULTS.items():
+            settings.beginGroup(group)
+            config[group] = {key: convert_value(settings.value(key, default), default)
+                             for key, default in values.items()}
+            settings.endGroup()
+        self.config = config
+        self.fileName = settings.fileName()
+        with self.statsLock:
+            self.backend_reads += 1
+
+    def value(self, group, key):
+        with self.statsLock:
+            self.reads += 1
+        return self.config[group][key]
+
+    def set_value(self, group, key, value):
+        # write through to the backing config
+        self.config.setdefault(group, {})[key] = value
+        settings = self.open()
+        settings.beginGroup(group)
+        settings.setValue(key, value)
+        settings.endGroup()
+
+    def stats(self):
+        with self.statsLock:
+            return {"reads": self.reads, "backend_reads": self.backend_reads}
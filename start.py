@@ -35,25 +35,48 @@
 #
 #############################################################################
 
+import json
 import os
 import re
+import select
+import selectors
 import signal
 import socket
 import sys
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import unquote
+from urllib.parse import parse_qs, unquote, urlsplit
 
-import ntplib
-from PyQt5.QtCore import Qt, QSettings, QCoreApplication, QTimer, QVariant, QDate, QThread, pyqtSignal
-from PyQt5.QtGui import QCursor, QPalette, QKeySequence, QIcon, QPixmap
-from PyQt5.QtNetwork import QUdpSocket, QNetworkInterface
+from PyQt5.QtCore import Qt, QCoreApplication, QTimer, QThread, pyqtSignal
+from PyQt5.QtGui import QColor, QCursor, QPalette, QKeySequence, QIcon, QPixmap
+from PyQt5.QtNetwork import QHostAddress, QUdpSocket, QNetworkInterface
 from PyQt5.QtWidgets import QApplication, QWidget, QShortcut, QDialog, QLineEdit, QVBoxLayout, QLabel
 
+from airtimer import AirTimer
+from command_protocol import ALL_TARGETS, decode_datagram, filter_targets
+from command_server import TcpCommandServer
+from latency_tracer import LatencyTracer
 from mainscreen import Ui_MainScreen
+from ntp_monitor import NtpMonitor
+from scheduler import TickScheduler
 from settings_functions import Settings, versionString
+from settings_store import SettingsStore, convert_value
+from statestream import StateStream
+from timesource import TimeSource
 
 HOST = '0.0.0.0'
+# seconds an HTTP request waits for its command to be applied
+HTTP_COMMAND_TIMEOUT = 2.0
+HTTP_KEEPALIVE_TIMEOUT = 5
+# seconds a worker waits for the next request on a keep-alive connection before parking it
+HTTP_LINGER = 0.002
+HTTP_MAX_BODY = 65536
+# longest long-poll on /status, waiting requests are parked without a worker
+HTTP_MAX_WAIT = 30
+# connections beyond workers * HTTP_QUEUE_FACTOR are rejected
+HTTP_QUEUE_FACTOR = 4
 
 
 class MainScreen(QWidget, Ui_MainScreen):
@@ -66,22 +89,40 @@ class MainScreen(QWidget, Ui_MainScreen):
         Ui_MainScreen.__init__(self)
         self.setupUi(self)
 
-        self.settings = Settings()
+        # the settings dialog is only built when it is needed, see get_settings(), the runtime reads self.config
+        self.settings = None
+        self.config = SettingsStore()
+        self.weatherWidget.setConfig(self.config)
+        # displayed time, optionally corrected by the NTP offset, read by clock, backtiming and AIR timers
+        self.timeSource = TimeSource()
+        self.clockWidget.setTimeSource(self.timeSource)
+        self.init_command_handlers()
+        # live state for subscribers of the HTTP API
+        self.stateStream = StateStream()
+        self.stateStream.start()
+        # optional command to pixel latency tracing, see GET /latency
+        self.latencyTracer = LatencyTracer(self)
+        for command, widgets in ((b"NOW", (self.labelCurrentSong,)), (b"NEXT", (self.labelNews,)),
+                                 (b"WARN", (self.labelWarning, self.labelCurrentSong)),
+                                 (b"LED1", (self.buttonLED1,)), (b"LED2", (self.buttonLED2,)),
+                                 (b"LED3", (self.buttonLED3,)), (b"LED4", (self.buttonLED4,)),
+                                 (b"AIR1", (self.AirLabel_1,)), (b"AIR2", (self.AirLabel_2,)),
+                                 (b"AIR3", (self.AirLabel_3,)), (b"AIR3TIME", (self.AirLabel_3,)),
+                                 (b"AIR4", (self.AirLabel_4,))):
+            self.latencyTracer.watch(command, *widgets)
+        # LED and AIR indicators are colored by switching cached palettes, no stylesheet parsing
+        self.indicatorPalettes = {}
+        for widget in (self.buttonLED1, self.buttonLED2, self.buttonLED3, self.buttonLED4,
+                       self.AirIcon_1, self.AirLabel_1, self.AirIcon_2, self.AirLabel_2,
+                       self.AirIcon_3, self.AirLabel_3, self.AirIcon_4, self.AirLabel_4):
+            widget.setStyleSheet("")
+            widget.setAutoFillBackground(True)
         self.restore_settings_from_config()
-        # quit app from settings window
-        self.settings.sigExitOAS.connect(self.exit_oas)
-        self.settings.sigRebootHost.connect(self.reboot_host)
-        self.settings.sigShutdownHost.connect(self.shutdown_host)
-        self.settings.sigConfigFinished.connect(self.config_finished)
-        self.settings.sigConfigClosed.connect(self.config_closed)
-
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("General")
-        if settings.value('fullscreen', True, type=bool):
+
+        if self.config.value("General", "fullscreen"):
             self.showFullScreen()
             app.setOverrideCursor(QCursor(Qt.BlankCursor))
-        settings.endGroup()
-        print("Loading Settings from: ", settings.fileName())
+        print("Loading Settings from: ", self.config.fileName)
 
         self.labelWarning.hide()
 
@@ -128,102 +169,95 @@ class MainScreen(QWidget, Ui_MainScreen):
         self.LED3on = False
         self.LED4on = False
 
-        # Setup and start timers
-        self.ctimer = QTimer()
-        self.ctimer.timeout.connect(self.constant_update)
-        self.ctimer.start(100)
-        # LED timers
-        self.timerLED1 = QTimer()
-        self.timerLED1.timeout.connect(self.toggle_led1)
-        self.timerLED2 = QTimer()
-        self.timerLED2.timeout.connect(self.toggle_led2)
-        self.timerLED3 = QTimer()
-        self.timerLED3.timeout.connect(self.toggle_led3)
-        self.timerLED4 = QTimer()
-        self.timerLED4.timeout.connect(self.toggle_led4)
-
-        # Setup OnAir Timers
-        self.timerAIR1 = QTimer()
-        self.timerAIR1.timeout.connect(self.update_air1_seconds)
-        self.Air1Seconds = 0
-        self.statusAIR1 = False
+        # LED flashing, toggled on every half second tick
+        self.ledFlashing = {1: False, 2: False, 3: False, 4: False}
+        self.ledToggle = {1: self.toggle_led1, 2: self.toggle_led2, 3: self.toggle_led3, 4: self.toggle_led4}
 
-        self.timerAIR2 = QTimer()
-        self.timerAIR2.timeout.connect(self.update_air2_seconds)
-        self.Air2Seconds = 0
+        # Setup OnAir Timers, the labels are refreshed on every half second tick
+        # the timers measure on the raw monotonic clock, NTP corrections never change logged on-air times
+        self.airTimers = {timer: AirTimer() for timer in range(1, 5)}
+        self.airLabels = {1: (self.AirLabel_1, "Mic"), 2: (self.AirLabel_2, "Phone"),
+                          3: (self.AirLabel_3, "Timer"), 4: (self.AirLabel_4, "Stream")}
+        self.airIcons = {1: self.AirIcon_1, 2: self.AirIcon_2, 3: self.AirIcon_3, 4: self.AirIcon_4}
+        self.statusAIR1 = False
         self.statusAIR2 = False
-
-        self.timerAIR3 = QTimer()
-        self.timerAIR3.timeout.connect(self.update_air3_seconds)
-        self.Air3Seconds = 0
         self.statusAIR3 = False
-        self.radioTimerMode = 0  # count up mode
-
-        self.timerAIR4 = QTimer()
-        self.timerAIR4.timeout.connect(self.update_air4_seconds)
-        self.Air4Seconds = 0
         self.statusAIR4 = False
-        self.streamTimerMode = 0  # count up mode
-
-        # Setup NTP Check Thread
-        self.checkNTPOffset = CheckNTPOffsetThread(self)
 
-        # Setup check NTP Timer
+        # Setup NTP monitor, it checks the configured servers in its own thread, see update_ntp_status()
         self.ntpHadWarning = True
         self.ntpWarnMessage = ""
-        self.timerNTP = QTimer()
-        self.timerNTP.timeout.connect(self.trigger_ntp_check)
-        # initial check
-        self.timerNTP.start(1000)
+        self.ntpMonitor = NtpMonitor()
+        self.update_ntp_monitor()
+        self.ntpMonitor.start()
 
-        # Setup UDP Socket
+        # Setup and start the central tick scheduler, it drives the clock, LEDs, AIR timers and backtiming
+        self.clockWidget.setExternalTick(True)
+        self.scheduler = TickScheduler(self, self.timeSource.time)
+        self.scheduler.sigHalfSecond.connect(self.half_second_tick)
+        self.scheduler.start()
+
+        # Setup UDP Socket, bound and joined to the multicast groups in update_udp_socket()
         self.udpsock = QUdpSocket()
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("Network")
-        port = int(settings.value('udpport', 3310))
-        settings.endGroup()
-        self.udpsock.bind(port, QUdpSocket.ShareAddress)
         self.udpsock.readyRead.connect(self.udp_cmd_handler)
+        self.multicastGroups = set()
+        self.update_udp_socket()
+
+        # Setup TCP Server, persistent connections with one ack per command
+        self.tcpServer = TcpCommandServer(self.parse_cmd, self)
+        self.update_tcp_server()
 
         # Setup HTTP Server
         self.httpd = HttpDaemon(self)
+        self.httpd.sigCommand.connect(self.http_cmd_handler, Qt.QueuedConnection)
         self.httpd.start()
 
         # display all host addresses
         self.display_all_hostaddresses()
 
-        # set NTP warning
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("NTP")
-        if settings.value('ntpcheck', True, type=bool):
-            self.ntpHadWarning = True
-            self.ntpWarnMessage = "waiting for NTP status check"
-        settings.endGroup()
-
         # do initial update check
-        self.settings.sigCheckForUpdate.emit()
+        if self.config.value("General", "updatecheck"):
+            self.get_settings().sigCheckForUpdate.emit()
+
+        self.publish_state()
+
+    def publish_state(self):
+        # full state for the state stream, changes are published where they happen
+        state = {
+            "now": self.labelCurrentSong.text(),
+            "next": self.labelNews.text(),
+            "warnings": list(self.warnings),
+            "led1": self.LED1on,
+            "led2": self.LED2on,
+            "led3": self.LED3on,
+            "led4": self.LED4on,
+            "ntp": {"synchronized": not self.ntpHadWarning, "message": self.ntpWarnMessage},
+        }
+        for timer, air_timer in self.airTimers.items():
+            state["air%d" % timer] = air_timer.published()
+        self.stateStream.update(state)
 
     def quit_oas(self):
         # do cleanup here
         print("Quitting, cleaning up...")
-        self.checkNTPOffset.stop()
+        self.ntpMonitor.stop()
         self.httpd.stop()
+        self.tcpServer.close()
+        self.stateStream.stop()
         QCoreApplication.instance().quit()
 
     def radio_timer_start_stop(self):
         self.start_stop_air3()
 
     def radio_timer_reset(self):
-        self.reset_air3()
-        self.radioTimerMode = 0  # count up mode
+        # back to count up mode
+        self.airTimers[3].set_countdown(0)
+        self.update_air_label(3)
 
     def radio_timer_set(self, seconds):
-        self.Air3Seconds = seconds
-        if seconds > 0:
-            self.radioTimerMode = 1  # count down mode
-        else:
-            self.radioTimerMode = 0  # count up mode
-        self.AirLabel_3.setText("Timer\n%d:%02d" % (self.Air3Seconds / 60, self.Air3Seconds % 60))
+        # count down from seconds, count up if 0
+        self.airTimers[3].set_countdown(seconds)
+        self.update_air_label(3)
 
     def get_timer_dialog(self):
         # generate and display timer input window
@@ -265,14 +299,26 @@ class MainScreen(QWidget, Ui_MainScreen):
         self.start_stop_air4()
 
     def stream_timer_reset(self):
-        self.reset_air4()
-        self.streamTimerMode = 0  # count up mode
+        self.airTimers[4].set_countdown(0)
+        self.update_air_label(4)
+
+    def get_settings(self):
+        # build the settings dialog on first use
+        if self.settings is None:
+            self.settings = Settings()
+            # quit app from settings window
+            self.settings.sigExitOAS.connect(self.exit_oas)
+            self.settings.sigRebootHost.connect(self.reboot_host)
+            self.settings.sigShutdownHost.connect(self.shutdown_host)
+            self.settings.sigConfigFinished.connect(self.config_finished)
+            self.settings.sigConfigClosed.connect(self.config_closed)
+        return self.settings
 
     def show_settings(self):
         global app
         # un-hide mouse cursor
         app.setOverrideCursor(QCursor(Qt.ArrowCursor))
-        self.settings.showsettings()
+        self.get_settings().showsettings()
 
     def display_all_hostaddresses(self):
         v4addrs = list()
@@ -286,210 +332,252 @@ class MainScreen(QWidget, Ui_MainScreen):
         self.set_current_song_text(", ".join(["%s" % addr for addr in v4addrs]))
         self.set_news_text(", ".join(["%s" % addr for addr in v6addrs]))
 
-    def parse_cmd(self, data):
+    def init_command_handlers(self):
+        # command name -> handler(value), see parse_cmd()
+        self.commandHandlers = {
+            b"NOW": self.set_current_song_text,
+            b"NEXT": self.set_news_text,
+            b"LED1": lambda value: self.led_logic(1, value != "OFF"),
+            b"LED2": lambda value: self.led_logic(2, value != "OFF"),
+            b"LED3": lambda value: self.led_logic(3, value != "OFF"),
+            b"LED4": lambda value: self.led_logic(4, value != "OFF"),
+            b"WARN": self.set_warning_text,
+            b"AIR1": lambda value: self.set_air1(value != "OFF"),
+            b"AIR2": lambda value: self.set_air2(value != "OFF"),
+            b"AIR3": self.command_air3,
+            b"AIR3TIME": self.command_air3_time,
+            b"AIR4": self.command_air4,
+            b"CMD": self.command_cmd,
+            b"CONF": self.command_conf,
+        }
+
+        # (group, param) -> handler(content) for CONF commands, they change the settings dialog
+        settings = self.get_settings
+        self.confHandlers = {
+            ("General", "stationname"): lambda content: settings().StationName.setText(content),
+            ("General", "slogan"): lambda content: settings().Slogan.setText(content),
+            ("General", "stationcolor"): lambda content: settings().setStationNameColor(QColor(content)),
+            ("General", "slogancolor"): lambda content: settings().setSloganColor(QColor(content)),
+            ("Clock", "digital"): self.conf_clock_digital,
+            ("Clock", "showseconds"): lambda content: self.conf_checkbox(settings().showSeconds, content),
+            ("Clock", "staticcolon"): lambda content: self.conf_checkbox(settings().staticColon, content),
+            ("Clock", "digitalhourcolor"): lambda content: settings().setDigitalHourColor(QColor(content)),
+            ("Clock", "digitalsecondcolor"): lambda content: settings().setDigitalSecondColor(QColor(content)),
+            ("Clock", "digitaldigitcolor"): lambda content: settings().setDigitalDigitColor(QColor(content)),
+            ("Clock", "logopath"): lambda content: settings().setLogoPath(content),
+            ("Network", "udpport"): lambda content: settings().udpport.setText(content),
+            ("Network", "tcpport"): lambda content: settings().tcpport.setText(content),
+            ("Network", "multicastgroups"): lambda content: settings().multicastGroups.setText(content),
+            ("Network", "screenid"): lambda content: settings().screenId.setText(content),
+            ("Network", "screentags"): lambda content: settings().screenTags.setText(content),
+            ("CONF", "APPLY"): self.conf_apply,
+        }
+        for led in range(1, 5):
+            group = "LED%d" % led
+            self.confHandlers.update({
+                (group, "used"): lambda content, led=led: self.conf_bool(getattr(settings(), "LED%d" % led), content),
+                (group, "text"): lambda content, led=led: getattr(settings(), "LED%dText" % led).setText(content),
+                (group, "activebgcolor"): lambda content, led=led: getattr(settings(), "setLED%dBGColor" % led)(
+                    QColor(content)),
+                (group, "activetextcolor"): lambda content, led=led: getattr(settings(), "setLED%dFGColor" % led)(
+                    QColor(content)),
+                (group, "autoflash"): lambda content, led=led: self.conf_bool(
+                    getattr(settings(), "LED%dAutoflash" % led), content),
+                (group, "timedflash"): lambda content, led=led: self.conf_bool(
+                    getattr(settings(), "LED%dTimedflash" % led), content),
+            })
+
+        # commands that only set a state, of these only the last value received in one pass of the event loop is
+        # applied, see flush_commands()
+        self.coalescedCommands = {b"NOW", b"NEXT", b"WARN", b"LED1", b"LED2", b"LED3", b"LED4", b"AIR1", b"AIR2"}
+        self.pendingCommands = {}
+        # fires once the pending socket events are handled, a single command is not delayed
+        self.flushTimer = QTimer(self)
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.setInterval(0)
+        self.flushTimer.timeout.connect(self.flush_commands)
+        self.commandStats = {"received": 0, "applied": 0, "coalesced": 0, "flushes": 0}
+
+    def parse_cmd(self, data, received=None):
+        # data is a single command or a whole batch, text or binary, see command_protocol.py
+        # received is the perf_counter() time the data arrived, for the latency tracing
+        tracer = self.latencyTracer
+        if tracer.enabled and received is None:
+            received = time.perf_counter()
+        data, skipped = filter_targets(data, self.commandTargets)
+        commands = decode_datagram(data)
+        results = [{"command": command.decode("utf_8", "replace"), "status": "other screen"} for command in skipped]
+        for command, value in commands:
+            handler = self.commandHandlers.get(command)
+            if handler is None:
+                print("ERROR: unknown command", command)
+                results.append({"command": command.decode("utf_8", "replace"), "status": "unknown command"})
+                continue
+            results.append({"command": command.decode(), "status": "ok"})
+            self.commandStats["received"] += 1
+            if tracer.enabled:
+                tracer.receive(command, received)
+            if command in self.coalescedCommands:
+                if command in self.pendingCommands:
+                    self.commandStats["coalesced"] += 1
+                self.pendingCommands[command] = value
+                if not self.flushTimer.isActive():
+                    self.flushTimer.start()
+            else:
+                # everything received before this command is applied first
+                self.flush_commands()
+                handler(value)
+                self.commandStats["applied"] += 1
+                if tracer.enabled:
+                    tracer.dispatch(command)
+        return results
+
+    def flush_commands(self):
+        # apply the final value of every pending state, at the end of the event loop pass or before other commands
+        self.flushTimer.stop()
+        if not self.pendingCommands:
+            return
+        pending = self.pendingCommands
+        self.pendingCommands = {}
+        for command, value in pending.items():
+            self.commandHandlers[command](value)
+            if self.latencyTracer.enabled:
+                self.latencyTracer.dispatch(command)
+        self.commandStats["applied"] += len(pending)
+        self.commandStats["flushes"] += 1
+
+    def set_warning_text(self, value):
+        if value:
+            self.add_warning(value, 1)
+        else:
+            self.remove_warning(1)
+
+    def command_air3(self, value):
+        if value == "OFF":
+            self.stop_air3()
+        if value == "ON":
+            self.start_air3()
+        if value == "RESET":
+            self.radio_timer_reset()
+        if value == "TOGGLE":
+            self.radio_timer_start_stop()
+
+    def command_air3_time(self, value):
         try:
-            (command, value) = data.decode('utf_8').split(':', 1)
+            self.radio_timer_set(int(value))
+        except ValueError as e:
+            print("ERROR: invalid value", e)
+
+    def command_air4(self, value):
+        if value == "OFF":
+            self.set_air4(False)
+        if value == "ON":
+            self.set_air4(True)
+        if value == "RESET":
+            self.stream_timer_reset()
+
+    def command_cmd(self, value):
+        if value == "REBOOT":
+            self.reboot_host()
+        if value == "SHUTDOWN":
+            self.shutdown_host()
+        if value == "QUIT":
+            # after this command was answered, an HTTP request waits for it
+            QTimer.singleShot(0, self.quit_oas)
+
+    def command_conf(self, value):
+        # split group, config and values and apply them
+        try:
+            (group, paramvalue) = value.split(':', 1)
+            (param, content) = paramvalue.split('=', 1)
         except ValueError:
-            return False
+            return
 
-        command = str(command)
-        value = str(value)
-        # print("command: >" + command + "<")
-        # print("value: >" + value + "<")
-        if command == "NOW":
-            self.set_current_song_text(value)
-        elif command == "NEXT":
-            self.set_news_text(value)
-        elif command == "LED1":
-            if value == "OFF":
-                self.led_logic(1, False)
-            else:
-                self.led_logic(1, True)
-        elif command == "LED2":
-            if value == "OFF":
-                self.led_logic(2, False)
-            else:
-                self.led_logic(2, True)
-        elif command == "LED3":
-            if value == "OFF":
-                self.led_logic(3, False)
-            else:
-                self.led_logic(3, True)
-        elif command == "LED4":
-            if value == "OFF":
-                self.led_logic(4, False)
-            else:
-                self.led_logic(4, True)
-        elif command == "WARN":
-            if value:
-                self.add_warning(value, 1)
-            else:
-                self.remove_warning(1)
+        # changes only reach the config on APPLY, config_finished() reloads it then
+        handler = self.confHandlers.get((group, param))
+        if handler is not None:
+            handler(content)
 
-        elif command == "AIR1":
-            if value == "OFF":
-                self.set_air1(False)
-            else:
-                self.set_air1(True)
+    @staticmethod
+    def conf_bool(checkbox, content):
+        checkbox.setChecked(convert_value(content, False))
 
-        elif command == "AIR2":
-            if value == "OFF":
-                self.set_air2(False)
+    @staticmethod
+    def conf_checkbox(checkbox, content):
+        # only exact True/False change the checkbox
+        if content == "True":
+            checkbox.setChecked(True)
+        elif content == "False":
+            checkbox.setChecked(False)
+
+    def conf_clock_digital(self, content):
+        if content == "True":
+            self.get_settings().clockDigital.setChecked(True)
+            self.get_settings().clockAnalog.setChecked(False)
+        elif content == "False":
+            self.get_settings().clockDigital.setChecked(False)
+            self.get_settings().clockAnalog.setChecked(True)
+
+    def conf_apply(self, content):
+        if content == "TRUE":
+            if self.settings is None:
+                # nothing was changed in the dialog, just pick up the config
+                self.config_finished()
             else:
-                self.set_air2(True)
-
-        elif command == "AIR3":
-            if value == "OFF":
-                self.stop_air3()
-            if value == "ON":
-                self.start_air3()
-            if value == "RESET":
-                self.radio_timer_reset()
-            if value == "TOGGLE":
-                self.radio_timer_start_stop()
-
-        elif command == "AIR3TIME":
-            try:
-                self.radio_timer_set(int(value))
-            except ValueError as e:
-                print("ERROR: invalid value", e)
-
-        elif command == "AIR4":
-            if value == "OFF":
-                self.set_air4(False)
-            if value == "ON":
-                self.set_air4(True)
-            if value == "RESET":
-                self.stream_timer_reset()
-
-        elif command == "CMD":
-            if value == "REBOOT":
-                self.reboot_host()
-            if value == "SHUTDOWN":
-                self.shutdown_host()
-            if value == "QUIT":
-                self.quit_oas()
-
-        elif command == "CONF":
-            # split group, config and values and apply them
-            try:
-                (group, paramvalue) = value.split(':', 1)
-                (param, content) = paramvalue.split('=', 1)
-                # print "CONF:", param, content
-            except ValueError:
-                return
+                # apply and save settings
+                self.settings.applySettings()
 
-            if group == "General":
-                if param == "stationname":
-                    self.settings.StationName.setText(content)
-                elif param == "slogan":
-                    self.settings.Slogan.setText(content)
-                elif param == "stationcolor":
-                    self.settings.setStationNameColor(self.settings.getColorFromName(content))
-                elif param == "slogancolor":
-                    self.settings.setSloganColor(self.settings.getColorFromName(content))
-
-            elif group == "LED1":
-                if param == "used":
-                    self.settings.LED1.setChecked(QVariant(content).toBool())
-                elif param == "text":
-                    self.settings.LED1Text.setText(content)
-                elif param == "activebgcolor":
-                    self.settings.setLED1BGColor(self.settings.getColorFromName(content))
-                elif param == "activetextcolor":
-                    self.settings.setLED1FGColor(self.settings.getColorFromName(content))
-                elif param == "autoflash":
-                    self.settings.LED1Autoflash.setChecked(QVariant(content).toBool())
-                elif param == "timedflash":
-                    self.settings.LED1Timedflash.setChecked(QVariant(content).toBool())
-
-            elif group == "LED2":
-                if param == "used":
-                    self.settings.LED2.setChecked(QVariant(content).toBool())
-                elif param == "text":
-                    self.settings.LED2Text.setText(content)
-                elif param == "activebgcolor":
-                    self.settings.setLED2BGColor(self.settings.getColorFromName(content))
-                elif param == "activetextcolor":
-                    self.settings.setLED2FGColor(self.settings.getColorFromName(content))
-                elif param == "autoflash":
-                    self.settings.LED2Autoflash.setChecked(QVariant(content).toBool())
-                elif param == "timedflash":
-                    self.settings.LED2Timedflash.setChecked(QVariant(content).toBool())
-
-            elif group == "LED3":
-                if param == "used":
-                    self.settings.LED3.setChecked(QVariant(content).toBool())
-                elif param == "text":
-                    self.settings.LED3Text.setText(content)
-                elif param == "activebgcolor":
-                    self.settings.setLED3BGColor(self.settings.getColorFromName(content))
-                elif param == "activetextcolor":
-                    self.settings.setLED3FGColor(self.settings.getColorFromName(content))
-                elif param == "autoflash":
-                    self.settings.LED3Autoflash.setChecked(QVariant(content).toBool())
-                elif param == "timedflash":
-                    self.settings.LED3Timedflash.setChecked(QVariant(content).toBool())
-
-            elif group == "LED4":
-                if param == "used":
-                    self.settings.LED4.setChecked(QVariant(content).toBool())
-                elif param == "text":
-                    self.settings.LED4Text.setText(content)
-                elif param == "activebgcolor":
-                    self.settings.setLED4BGColor(self.settings.getColorFromName(content))
-                elif param == "activetextcolor":
-                    self.settings.setLED4FGColor(self.settings.getColorFromName(content))
-                elif param == "autoflash":
-                    self.settings.LED4Autoflash.setChecked(QVariant(content).toBool())
-                elif param == "timedflash":
-                    self.settings.LED4Timedflash.setChecked(QVariant(content).toBool())
-
-            elif group == "Clock":
-                if param == "digital":
-                    if content == "True":
-                        self.settings.clockDigital.setChecked(True)
-                        self.settings.clockAnalog.setChecked(False)
-                    elif content == "False":
-                        self.settings.clockAnalog.setChecked(False)
-                        self.settings.clockDigital.setChecked(True)
-                elif param == "showseconds":
-                    if content == "True":
-                        self.settings.showSeconds.setChecked(True)
-                    elif content == "False":
-                        self.settings.showSeconds.setChecked(False)
-                elif param == "staticcolon":
-                    if content == "True":
-                        self.settings.staticColon.setChecked(True)
-                    elif content == "False":
-                        self.settings.staticColon.setChecked(False)
-                elif param == "digitalhourcolor":
-                    self.settings.setDigitalHourColor(self.settings.getColorFromName(content))
-                elif param == "digitalsecondcolor":
-                    self.settings.setDigitalSecondColor(self.settings.getColorFromName(content))
-                elif param == "digitaldigitcolor":
-                    self.settings.setDigitalDigitColor(self.settings.getColorFromName(content))
-                elif param == "logopath":
-                    self.settings.setLogoPath(content)
-
-            elif group == "Network":
-                if param == "udpport":
-                    self.settings.udpport.setText(content)
-
-            elif group == "CONF":
-                if param == "APPLY":
-                    if content == "TRUE":
-                        # apply and save settings
-                        self.settings.applySettings()
+    def http_cmd_handler(self, command):
+        try:
+            command.results = self.parse_cmd(command.data, command.received)
+            # the HTTP reply waits until the commands are on screen
+            self.flush_commands()
+        finally:
+            command.done.set()
+
+    def update_udp_socket(self):
+        # (re)bind to the configured port and join the configured multicast groups
+        config = self.config
+        groups = {group.strip() for group in config.value("Network", "multicastgroups").split(",") if group.strip()}
+        port = config.value("Network", "udpport")
+        # multicast groups can only be joined on an IPv4 socket
+        address = QHostAddress(QHostAddress.AnyIPv4 if groups else QHostAddress.Any)
+        if (self.udpsock.state() != QUdpSocket.BoundState or self.udpsock.localPort() != port
+                or self.udpsock.localAddress() != address):
+            self.udpsock.close()
+            self.multicastGroups = set()
+            # several screens on one host can share the port and all receive the multicast commands
+            if not self.udpsock.bind(address, port, QUdpSocket.ShareAddress | QUdpSocket.ReuseAddressHint):
+                print("ERROR: Binding UDP port", port, self.udpsock.errorString())
+                return
+        for group in self.multicastGroups - groups:
+            self.udpsock.leaveMulticastGroup(QHostAddress(group))
+            self.multicastGroups.discard(group)
+        for group in groups - self.multicastGroups:
+            if self.udpsock.joinMulticastGroup(QHostAddress(group)):
+                self.multicastGroups.add(group)
+            else:
+                print("ERROR: Joining multicast group", group, self.udpsock.errorString())
+
+    def update_tcp_server(self):
+        # (re)listen on the configured port, connections to the old port are closed
+        server = self.tcpServer.server
+        port = self.config.value("Network", "tcpport")
+        if not server.isListening() or server.serverPort() != port:
+            self.tcpServer.close()
+            self.tcpServer.listen(port)
+
+    def update_command_targets(self):
+        # ids and tags this screen answers to in "@TARGET:" prefixed commands, the screen id defaults to the hostname
+        config = self.config
+        names = [config.value("Network", "screenid") or socket.gethostname()]
+        names += config.value("Network", "screentags").split(",")
+        self.commandTargets = {ALL_TARGETS} | {name.strip().lower().encode() for name in names if name.strip()}
 
     def udp_cmd_handler(self):
         while self.udpsock.hasPendingDatagrams():
             data, host, port = self.udpsock.readDatagram(self.udpsock.pendingDatagramSize())
-            # print("DATA: ", data)
-            lines = data.splitlines()
-            for line in lines:
-                # print("Line:", line)
-                self.parse_cmd(line)
+            self.parse_cmd(data, time.perf_counter())
 
     def manual_toggle_led1(self):
         if self.LED1on:
@@ -572,34 +660,34 @@ class MainScreen(QWidget, Ui_MainScreen):
     def led_logic(self, led, state):
         if state:
             if led == 1:
-                if self.settings.LED1Autoflash.isChecked():
-                    self.timerLED1.start(500)
-                if self.settings.LED1Timedflash.isChecked():
-                    self.timerLED1.start(500)
+                if self.config.value("LED1", "autoflash"):
+                    self.ledFlashing[1] = True
+                if self.config.value("LED1", "timedflash"):
+                    self.ledFlashing[1] = True
                     QTimer.singleShot(20000, self.unset_led1)
                 self.set_led1(state)
                 self.LED1on = state
             if led == 2:
-                if self.settings.LED2Autoflash.isChecked():
-                    self.timerLED2.start(500)
-                if self.settings.LED2Timedflash.isChecked():
-                    self.timerLED2.start(500)
+                if self.config.value("LED2", "autoflash"):
+                    self.ledFlashing[2] = True
+                if self.config.value("LED2", "timedflash"):
+                    self.ledFlashing[2] = True
                     QTimer.singleShot(20000, self.unset_led2)
                 self.set_led2(state)
                 self.LED2on = state
             if led == 3:
-                if self.settings.LED3Autoflash.isChecked():
-                    self.timerLED3.start(500)
-                if self.settings.LED3Timedflash.isChecked():
-                    self.timerLED3.start(500)
+                if self.config.value("LED3", "autoflash"):
+                    self.ledFlashing[3] = True
+                if self.config.value("LED3", "timedflash"):
+                    self.ledFlashing[3] = True
                     QTimer.singleShot(20000, self.unset_led3)
                 self.set_led3(state)
                 self.LED3on = state
             if led == 4:
-                if self.settings.LED4Autoflash.isChecked():
-                    self.timerLED4.start(500)
-                if self.settings.LED4Timedflash.isChecked():
-                    self.timerLED4.start(500)
+                if self.config.value("LED4", "autoflash"):
+                    self.ledFlashing[4] = True
+                if self.config.value("LED4", "timedflash"):
+                    self.ledFlashing[4] = True
                     QTimer.singleShot(20000, self.unset_led4)
                 self.set_led4(state)
                 self.LED4on = state
@@ -607,20 +695,21 @@ class MainScreen(QWidget, Ui_MainScreen):
         if not state:
             if led == 1:
                 self.set_led1(state)
-                self.timerLED1.stop()
+                self.ledFlashing[1] = False
                 self.LED1on = state
             if led == 2:
                 self.set_led2(state)
-                self.timerLED2.stop()
+                self.ledFlashing[2] = False
                 self.LED2on = state
             if led == 3:
                 self.set_led3(state)
-                self.timerLED3.stop()
+                self.ledFlashing[3] = False
                 self.LED3on = state
             if led == 4:
                 self.set_led4(state)
-                self.timerLED4.stop()
+                self.ledFlashing[4] = False
                 self.LED4on = state
+        self.stateStream.update({"led%d" % led: state})
 
     def set_station_color(self, newcolor):
         palette = self.labelStation.palette()
@@ -632,87 +721,103 @@ class MainScreen(QWidget, Ui_MainScreen):
         palette.setColor(QPalette.WindowText, newcolor)
         self.labelSlogan.setPalette(palette)
 
+    @staticmethod
+    def indicator_palette(text_color, bg_color):
+        palette = QPalette()
+        palette.setColor(QPalette.WindowText, QColor(text_color))
+        palette.setColor(QPalette.Window, QColor(bg_color))
+        return palette
+
+    def update_indicator_palettes(self):
+        # precompute all indicator states once per config change
+        config = self.config
+        self.indicatorPalettes = {
+            "inactive": self.indicator_palette(config.value("LEDS", "inactivetextcolor"),
+                                               config.value("LEDS", "inactivebgcolor")),
+            "AIR": self.indicator_palette("#000000", "#FF0000"),
+        }
+        for led in ("LED1", "LED2", "LED3", "LED4"):
+            self.indicatorPalettes[led] = self.indicator_palette(config.value(led, "activetextcolor"),
+                                                                 config.value(led, "activebgcolor"))
+
+    def refresh_indicators(self):
+        # re-apply the current states after the palettes changed
+        self.set_led1(self.statusLED1)
+        self.set_led2(self.statusLED2)
+        self.set_led3(self.statusLED3)
+        self.set_led4(self.statusLED4)
+        self.set_air_indicator(1, self.statusAIR1)
+        self.set_air_indicator(2, self.statusAIR2)
+        self.set_air_indicator(3, self.statusAIR3)
+        self.set_air_indicator(4, self.statusAIR4)
+
     def restore_settings_from_config(self):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("General")
-        self.labelStation.setText(settings.value('stationname', 'Radio Eriwan'))
-        self.labelSlogan.setText(settings.value('slogan', 'Your question is our motivation'))
-        self.set_station_color(self.settings.getColorFromName(settings.value('stationcolor', '#FFAA00')))
-        self.set_slogan_color(self.settings.getColorFromName(settings.value('slogancolor', '#FFAA00')))
-        settings.endGroup()
-
-        settings.beginGroup("LED1")
-        self.set_led1_text(settings.value('text', 'ON AIR'))
-        self.buttonLED1.setVisible(settings.value('used', True, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("LED2")
-        self.set_led2_text(settings.value('text', 'PHONE'))
-        self.buttonLED2.setVisible(settings.value('used', True, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("LED3")
-        self.set_led3_text(settings.value('text', 'DOORBELL'))
-        self.buttonLED3.setVisible(settings.value('used', True, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("LED4")
-        self.set_led4_text(settings.value('text', 'EAS ACTIVE'))
-        self.buttonLED4.setVisible(settings.value('used', True, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("Clock")
-        self.clockWidget.setClockMode(settings.value('digital', True, type=bool))
-        self.clockWidget.setDigiHourColor(
-            self.settings.getColorFromName(settings.value('digitalhourcolor', '#3232FF')))
-        self.clockWidget.setDigiSecondColor(
-            self.settings.getColorFromName(settings.value('digitalsecondcolor', '#FF9900')))
-        self.clockWidget.setDigiDigitColor(
-            self.settings.getColorFromName(settings.value('digitaldigitcolor', '#3232FF')))
-        self.clockWidget.setLogo(
-            settings.value('logopath', ':/astrastudio_logo/images/astrastudio_transparent.png'))
-        self.clockWidget.setShowSeconds(settings.value('showSeconds', False, type=bool))
-        self.clockWidget.setStaticColon(settings.value('staticColon', False, type=bool))
-        self.labelTextRight.setVisible(settings.value('useTextClock', True, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("Formatting")
-        self.clockWidget.setAmPm(settings.value('isAmPm', False, type=bool))
-        settings.endGroup()
-
-        settings.beginGroup("WeatherWidget")
-        if settings.value('owmWidgetEnabled', False, type=bool):
-            pass
+        config = self.config
+        self.update_indicator_palettes()
+        self.update_command_targets()
+        self.timeSource.set_enabled(config.value("NTP", "ntpcorrection"))
+        self.latencyTracer.set_enabled(config.value("General", "latencytracing"))
+        self.labelStation.setText(config.value("General", "stationname"))
+        self.labelSlogan.setText(config.value("General", "slogan"))
+        self.set_station_color(QColor(config.value("General", "stationcolor")))
+        self.set_slogan_color(QColor(config.value("General", "slogancolor")))
+
+        self.set_led1_text(config.value("LED1", "text"))
+        self.buttonLED1.setVisible(config.value("LED1", "used"))
+        self.set_led2_text(config.value("LED2", "text"))
+        self.buttonLED2.setVisible(config.value("LED2", "used"))
+        self.set_led3_text(config.value("LED3", "text"))
+        self.buttonLED3.setVisible(config.value("LED3", "used"))
+        self.set_led4_text(config.value("LED4", "text"))
+        self.buttonLED4.setVisible(config.value("LED4", "used"))
+
+        self.clockWidget.setClockMode(config.value("Clock", "digital"))
+        self.clockWidget.setDigiHourColor(QColor(config.value("Clock", "digitalhourcolor")))
+        self.clockWidget.setDigiSecondColor(QColor(config.value("Clock", "digitalsecondcolor")))
+        self.clockWidget.setDigiDigitColor(QColor(config.value("Clock", "digitaldigitcolor")))
+        self.clockWidget.setLogo(config.value("Clock", "logopath"))
+        self.clockWidget.setShowSeconds(config.value("Clock", "showSeconds"))
+        self.clockWidget.setStaticColon(config.value("Clock", "staticColon"))
+        self.clockWidget.setSweepFps(config.value("Clock", "sweepFps"))
+        self.clockWidget.setSweepBudget(config.value("Clock", "sweepBudget"))
+        self.clockWidget.setSmoothSeconds(config.value("Clock", "smoothSeconds"))
+        self.labelTextRight.setVisible(config.value("Clock", "useTextClock"))
+
+        self.clockWidget.setAmPm(config.value("Formatting", "isAmPm"))
+
+        if config.value("WeatherWidget", "owmWidgetEnabled"):
             self.weatherWidget.show()
         else:
             self.weatherWidget.hide()
 
-        settings.endGroup()
-
-        settings.beginGroup("Timers")
-        if not settings.value('TimerAIR1Enabled', True, type=bool):
+        if not config.value("Timers", "TimerAIR1Enabled"):
             self.AirLED_1.hide()
         else:
             self.AirLED_1.show()
-        if not settings.value('TimerAIR2Enabled', True, type=bool):
+        if not config.value("Timers", "TimerAIR2Enabled"):
             self.AirLED_2.hide()
         else:
             self.AirLED_2.show()
-        if not settings.value('TimerAIR3Enabled', True, type=bool):
+        if not config.value("Timers", "TimerAIR3Enabled"):
             self.AirLED_3.hide()
         else:
             self.AirLED_3.show()
-        if not settings.value('TimerAIR4Enabled', True, type=bool):
+        if not config.value("Timers", "TimerAIR4Enabled"):
             self.AirLED_4.hide()
         else:
             self.AirLED_4.show()
-        settings.endGroup()
-
-
 
+    def half_second_tick(self, full_second):
+        # one pass over everything following the wall clock
+        self.clockWidget.tick()
+        for led, flashing in self.ledFlashing.items():
+            if flashing:
+                self.ledToggle[led]()
+        self.update_air_timers()
+        self.constant_update()
 
     def constant_update(self):
-        # slot for constant timer timeout
+        # slot for the scheduler's half second tick
         self.update_date()
         self.update_backtiming_text()
         self.update_backtiming_seconds()
@@ -720,20 +825,15 @@ class MainScreen(QWidget, Ui_MainScreen):
         self.process_warnings()
 
     def update_date(self):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("Formatting")
-        self.set_left_text(QDate.currentDate().toString(settings.value('dateFormat', 'dddd, dd. MMMM yyyy')))
-        settings.endGroup()
+        date = self.timeSource.qdatetime().date()
+        self.set_left_text(date.toString(self.config.value("Formatting", "dateFormat")))
 
     def update_backtiming_text(self):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("Formatting")
-        text_clock_language = settings.value('textClockLanguage', 'English')
-        is_am_pm = settings.value('isAmPm', False, type=bool)
-        settings.endGroup()
+        text_clock_language = self.config.value("Formatting", "textClockLanguage")
+        is_am_pm = self.config.value("Formatting", "isAmPm")
 
         string = ""
-        now = datetime.now()
+        now = self.timeSource.datetime()
         hour = now.hour
         minute = now.minute
         remain_min = 60 - minute
@@ -777,114 +877,74 @@ class MainScreen(QWidget, Ui_MainScreen):
         self.set_right_text(string)
 
     def update_backtiming_seconds(self):
-        now = datetime.now()
+        now = self.timeSource.datetime()
         second = now.second
         remain_seconds = 60 - second
         self.set_backtiming_secs(remain_seconds)
 
     def update_ntp_status(self):
+        status = self.ntpMonitor.status()
+        self.timeSource.add_sample(status)
+        self.ntpHadWarning = not status["synchronized"]
+        self.ntpWarnMessage = status["message"]
         if self.ntpHadWarning and len(self.ntpWarnMessage):
             self.add_warning(self.ntpWarnMessage, 0)
         else:
-            self.ntpWarnMessage = ""
             self.remove_warning(0)
+        self.stateStream.update({"ntp": {"synchronized": not self.ntpHadWarning, "message": self.ntpWarnMessage}})
 
     def toggle_full_screen(self):
         global app
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("General")
-        if not settings.value('fullscreen', True, type=bool):
+        if not self.config.value("General", "fullscreen"):
             self.showFullScreen()
             app.setOverrideCursor(QCursor(Qt.BlankCursor))
-            settings.setValue('fullscreen', True)
+            self.config.set_value("General", "fullscreen", True)
         else:
             self.showNormal()
             app.setOverrideCursor(QCursor(Qt.ArrowCursor))
-            settings.setValue('fullscreen', False)
-        settings.endGroup()
+            self.config.set_value("General", "fullscreen", False)
 
     def set_air1(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            self.Air1Seconds = 0
-            self.AirLabel_1.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirIcon_1.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirLabel_1.setText("Mic\n%d:%02d" % (self.Air1Seconds / 60, self.Air1Seconds % 60))
+            self.airTimers[1].reset()
+            self.airTimers[1].start()
+            self.set_air_indicator(1, True)
+            self.update_air_label(1)
             self.statusAIR1 = True
-            # AIR1 timer
-            self.timerAIR1.start(1000)
         else:
-            settings.beginGroup("LEDS")
-            self.AirIcon_1.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                   '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            self.AirLabel_1.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.set_air_indicator(1, False)
             self.statusAIR1 = False
-            self.timerAIR1.stop()
-
-    def update_air1_seconds(self):
-        self.Air1Seconds += 1
-        self.AirLabel_1.setText("Mic\n%d:%02d" % (self.Air1Seconds / 60, self.Air1Seconds % 60))
+            self.airTimers[1].stop()
+            self.update_air_label(1)
 
     def set_air2(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            self.Air2Seconds = 0
-            self.AirLabel_2.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirIcon_2.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirLabel_2.setText("Phone\n%d:%02d" % (self.Air2Seconds / 60, self.Air2Seconds % 60))
+            self.airTimers[2].reset()
+            self.airTimers[2].start()
+            self.set_air_indicator(2, True)
+            self.update_air_label(2)
             self.statusAIR2 = True
-            # AIR2 timer
-            self.timerAIR2.start(1000)
         else:
-            settings.beginGroup("LEDS")
-            self.AirIcon_2.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                   '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            self.AirLabel_2.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.set_air_indicator(2, False)
             self.statusAIR2 = False
-            self.timerAIR2.stop()
-
-    def update_air2_seconds(self):
-        self.Air2Seconds += 1
-        self.AirLabel_2.setText("Phone\n%d:%02d" % (self.Air2Seconds / 60, self.Air2Seconds % 60))
+            self.airTimers[2].stop()
+            self.update_air_label(2)
 
     def reset_air3(self):
-        self.timerAIR3.stop()
-        self.Air3Seconds = 0
-        self.AirLabel_3.setText("Timer\n%d:%02d" % (self.Air3Seconds / 60, self.Air3Seconds % 60))
-        if self.statusAIR3:
-            self.timerAIR3.start(1000)
+        self.airTimers[3].reset()
+        self.update_air_label(3)
 
     def set_air3(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            self.AirLabel_3.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirIcon_3.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirLabel_3.setText("Timer\n%d:%02d" % (self.Air3Seconds / 60, self.Air3Seconds % 60))
+            self.set_air_indicator(3, True)
             self.statusAIR3 = True
-            # subtract initial second on countdown with display update
-            if self.radioTimerMode == 1 and self.Air3Seconds > 1:
-                self.update_air3_seconds()
-            # AIR3 timer
-            self.timerAIR3.start(1000)
+            self.airTimers[3].start()
+            self.update_air_label(3)
         else:
-            settings.beginGroup("LEDS")
-            self.AirIcon_3.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                   '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            self.AirLabel_3.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.set_air_indicator(3, False)
             self.statusAIR3 = False
-            self.timerAIR3.stop()
+            self.airTimers[3].stop()
+            self.update_air_label(3)
 
     def start_stop_air3(self):
         if not self.statusAIR3:
@@ -898,46 +958,21 @@ class MainScreen(QWidget, Ui_MainScreen):
     def stop_air3(self):
         self.set_air3(False)
 
-    def update_air3_seconds(self):
-        if self.radioTimerMode == 0:  # count up mode
-            self.Air3Seconds += 1
-        else:
-            self.Air3Seconds -= 1
-            if self.Air3Seconds < 1:
-                self.stop_air3()
-                self.radioTimerMode = 0
-        self.AirLabel_3.setText("Timer\n%d:%02d" % (self.Air3Seconds / 60, self.Air3Seconds % 60))
-
     def reset_air4(self):
-        self.timerAIR4.stop()
-        self.Air4Seconds = 0
-        self.AirLabel_4.setText("Stream\n%d:%02d" % (self.Air4Seconds / 60, self.Air4Seconds % 60))
-        if self.statusAIR4:
-            self.timerAIR4.start(1000)
+        self.airTimers[4].reset()
+        self.update_air_label(4)
 
     def set_air4(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            self.AirLabel_4.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirIcon_4.setStyleSheet("color: #000000; background-color: #FF0000")
-            self.AirLabel_4.setText("Stream\n%d:%02d" % (self.Air4Seconds / 60, self.Air4Seconds % 60))
+            self.set_air_indicator(4, True)
             self.statusAIR4 = True
-            # substract initial second on countdown with display update
-            if self.streamTimerMode == 1 and self.Air4Seconds > 1:
-                self.update_air4_seconds()
-            # AIR4 timer
-            self.timerAIR4.start(1000)
+            self.airTimers[4].start()
+            self.update_air_label(4)
         else:
-            settings.beginGroup("LEDS")
-            self.AirIcon_4.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                   '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            self.AirLabel_4.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.set_air_indicator(4, False)
             self.statusAIR4 = False
-            self.timerAIR4.stop()
+            self.airTimers[4].stop()
+            self.update_air_label(4)
 
     def start_stop_air4(self):
         if not self.statusAIR4:
@@ -951,96 +986,67 @@ class MainScreen(QWidget, Ui_MainScreen):
     def stop_air4(self):
         self.set_air4(False)
 
-    def update_air4_seconds(self):
-        if self.streamTimerMode == 0:  # count up mode
-            self.Air4Seconds += 1
-        else:
-            self.Air4Seconds -= 1
-            if self.Air4Seconds < 1:
-                self.stop_air4()
-                self.radioTimerMode = 0
-        self.AirLabel_4.setText("Stream\n%d:%02d" % (self.Air4Seconds / 60, self.Air4Seconds % 60))
-
-    def trigger_ntp_check(self):
-        print("NTP Check triggered")
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("NTP")
-        ntp_check = settings.value('ntpcheck', True, type=bool)
-        settings.endGroup()
-        if not ntp_check:
-            self.timerNTP.stop()
-            return
-        else:
-            self.timerNTP.stop()
-            self.checkNTPOffset.start()
-            self.timerNTP.start(60000)
+    def set_air_indicator(self, timer, active):
+        palette = self.indicatorPalettes["AIR" if active else "inactive"]
+        label, title = self.airLabels[timer]
+        self.airIcons[timer].setPalette(palette)
+        label.setPalette(palette)
+
+    def update_air_label(self, timer):
+        air_timer = self.airTimers[timer]
+        seconds = air_timer.seconds()
+        label, title = self.airLabels[timer]
+        label.setText("%s\n%d:%02d" % (title, seconds / 60, seconds % 60))
+        # unchanged while the timer runs, so the state version only changes with the timer state
+        self.stateStream.update({"air%d" % timer: air_timer.published()})
+
+    def update_air_timers(self):
+        # the displayed values are derived from the timers, a late tick only delays the display
+        if self.airTimers[3].running and self.airTimers[3].expired():
+            self.stop_air3()
+            self.radio_timer_reset()
+        if self.airTimers[4].running and self.airTimers[4].expired():
+            self.stop_air4()
+            self.stream_timer_reset()
+        for timer, air_timer in self.airTimers.items():
+            if air_timer.running:
+                self.update_air_label(timer)
+
+    def update_ntp_monitor(self):
+        servers = [server.strip() for server in self.config.value("NTP", "ntpcheckserver").split(",")
+                   if server.strip()]
+        self.ntpMonitor.configure(servers, self.config.value("NTP", "ntpcheck"))
 
     def set_led1(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            settings.beginGroup("LED1")
-            self.buttonLED1.setStyleSheet("color:" + settings.value('activetextcolor',
-                                                                    '#FFFFFF') + ";background-color:" + settings.value(
-                'activebgcolor', '#FF0000'))
-            settings.endGroup()
+            self.buttonLED1.setPalette(self.indicatorPalettes["LED1"])
             self.statusLED1 = True
         else:
-            settings.beginGroup("LEDS")
-            self.buttonLED1.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.buttonLED1.setPalette(self.indicatorPalettes["inactive"])
             self.statusLED1 = False
 
     def set_led2(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            settings.beginGroup("LED2")
-            self.buttonLED2.setStyleSheet("color:" + settings.value('activetextcolor',
-                                                                    '#FFFFFF') + ";background-color:" + settings.value(
-                'activebgcolor', '#DCDC00'))
-            settings.endGroup()
+            self.buttonLED2.setPalette(self.indicatorPalettes["LED2"])
             self.statusLED2 = True
         else:
-            settings.beginGroup("LEDS")
-            self.buttonLED2.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.buttonLED2.setPalette(self.indicatorPalettes["inactive"])
             self.statusLED2 = False
 
     def set_led3(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            settings.beginGroup("LED3")
-            self.buttonLED3.setStyleSheet("color:" + settings.value('activetextcolor',
-                                                                    '#FFFFFF') + ";background-color:" + settings.value(
-                'activebgcolor', '#00C8C8'))
-            settings.endGroup()
+            self.buttonLED3.setPalette(self.indicatorPalettes["LED3"])
             self.statusLED3 = True
         else:
-            settings.beginGroup("LEDS")
-            self.buttonLED3.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.buttonLED3.setPalette(self.indicatorPalettes["inactive"])
             self.statusLED3 = False
 
     def set_led4(self, action):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
         if action:
-            settings.beginGroup("LED4")
-            self.buttonLED4.setStyleSheet("color:" + settings.value('activetextcolor',
-                                                                    '#FFFFFF') + ";background-color:" + settings.value(
-                'activebgcolor', '#FF00FF'))
-            settings.endGroup()
+            self.buttonLED4.setPalette(self.indicatorPalettes["LED4"])
             self.statusLED4 = True
         else:
-            settings.beginGroup("LEDS")
-            self.buttonLED4.setStyleSheet("color:" + settings.value('inactivetextcolor',
-                                                                    '#555555') + ";background-color:" + settings.value(
-                'inactivebgcolor', '#222222'))
-            settings.endGroup()
+            self.buttonLED4.setPalette(self.indicatorPalettes["inactive"])
             self.statusLED4 = False
 
     def set_station(self, text):
@@ -1069,19 +1075,27 @@ class MainScreen(QWidget, Ui_MainScreen):
 
     def set_current_song_text(self, text):
         self.labelCurrentSong.setText(text)
+        self.stateStream.update({"now": text})
 
     def set_news_text(self, text):
         self.labelNews.setText(text)
+        self.stateStream.update({"next": text})
 
     def set_backtiming_secs(self, value):
         pass
         # self.labelSeconds.setText( str(value) )
 
     def add_warning(self, text, priority=0):
-        self.warnings[priority] = text
+        if self.warnings[priority] != text:
+            self.warnings[priority] = text
+            self.process_warnings()
+            self.stateStream.update({"warnings": list(self.warnings)})
 
     def remove_warning(self, priority=0):
-        self.warnings[priority] = ""
+        if self.warnings[priority]:
+            self.warnings[priority] = ""
+            self.process_warnings()
+            self.stateStream.update({"warnings": list(self.warnings)})
 
     def process_warnings(self):
         warning_available = False
@@ -1119,14 +1133,16 @@ class MainScreen(QWidget, Ui_MainScreen):
     def config_closed(self):
         global app
         # hide mouse cursor if in fullscreen mode
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("General")
-        if settings.value('fullscreen', True, type=bool):
+        if self.config.value("General", "fullscreen"):
             app.setOverrideCursor(QCursor(Qt.BlankCursor))
-        settings.endGroup()
 
     def config_finished(self):
+        self.config.reload()
         self.restore_settings_from_config()
+        self.refresh_indicators()
+        self.update_udp_socket()
+        self.update_tcp_server()
+        self.update_ntp_monitor()
         self.weatherWidget.readConfig()
         self.weatherWidget.makeOWMApiCall()
 
@@ -1150,84 +1166,311 @@ class MainScreen(QWidget, Ui_MainScreen):
 
     def closeEvent(self, event):
         self.httpd.stop()
-        self.checkNTPOffset.stop()
-
-
-class CheckNTPOffsetThread(QThread):
+        self.tcpServer.close()
+        self.stateStream.stop()
+        self.ntpMonitor.stop()
+
+
+class HttpCommand:
+    # command batch handed from the HTTP thread to the GUI thread, see MainScreen.http_cmd_handler()
+    def __init__(self, data):
+        self.data = data
+        self.received = time.perf_counter()
+        self.results = None
+        self.done = threading.Event()
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server handing each request to a bounded pool of worker threads
+
+    Connections are kept alive. Between requests and while a long-poll waits for a state change they are parked
+    in one selector thread, so idle clients never hold a worker. With more busy connections than workers the new
+    ones wait for a free worker, beyond workers * HTTP_QUEUE_FACTOR connections they are rejected with 503.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler, workers, stateStream):
+        # set up before binding, server_close() is also called if binding fails
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oas-http")
+        self.maxConnections = workers * HTTP_QUEUE_FACTOR
+        self.connections = set()
+        self.detached = set()
+        self.connectionsLock = threading.Lock()
+        # parked connections: socket -> (handler, monotonic deadline, state version a long-poll waits to change)
+        self.stateStream = stateStream
+        self.parked = {}
+        self.longPolls = 0
+        self.parking = True
+        self.parker = threading.Thread(target=self.run_parker, name="oas-http-parked", daemon=True)
+        self.wakeupReader, self.wakeupWriter = socket.socketpair()
+        super(PooledHTTPServer, self).__init__(server_address, handler)
+        stateStream.add_listener(self.state_changed)
+        self.parker.start()
+
+    def process_request(self, request, client_address):
+        with self.connectionsLock:
+            if len(self.connections) >= self.maxConnections:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                self.shutdown_request(request)
+                return
+            self.connections.add(request)
+        self.pool.submit(self.process_request_thread, request, client_address)
 
-    def __init__(self, oas):
-        self.oas = oas
-        QThread.__init__(self)
+    def process_request_thread(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.close_request(request)
+            return
+        self.serve(handler, handler.serve_request)
 
-    def __del__(self):
-        self.wait()
+    def resume_request(self, handler, expired):
+        # a parked connection got data, its long-poll is due, or it was idle for too long
+        if expired and handler.longPoll is None:
+            handler.finish()
+            self.close_request(handler.request)
+            return
+        self.serve(handler, handler.resume)
 
-    def run(self):
-        print("entered CheckNTPOffsetThread.run")
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("NTP")
-        ntp_server = str(settings.value('ntpcheckserver', 'pool.ntp.org'))
-        settings.endGroup()
-        max_deviation = 0.3
-        c = ntplib.NTPClient()
+    def serve(self, handler, turn):
+        # nothing may touch a connection after it was parked, another worker may already continue it
         try:
-            response = c.request(ntp_server)
-            if response.offset > max_deviation or response.offset < -max_deviation:
-                print("offset too big: %f while checking %s" % (response.offset, ntp_server))
-                self.oas.ntpWarnMessage = "Clock not NTP synchronized: offset too big"
-                self.oas.ntpHadWarning = True
-            else:
-                if self.oas.ntpHadWarning:
-                    self.oas.ntpHadWarning = False
-        except socket.timeout:
-            print("NTP error: timeout while checking NTP %s" % ntp_server)
-            self.oas.ntpWarnMessage = "Clock not NTP synchronized"
-            self.oas.ntpHadWarning = True
-        except socket.gaierror:
-            print("NTP error: socket error while checking NTP %s" % ntp_server)
-            self.oas.ntpWarnMessage = "Clock not NTP synchronized"
-            self.oas.ntpHadWarning = True
-        except ntplib.NTPException as e:
-            print("NTP error:", e)
-            self.oas.ntpWarnMessage = str(e)
-            self.oas.ntpHadWarning = True
+            if turn():
+                return
+        except ConnectionError:
+            # the client went away, e.g. reset an idle keep-alive connection
+            pass
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        try:
+            handler.finish()
+        except OSError:
+            pass
+        self.close_request(handler.request)
+
+    def close_request(self, request):
+        with self.connectionsLock:
+            self.connections.discard(request)
+        self.shutdown_request(request)
+
+    def next_request_soon(self, request):
+        # clients sending requests back to back are served without the detour through the parker thread
+        return bool(select.select([request], [], [], HTTP_LINGER)[0])
+
+    def park(self, handler, timeout, version=None):
+        # wait for the next request on the connection, or with a version for a newer state, without a worker
+        with self.connectionsLock:
+            self.parked[handler.request] = (handler, time.monotonic() + timeout, version)
+            if version is not None:
+                self.longPolls += 1
+        self.wakeup()
+
+    def state_changed(self):
+        # called by the StateStream on every new version
+        if self.longPolls:
+            self.wakeup()
+
+    def wakeup(self):
+        try:
+            self.wakeupWriter.send(b"\0")
+        except OSError:
+            pass
 
-    def stop(self):
-        self.quit()
+    def run_parker(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.wakeupReader, selectors.EVENT_READ)
+        # idle connections registered with the selector, only touched by this thread
+        registered = set()
+        while self.parking:
+            with self.connectionsLock:
+                idle = {request for request, (handler, deadline, version) in self.parked.items() if version is None}
+                deadline = min((deadline for handler, deadline, version in self.parked.values()), default=None)
+            for request in idle - registered:
+                selector.register(request, selectors.EVENT_READ)
+            for request in registered - idle:
+                selector.unregister(request)
+            registered = idle
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable = set()
+            for key, mask in selector.select(timeout):
+                if key.fileobj is self.wakeupReader:
+                    self.wakeupReader.recv(4096)
+                else:
+                    readable.add(key.fileobj)
+
+            now = time.monotonic()
+            version = self.stateStream.version
+            resumed = []
+            with self.connectionsLock:
+                for request, (handler, deadline, waitVersion) in list(self.parked.items()):
+                    changed = waitVersion is not None and waitVersion != version
+                    if request in readable or changed or now >= deadline:
+                        del self.parked[request]
+                        if waitVersion is not None:
+                            self.longPolls -= 1
+                        resumed.append((handler, request not in readable and not changed))
+            for handler, expired in resumed:
+                if handler.request in registered:
+                    selector.unregister(handler.request)
+                    registered.discard(handler.request)
+                try:
+                    self.pool.submit(self.resume_request, handler, expired)
+                except RuntimeError:
+                    # the pool is already shut down
+                    self.close_request(handler.request)
+        selector.close()
+
+    def detach_request(self, request):
+        # the socket is taken over by someone else, the worker returns to the pool without closing it
+        with self.connectionsLock:
+            self.connections.discard(request)
+            self.detached.add(request)
+
+    def shutdown_request(self, request):
+        with self.connectionsLock:
+            if request in self.detached:
+                self.detached.discard(request)
+                return
+        super(PooledHTTPServer, self).shutdown_request(request)
+
+    def server_close(self):
+        super(PooledHTTPServer, self).server_close()
+        self.stateStream.remove_listener(self.state_changed)
+        self.parking = False
+        self.wakeup()
+        if self.parker.is_alive():
+            self.parker.join()
+        with self.connectionsLock:
+            parked = list(self.parked)
+            self.parked.clear()
+            self.longPolls = 0
+            # wake up workers reading from keep-alive connections
+            for request in self.connections:
+                try:
+                    request.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        for request in parked:
+            self.close_request(request)
+        self.pool.shutdown(wait=False)
+        self.wakeupReader.close()
+        self.wakeupWriter.close()
 
 
 class HttpDaemon(QThread):
+    # delivered queued to the GUI thread
+    sigCommand = pyqtSignal(object)
+    # None if the server could not be started
+    _server = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # set once run() has created the server or failed to
+        self.ready = threading.Event()
+
     def run(self):
-        settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("Network")
-        port = int(settings.value('httpport', 8010))
-        settings.endGroup()
+        config = self.parent().config
+        port = config.value("Network", "httpport")
 
         try:
             handler = OASHTTPRequestHandler
-            self._server = HTTPServer((HOST, port), handler)
+            self._server = PooledHTTPServer((HOST, port), handler, config.value("Network", "httpworkers"),
+                                            self.parent().stateStream)
+            self._server.httpd = self
+            self._server.airTimers = self.parent().airTimers
+            self._server.latencyTracer = self.parent().latencyTracer
+            self._server.ntpMonitor = self.parent().ntpMonitor
+            self._server.timeSource = self.parent().timeSource
+            self._server.scheduler = self.parent().scheduler
+            self.ready.set()
+            # returns at once if stop() already asked for shutdown
             self._server.serve_forever()
         except OSError as error:
             print("ERROR: Starting HTTP Sever on port", port, error)
+        finally:
+            self.ready.set()
 
     def stop(self):
-        self._server.shutdown()
-        self._server.socket.close()
+        # stop() may be called before run() got to create the server
+        if self.isRunning():
+            self.ready.wait()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
         self.wait()
 
 
 class OASHTTPRequestHandler(BaseHTTPRequestHandler):
     server_version = "OnAirScreen/%s" % versionString
+    # keep-alive, idle connections are closed after timeout seconds
+    protocol_version = "HTTP/1.1"
+    timeout = HTTP_KEEPALIVE_TIMEOUT
+    # headers and body are written separately, don't let them wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def __init__(self, request, client_address, server):
+        # the server runs the turns of a connection, see serve_request(), and closes it with finish()
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        # (seconds, state version) of a long-poll to park after this request, see send_status()
+        self.longPoll = None
+        self.setup()
+
+    def serve_request(self):
+        # requests until the connection is idle, True if it was parked and another worker continues it
+        while True:
+            self.close_connection = True
+            self.handle_one_request()
+            if self.longPoll is not None:
+                wait, version = self.longPoll
+                self.server.park(self, wait, version)
+                return True
+            if not self.next_request():
+                return self.keep_alive()
+
+    def next_request(self):
+        # another request is already buffered or arrives within HTTP_LINGER
+        return not self.close_connection and (self.pipelined() or self.server.next_request_soon(self.connection))
+
+    def keep_alive(self):
+        if self.close_connection:
+            return False
+        self.server.park(self, self.timeout)
+        return True
+
+    def pipelined(self):
+        # requests sent ahead may already be in the read buffer, where the selector doesn't see them
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def resume(self):
+        # continue a parked connection, True if it was parked again
+        if self.longPoll is not None:
+            self.longPoll = None
+            self.send_status_reply()
+            self.wfile.flush()
+            if not self.next_request():
+                return self.keep_alive()
+        return self.serve_request()
 
     # handle HEAD request
     def do_HEAD(self):
         self.send_response(200)
         self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     # handle GET command
     def do_GET(self):
-        print(self.path)
         if self.path.startswith('/?cmd'):
             try:
                 cmd, message = unquote(str(self.path)[5:]).split("=", 1)
@@ -1236,30 +1479,139 @@ class OASHTTPRequestHandler(BaseHTTPRequestHandler):
                 return
 
             if len(message) > 0:
-                self.send_response(200)
-
-                # send header first
-                self.send_header('Content-type', 'text-html; charset=utf-8')
-                self.end_headers()
-
-                settings = QSettings(QSettings.UserScope, "astrastudio", "OnAirScreen")
-                settings.beginGroup("Network")
-                port = int(settings.value('udpport', 3310))
-                settings.endGroup()
-
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.sendto(message.encode(), ("127.0.0.1", port))
-
-                # send file content to client
-                self.wfile.write(message.encode())
-                self.wfile.write("\n".encode())
+                self.run_command(message.encode(), message)
                 return
             else:
                 self.send_error(400, 'no command was given')
                 return
 
+        if self.path == '/events':
+            # Server-Sent Events, the full state followed by deltas
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.flush()
+            self.server.detach_request(self.request)
+            self.server.stateStream.subscribe(self.request)
+            return
+
+        if self.path == '/status' or self.path.startswith('/status?'):
+            self.send_status()
+            return
+
+        if self.path == '/timers':
+            # exact elapsed time of the AIR timers
+            timers = {"air%d" % timer: air_timer.state() for timer, air_timer in self.server.airTimers.items()}
+            self.send_json(timers)
+            return
+
+        if self.path == '/ntp':
+            # NTP status and the offset history of every server
+            reply = self.server.ntpMonitor.history()
+            reply["correction"] = self.server.timeSource.state()
+            self.send_json(reply)
+            return
+
+        if self.path == '/scheduler':
+            # ticks, missed half seconds and lateness of the central clock tick
+            self.send_json(self.server.scheduler.stats())
+            return
+
+        if self.path == '/latency' or self.path.startswith('/latency?'):
+            # command to pixel latency per command, if General/latencytracing is enabled
+            tracer = self.server.latencyTracer
+            if parse_qs(urlsplit(self.path).query).get('reset') == ['1']:
+                tracer.reset()
+            self.send_json(tracer.state())
+            return
+
         self.send_error(404, 'file not found')
 
+    def send_status(self):
+        # full state, 304 if the client has the current version, ?wait=seconds long-polls for a change
+        stream = self.server.stateStream
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            wait = min(float(query.get('wait', ['0'])[0]), HTTP_MAX_WAIT)
+        except ValueError:
+            self.send_error(400, 'invalid wait time')
+            return
+
+        version, body = stream.status()
+        etag = '"%d"' % version
+        if wait > 0 and self.headers.get('If-None-Match') in (etag, None):
+            # wait for a version newer than the one the client has, or than the current one, parked without a
+            # worker, resume() sends the reply
+            self.longPoll = (wait, version)
+            return
+        self.send_status_reply()
+
+    def send_status_reply(self):
+        version, body = self.server.stateStream.status()
+        etag = '"%d"' % version
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    # handle POST with a batch of commands, newline separated text, a JSON list or binary, see README.md
+    def do_POST(self):
+        if self.path not in ('/', '/cmd'):
+            self.send_error(404, 'file not found')
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length <= 0:
+            self.send_error(411 if length < 0 else 400, 'no commands were given')
+            return
+        if length > HTTP_MAX_BODY:
+            self.send_error(413, 'command batch too large')
+            return
+        body = self.rfile.read(length)
+
+        if self.headers.get_content_type() == 'application/json':
+            try:
+                commands = json.loads(body)
+                if isinstance(commands, dict):
+                    commands = commands["commands"]
+                body = "\n".join(str(command) for command in commands).encode()
+            except (ValueError, KeyError, TypeError):
+                self.send_error(400, 'invalid JSON command batch')
+                return
+        self.run_command(body)
+
+    def run_command(self, data, message=None):
+        # run the commands in the GUI thread and reply once they were applied
+        command = HttpCommand(data)
+        self.server.httpd.sigCommand.emit(command)
+        if not command.done.wait(HTTP_COMMAND_TIMEOUT):
+            self.send_error(503, 'command was not applied in time')
+            return
+        reply = {"results": command.results}
+        if message is not None:
+            reply["command"] = message
+        self.send_json(reply)
+
+    def send_json(self, data):
+        body = json.dumps(data).encode() + b"\n"
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
 
 ###################################
 # App SIGINT handler
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# statestream.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import json
+import queue
+import socket
+import threading
+
+# idle subscribers get a comment line, so dead connections are noticed
+KEEPALIVE_INTERVAL = 15
+
+
+class StateStream:
+    """
+    Live state of the screen, pushed as Server-Sent Events to all subscribers of GET /events and
+    served as a cached snapshot by GET /status
+
+    update() is called from the GUI thread. Every change is serialised once and the same message is written
+    to all subscriber sockets by a single broadcaster thread, so subscribers never hold an HTTP worker.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.version = 0
+        self.lock = threading.Lock()
+        # full state as JSON, serialised at most once per version, see status()
+        self.statusJson = None
+        self.statusVersion = -1
+        self.queue = queue.Queue()
+        # called after every new version, e.g. to answer parked long-polls
+        self.listeners = []
+        self.subscribers = []
+        self.thread = None
+        # messages and bytes written to subscribers, subscribers that were closed or did not keep up
+        self.messages = 0
+        self.bytesSent = 0
+        self.dropped = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="oas-statestream", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def update(self, changes):
+        # merge changes into the state, only values that actually changed are sent
+        with self.lock:
+            delta = {key: value for key, value in changes.items() if self.state.get(key) != value}
+            if not delta:
+                return
+            self.state.update(delta)
+            self.version += 1
+            message = self.event("delta", self.version, delta)
+        self.queue.put(("message", message))
+        for listener in self.listeners:
+            listener()
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        self.listeners = [known for known in self.listeners if known != listener]
+
+    def snapshot(self):
+        # version and a copy of the full state
+        with self.lock:
+            return self.version, dict(self.state)
+
+    def status(self):
+        # version and the full state as JSON
+        with self.lock:
+            if self.statusVersion != self.version:
+                self.statusJson = (json.dumps({"version": self.version, "state": self.state}) + "\n").encode()
+                self.statusVersion = self.version
+            return self.statusVersion, self.statusJson
+
+    @staticmethod
+    def event(name, version, data):
+        return ("id: %d\nevent: %s\ndata: %s\n\n" % (version, name, json.dumps(data, separators=(",", ":")))).encode()
+
+    def subscribe(self, sock):
+        # the broadcaster thread takes over the socket, it starts with the full state
+        self.queue.put(("subscribe", sock))
+
+    def run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                item = ("message", b": keepalive\n\n")
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "subscribe":
+                version, state = self.snapshot()
+                payload.setblocking(False)
+                self.subscribers.append(payload)
+                self.send([payload], self.event("state", version, state))
+            else:
+                self.messages += 1
+                self.send(self.subscribers, payload)
+
+        for sock in self.subscribers:
+            self.close(sock)
+        self.subscribers = []
+
+    def send(self, subscribers, message):
+        dropped = []
+        for sock in subscribers:
+            try:
+                sent = sock.send(message)
+            except OSError:
+                sent = 0
+            self.bytesSent += sent
+            if sent < len(message):
+                # closed, or so far behind that the socket buffer is full
+                dropped.append(sock)
+        for sock in dropped:
+            self.subscribers.remove(sock)
+            self.close(sock)
+            self.dropped += 1
+
+    @staticmethod
+    def close(sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
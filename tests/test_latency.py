@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# test_latency.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import socket
+
+import pytest
+
+# p99 budgets in ms, a command is handled within the event loop pass it arrives in and painted within a few frames
+DISPATCH_BUDGET = 16.0
+PAINT_BUDGET = 50.0
+COMMANDS = [b"LED1:ON", b"LED1:OFF", b"AIR1:ON", b"AIR1:OFF", b"WARN:latency", b"WARN:", b"LED2:ON", b"LED2:OFF",
+            b"NOW:latency", b"NEXT:latency"]
+# commands sent and ms between two of them
+COUNT = 200
+INTERVAL = 20
+
+
+@pytest.fixture
+def main_screen(app, run_events):
+    import start as oas
+    oas.app = app
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    # without a reachable NTP server its warning would hide NOW and NEXT
+    main_screen.config.config["NTP"]["ntpcheck"] = False
+    main_screen.update_ntp_monitor()
+    main_screen.latencyTracer.set_enabled(True)
+    run_events(0.5)
+    yield main_screen
+    main_screen.quit_oas()
+    main_screen.udpsock.close()
+    main_screen.close()
+
+
+def test_command_latency(main_screen, run_events):
+    address = ("127.0.0.1", main_screen.config.value("Network", "udpport"))
+    main_screen.latencyTracer.reset()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for i in range(COUNT):
+            command = COMMANDS[i % len(COMMANDS)]
+            if command.startswith((b"NOW", b"NEXT")):
+                command += b" %d" % i
+            sock.sendto(command, address)
+            run_events(INTERVAL / 1000)
+    run_events(0.2)
+
+    state = main_screen.latencyTracer.state()
+    assert state["timeouts"] == 0
+    assert set(state["commands"]) == {"LED1", "LED2", "AIR1", "WARN", "NOW", "NEXT"}
+    for command, stages in state["commands"].items():
+        assert stages["dispatch"]["p99_ms"] <= DISPATCH_BUDGET, command
+        assert stages["paint"]["p99_ms"] <= PAINT_BUDGET, command
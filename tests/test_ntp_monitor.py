@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# test_ntp_monitor.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import threading
+import time
+
+import pytest
+
+import ntp_monitor
+import ntp_responder
+from ntp_monitor import NTP_HISTORY, NTP_INTERVAL, NTP_RETRY, NtpMonitor
+
+
+def responder(*options):
+    # a local NTP server on a free port, answering until the tests end
+    args = ntp_responder.parser.parse_args(["--port", "0"] + list(options))
+    sock = ntp_responder.make_socket(args)
+    threading.Thread(target=ntp_responder.serve, args=(args, sock), daemon=True).start()
+    return "127.0.0.1:%d" % sock.getsockname()[1]
+
+
+@pytest.fixture
+def monitor():
+    monitor = NtpMonitor()
+    yield monitor
+    monitor.stop()
+
+
+def test_synchronized(monitor):
+    address = responder("--offset", "0.05")
+    monitor.configure([address], True)
+    assert monitor.status()["message"] == "waiting for NTP status check"
+    monitor.start()
+    deadline = time.monotonic() + 5
+    while not monitor.status()["synchronized"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    status = monitor.status()
+    assert status["synchronized"]
+    assert status["server"] == address
+    assert status["offset"] == pytest.approx(0.05, abs=0.02)
+
+
+def test_offset_too_big(monitor):
+    address = responder("--offset", "1.5")
+    monitor.configure([address], True)
+    monitor.check(monitor.servers[0])
+    status = monitor.status()
+    assert not status["synchronized"]
+    assert status["message"] == "Clock not NTP synchronized: offset too big"
+    assert status["offset"] == pytest.approx(1.5, abs=0.02)
+
+
+def test_fastest_server(monitor):
+    slow, fast = responder("--delay", "50"), responder()
+    monitor.configure([slow, fast], True)
+    for server in monitor.servers:
+        monitor.check(server)
+    assert monitor.status()["server"] == fast
+
+
+def test_backoff(monitor, monkeypatch):
+    # a server that never answers is retried after 2, 4, 8 ... seconds, an answer resets the backoff
+    monkeypatch.setattr(ntp_monitor, "NTP_TIMEOUT", 0.1)
+    address = responder("--drop", "1")
+    monitor.configure([address], True)
+    server = monitor.servers[0]
+    for failures in range(1, 5):
+        monitor.check(server)
+        assert server.failures == failures
+        assert server.due - time.monotonic() == pytest.approx(NTP_RETRY * 2 ** (failures - 1), abs=0.5)
+    assert monitor.status()["message"] == "Clock not NTP synchronized"
+    history = monitor.history()["servers"][address]
+    assert history["failures"] == 4
+    assert history["last_error"]
+    assert not history["samples"]
+
+    server.host, server.port = "127.0.0.1", int(responder().rpartition(":")[2])
+    monitor.check(server)
+    assert server.failures == 0
+    assert server.due - time.monotonic() == pytest.approx(NTP_INTERVAL, abs=0.5)
+    assert monitor.status()["synchronized"]
+
+
+def test_history_ring_buffer(monitor):
+    address = responder("--jitter", "0.01")
+    monitor.configure([address], True)
+    server = monitor.servers[0]
+    monitor.check(server)
+    first = server.samples[0]
+    for i in range(NTP_HISTORY + 10):
+        monitor.check(server)
+    samples = monitor.history()["servers"][address]["samples"]
+    assert len(samples) == NTP_HISTORY
+    # the oldest samples were dropped, newest last
+    assert samples[0]["time"] > first["time"]
+    assert samples == sorted(samples, key=lambda sample: sample["time"])
+    assert monitor.history()["servers"][address]["jitter"] > 0
+
+    # servers that stay configured keep their history
+    monitor.configure([address, responder()], True)
+    assert len(monitor.history()["servers"][address]["samples"]) == NTP_HISTORY
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# test_weather_data.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import os
+import threading
+import time
+
+import pytest
+
+import owm_responder
+import weather_data
+from weather_data import WEATHER_TTL, WeatherData
+
+LONDON = ("2643743", "metric", "en")
+BERLIN = ("2950159", "metric", "de")
+
+
+@pytest.fixture
+def owm():
+    # a local OpenWeatherMap stand-in on a free port
+    server = owm_responder.make_server(owm_responder.parser.parse_args(["--port", "0", "--delay", "50"]))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = "http://127.0.0.1:%d/data/2.5/weather" % server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def weather(app, tmp_path):
+    weather = WeatherData(fileName=str(tmp_path / "weather.json"))
+    weather.received = []
+    weather.errors = []
+    weather.sigWeather.connect(lambda key, data: weather.received.append((key, data)))
+    weather.sigError.connect(lambda key, error: weather.errors.append((key, error)))
+    return weather
+
+
+def test_concurrent_fetches_share_a_request(owm, weather, run_events):
+    assert weather.fetch(LONDON, "key", url=owm.url)
+    assert weather.fetch(LONDON, "key", url=owm.url)
+    assert weather.fetch_group([LONDON], "key", url=owm.url) is False
+    assert weather.stats()["pending"] == 1
+    assert run_events(5, lambda: not weather.pending)
+    assert owm.requests == 1
+    assert weather.requests == 1
+    assert [key for key, data in weather.received] == [LONDON]
+    assert weather.cached(LONDON)["name"] == "London"
+    assert not weather.errors
+
+
+def test_ttl(owm, weather, run_events, monkeypatch):
+    weather.fetch(LONDON, "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    # fresh data is not fetched again
+    assert weather.fetch(LONDON, "key", url=owm.url) is False
+    assert weather.fetch_group([LONDON], "key", url=owm.url) is False
+    assert weather.stats()["hits"] == 2
+    assert owm.requests == 1
+
+    # after the TTL, or forced, it is
+    now = time.time()
+    monkeypatch.setattr(weather_data.time, "time", lambda: now + WEATHER_TTL + 1)
+    assert weather.fetch(LONDON, "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    assert weather.fetch(LONDON, "key", url=owm.url, force=True)
+    assert run_events(5, lambda: not weather.pending)
+    assert owm.requests == 3
+
+
+def test_group_fetch(owm, weather, run_events):
+    weather.fetch(LONDON, "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    # only the stale city is requested, with the group endpoint
+    assert weather.fetch_group([LONDON, BERLIN], "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    assert owm.requests == 2
+    assert weather.cached(BERLIN)["name"] == "Berlin"
+    assert weather.fetch_group([LONDON, BERLIN], "key", url=owm.url) is False
+    assert owm.requests == 2
+
+
+def test_persisted(owm, weather, run_events):
+    weather.fetch(LONDON, "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    assert os.path.exists(weather.fileName)
+    restarted = WeatherData(fileName=weather.fileName)
+    assert restarted.cached(LONDON) == weather.cached(LONDON)
+    assert restarted.fetch(LONDON, "key", url=owm.url) is False
+    assert owm.requests == 1
+
+
+def test_error_keeps_cached_data(owm, weather, run_events):
+    weather.fetch(LONDON, "key", url=owm.url)
+    assert run_events(5, lambda: not weather.pending)
+    # without an API key the responder answers 401
+    assert weather.fetch(LONDON, "", url=owm.url, force=True)
+    assert run_events(5, lambda: not weather.pending)
+    assert [key for key, error in weather.errors] == [LONDON]
+    assert weather.cached(LONDON)["name"] == "London"
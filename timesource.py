@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# timesource.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import collections
+import statistics
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QDateTime
+
+# correction applied per second while slewing, a 0.3 s offset is slewed away within a minute
+TIME_SLEW_RATE = 0.005
+# larger corrections are stepped
+TIME_STEP_THRESHOLD = 1.0
+# the correction follows the median of the last NTP offsets
+TIME_SMOOTH_SAMPLES = 5
+
+
+class TimeSource:
+    """
+    Time shown by the clock, text clock, date and backtiming
+
+    Optionally corrected by the NTP offset measured by the NTP monitor. A new correction is slewed in at
+    TIME_SLEW_RATE instead of stepping the display, only corrections over TIME_STEP_THRESHOLD are stepped.
+    Can be read from any thread.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.offsets = collections.deque(maxlen=TIME_SMOOTH_SAMPLES)
+        self.lastSample = None
+        # (monotonic time, correction at that time, target correction), replaced as a whole
+        self.slew = (time.monotonic(), 0.0, 0.0)
+
+    def set_enabled(self, enabled):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        self.offsets.clear()
+        self.lastSample = None
+        if not enabled:
+            # back to the system clock at once
+            self.slew = (time.monotonic(), 0.0, 0.0)
+
+    def correction(self, now=None):
+        # seconds added to the system clock
+        anchor, start, target = self.slew
+        if now is None:
+            now = time.monotonic()
+        step = TIME_SLEW_RATE * (now - anchor)
+        return start + max(-step, min(step, target - start))
+
+    def set_target(self, target):
+        now = time.monotonic()
+        current = self.correction(now)
+        if abs(target - current) > TIME_STEP_THRESHOLD:
+            current = target
+        self.slew = (now, current, target)
+
+    def add_sample(self, status):
+        # status of the NTP monitor, each sample is only used once
+        if not self.enabled or status["offset"] is None or status["time"] == self.lastSample:
+            return
+        self.lastSample = status["time"]
+        self.offsets.append(status["offset"])
+        self.set_target(statistics.median(self.offsets))
+
+    def time(self):
+        return time.time() + self.correction()
+
+    def datetime(self):
+        return datetime.fromtimestamp(self.time())
+
+    def qdatetime(self):
+        return QDateTime.fromMSecsSinceEpoch(int(self.time() * 1000))
+
+    def state(self):
+        anchor, start, target = self.slew
+        return {"enabled": self.enabled, "correction": self.correction(), "target": target}
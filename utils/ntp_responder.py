@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# ntp_responder.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import argparse
+import random
+import socket
+import time
+
+import ntplib
+
+parser = argparse.ArgumentParser(description='Local stand-in NTP server for testing the OnAirScreen NTP monitor, '
+                                             'e.g. with ntpcheckserver=127.0.0.1:12300.')
+parser.add_argument("-b", "--bind", type=str, help="address to listen on (default: 127.0.0.1)", default="127.0.0.1")
+parser.add_argument("-p", "--port", type=int, help="UDP port (default: 12300)", default=12300)
+parser.add_argument("-o", "--offset", type=float, help="seconds this clock is ahead of the system clock (default: 0)",
+                    default=0.0)
+parser.add_argument("-j", "--jitter", type=float, help="random +/- seconds added to every offset (default: 0)",
+                    default=0.0)
+parser.add_argument("-d", "--delay", type=float, help="ms to wait before answering (default: 0)", default=0.0)
+parser.add_argument("--drop", type=float, help="fraction of requests that are not answered (default: 0)",
+                    default=0.0)
+parser.add_argument("-s", "--stratum", type=int, help="stratum in the answers (default: 2)", default=2)
+
+
+def make_socket(args):
+    # port 0 picks a free port, see getsockname()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.bind, args.port))
+    return sock
+
+
+def serve(args, sock):
+    while True:
+        data, address = sock.recvfrom(256)
+        offset = args.offset + random.uniform(-args.jitter, args.jitter)
+        received = time.time() + offset
+        request = ntplib.NTPPacket()
+        try:
+            request.from_data(data)
+        except ntplib.NTPException:
+            continue
+        if random.random() < args.drop:
+            print("dropped request from %s" % address[0])
+            continue
+        if args.delay:
+            time.sleep(args.delay / 1000)
+        reply = ntplib.NTPPacket(version=request.version, mode=4)
+        reply.stratum = args.stratum
+        reply.ref_timestamp = ntplib.system_to_ntp_time(received - 1)
+        reply.orig_timestamp = request.tx_timestamp
+        reply.recv_timestamp = ntplib.system_to_ntp_time(received)
+        reply.tx_timestamp = ntplib.system_to_ntp_time(time.time() + offset)
+        sock.sendto(reply.to_data(), address)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    sock = make_socket(args)
+    print("NTP responder on %s:%d, offset %+.3f s" % (sock.getsockname() + (args.offset,)))
+    try:
+        serve(args, sock)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,886 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# oas_bench.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import argparse
+import collections
+import http.client
+import json
+import os
+import selectors
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from PyQt5.QtGui import QColor, QPalette
+from PyQt5.QtWidgets import QApplication, QLabel
+
+
+def bench_commands(args):
+    # decode and dispatch LED/AIR state batches, text vs. binary encoding
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from command_protocol import decode_datagram, encode_binary, encode_text
+
+    batch = []
+    for i in range(args.batch):
+        batch.append((("LED1", "LED2", "LED3", "LED4", "AIR1", "AIR2")[i % 6], ("ON", "OFF")[i // 6 % 2]))
+    datagrams = {"text": encode_text(batch), "binary": encode_binary(batch)}
+
+    for name, datagram in datagrams.items():
+        start = time.perf_counter()
+        for i in range(args.iterations):
+            decode_datagram(datagram)
+        elapsed = time.perf_counter() - start
+        print("decode %-6s %5d bytes/batch %12.0f commands/s" % (name, len(datagram),
+                                                                 args.iterations * args.batch / elapsed))
+
+    if args.decode_only:
+        return
+
+    import start as oas
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    oas.app.processEvents()
+    for name, datagram in datagrams.items():
+        start = time.perf_counter()
+        for i in range(args.iterations):
+            main_screen.parse_cmd(datagram)
+            oas.app.processEvents()
+        elapsed = time.perf_counter() - start
+        print("apply  %-6s %5d bytes/batch %12.0f commands/s" % (name, len(datagram),
+                                                                 args.iterations * args.batch / elapsed))
+    main_screen.quit_oas()
+
+
+def bench_flood(args):
+    # replay a burst of single command datagrams like a playout system after a reconnect
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import start as oas
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    oas.app.processEvents()
+
+    datagrams = []
+    for i in range(args.commands):
+        datagrams.append((b"NOW:Song %d" % i,
+                          b"NEXT:Next %d" % i,
+                          b"LED%d:%s" % (i // 4 % 4 + 1, (b"ON", b"OFF")[i // 16 % 2]),
+                          b"AIR%d:%s" % (i // 4 % 2 + 1, (b"ON", b"OFF")[i // 8 % 2]))[i % 4])
+    start = time.perf_counter()
+    for datagram in datagrams:
+        main_screen.parse_cmd(datagram)
+    while main_screen.pendingCommands:
+        oas.app.processEvents()
+    oas.app.processEvents()
+    elapsed = time.perf_counter() - start
+    print("%d commands in %.1f ms" % (args.commands, elapsed * 1000))
+    print(main_screen.commandStats)
+    main_screen.quit_oas()
+
+
+def bench_http(args):
+    # load test of the HTTP API of a running instance, each client sends its requests over one keep-alive connection
+    url = urlsplit(args.url)
+    path = args.path or "/?cmd=%s" % quote(args.command)
+    batch = "\n".join([args.command] * args.batch).encode()
+
+    def client(requests, latencies):
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        for i in range(requests):
+            request_start = time.perf_counter()
+            if args.batch > 1:
+                connection.request("POST", "/", body=batch, headers={"Content-Type": "text/plain"})
+            else:
+                connection.request("GET", path)
+            reply = connection.getresponse()
+            reply.read()
+            if reply.status != 200:
+                print("ERROR: HTTP status", reply.status)
+            latencies.append(time.perf_counter() - request_start)
+        connection.close()
+
+    for clients in args.clients:
+        latencies = []
+        threads = [threading.Thread(target=client, args=(max(1, args.requests // clients), latencies))
+                   for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print("%3d clients: %6d requests in %6.2f s, %6.0f requests/s, p50 %7.2f ms, p99 %7.2f ms" % (
+            clients, len(latencies), elapsed, len(latencies) / elapsed,
+            latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000))
+
+
+def bench_tcp(args):
+    # pipelined commands over persistent TCP connections of a running instance, up to window unacknowledged
+    line = args.command.encode() + b"\n"
+
+    def client(commands, latencies, errors):
+        sock = socket.create_connection((args.host, args.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        acks = sock.makefile("rb")
+        unacked = collections.deque()
+        for i in range(commands):
+            if len(unacked) < args.window:
+                unacked.append(time.perf_counter())
+                sock.sendall(line)
+                continue
+            ack = acks.readline()
+            latencies.append(time.perf_counter() - unacked.popleft())
+            if not ack.startswith(b"OK"):
+                errors.append(ack)
+            unacked.append(time.perf_counter())
+            sock.sendall(line)
+        while unacked:
+            ack = acks.readline()
+            latencies.append(time.perf_counter() - unacked.popleft())
+            if not ack.startswith(b"OK"):
+                errors.append(ack)
+        sock.close()
+
+    for clients in args.clients:
+        latencies = []
+        errors = []
+        threads = [threading.Thread(target=client, args=(max(1, args.commands // clients), latencies, errors))
+                   for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print("%3d connections: %6d commands in %6.2f s, %7.0f commands/s, p50 %7.2f ms, p99 %7.2f ms, %d errors" % (
+            clients, len(latencies), elapsed, len(latencies) / elapsed,
+            latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000, len(errors)))
+
+
+def bench_events(args):
+    # fan-out of state changes to many Server-Sent Events subscribers of a running instance
+    url = urlsplit(args.url)
+    address = (url.hostname, url.port or 80)
+    selector = selectors.DefaultSelector()
+    subscribers = []
+    for i in range(args.subscribers):
+        sock = socket.create_connection(address)
+        sock.sendall(b"GET /events HTTP/1.1\r\nHost: %s\r\n\r\n" % url.hostname.encode())
+        subscribers.append(sock)
+        selector.register(sock, selectors.EVENT_READ, bytearray())
+
+    def receive(marker, timeout=10.0):
+        # wait until every subscriber received marker, returns the time each one got it
+        received = {}
+        deadline = time.perf_counter() + timeout
+        while len(received) < len(subscribers) and time.perf_counter() < deadline:
+            for key, mask in selector.select(timeout=0.5):
+                data = key.fileobj.recv(65536)
+                key.data.extend(data)
+                if key.fileobj not in received and marker in key.data:
+                    received[key.fileobj] = time.perf_counter()
+                    del key.data[:]
+        return received
+
+    # everyone has the initial state
+    received = receive(b"event: state")
+    print("%d of %d subscribers connected" % (len(received), args.subscribers))
+
+    connection = http.client.HTTPConnection(*address, timeout=30)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.messages):
+        marker = "bench %d %d" % (i, time.time_ns())
+        sent = time.perf_counter()
+        connection.request("GET", "/?cmd=%s" % quote("NEXT:" + marker))
+        connection.getresponse().read()
+        received = receive(marker.encode())
+        if len(received) < len(subscribers):
+            print("ERROR: only %d subscribers received message %d" % (len(received), i))
+        latencies.append(max(received.values(), default=sent) - sent)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print("%d messages to %d subscribers in %.2f s, %.0f deliveries/s" % (
+        args.messages, args.subscribers, elapsed, args.messages * args.subscribers / elapsed))
+    print("command to last subscriber: p50 %.2f ms, p99 %.2f ms, %.1f us per subscriber" % (
+        latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000,
+        latencies[len(latencies) // 2] / args.subscribers * 1e6))
+    for sock in subscribers:
+        sock.close()
+
+
+def bench_latency(args):
+    # command to pixel latency of an offscreen instance, sent via UDP, optionally under load
+    # exits with 1 if a p99 paint latency is over --budget, so it can run in CI
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import start as oas
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    # without a reachable NTP server its warning would hide NOW and NEXT
+    main_screen.config.config["NTP"]["ntpcheck"] = False
+    main_screen.update_ntp_monitor()
+    main_screen.latencyTracer.set_enabled(True)
+    address = ("127.0.0.1", main_screen.config.value("Network", "udpport"))
+    running = True
+
+    def flood():
+        # a playout system hammering NOW
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        i = 0
+        start = time.perf_counter()
+        while running:
+            i += 1
+            sock.sendto(b"NOW:flood %d" % i, address)
+            time.sleep(max(0.0, start + i / args.flood - time.perf_counter()))
+
+    def busy():
+        # CPU bound Python work in other threads, like the weather and NTP checks, competes for the GIL
+        while running:
+            sum(range(10000))
+
+    threads = []
+    if args.flood:
+        threads.append(threading.Thread(target=flood, daemon=True))
+    threads += [threading.Thread(target=busy, daemon=True) for i in range(args.busy)]
+    for thread in threads:
+        thread.start()
+
+    def run_events(seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            oas.app.processEvents()
+
+    commands = [b"LED1:ON", b"LED1:OFF", b"AIR1:ON", b"AIR1:OFF", b"WARN:latency", b"WARN:", b"LED2:ON", b"LED2:OFF"]
+    if not args.flood:
+        commands += [b"NOW:latency", b"NEXT:latency"]
+    run_events(0.5)
+    main_screen.latencyTracer.reset()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for i in range(args.commands):
+        command = commands[i % len(commands)]
+        if command in (b"NOW:latency", b"NEXT:latency"):
+            command += b" %d" % i
+        sock.sendto(command, address)
+        run_events(args.interval / 1000)
+    run_events(0.2)
+    running = False
+
+    state = main_screen.latencyTracer.state()
+    failed = []
+    print("%-8s %-8s %6s %8s %8s %8s %8s" % ("command", "stage", "count", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for command, stages in state["commands"].items():
+        for stage, latency in stages.items():
+            print("%-8s %-8s %6d %8.2f %8.2f %8.2f %8.2f" % (command, stage, latency["count"], latency["p50_ms"],
+                                                             latency["p90_ms"], latency["p99_ms"], latency["max_ms"]))
+            if stage == "paint" and args.budget and latency["p99_ms"] > args.budget:
+                failed.append(command)
+    print("not painted within 1 s: %d" % state["timeouts"])
+    main_screen.quit_oas()
+    if failed:
+        print("FAILED: p99 paint latency over %g ms budget for %s" % (args.budget, ", ".join(failed)))
+        sys.exit(1)
+
+
+def bench_indicators(args):
+    # switch LED labels between active and inactive, once via stylesheets and once via cached palettes
+    app = QApplication.instance() or QApplication(sys.argv)
+    labels = [QLabel("LED%d" % led) for led in range(1, 5)]
+    for label in labels:
+        label.resize(230, 120)
+        label.show()
+    app.processEvents()
+
+    active = "color:#FFFFFF;background-color:#FF0000"
+    inactive = "color:#555555;background-color:#222222"
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        for label in labels:
+            label.setStyleSheet(active if i % 2 else inactive)
+        app.processEvents()
+    stylesheet_time = time.perf_counter() - start
+
+    palettes = []
+    for text_color, bg_color in (("#555555", "#222222"), ("#FFFFFF", "#FF0000")):
+        palette = QPalette()
+        palette.setColor(QPalette.WindowText, QColor(text_color))
+        palette.setColor(QPalette.Window, QColor(bg_color))
+        palettes.append(palette)
+    for label in labels:
+        label.setStyleSheet("")
+        label.setAutoFillBackground(True)
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        for label in labels:
+            label.setPalette(palettes[i % 2])
+        app.processEvents()
+    palette_time = time.perf_counter() - start
+
+    switches = args.iterations * len(labels)
+    print("stylesheet: %8.1f us per switch" % (stylesheet_time / switches * 1e6))
+    print("palette:    %8.1f us per switch" % (palette_time / switches * 1e6))
+    print("speedup:    %8.1fx" % (stylesheet_time / palette_time))
+
+
+def bench_clock(args):
+    # draw operations and paint time per frame of the clock widget, per mode
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from PyQt5.QtCore import QDateTime
+    from clockwidget import ClockWidget
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    class SteppedTime:
+        # advances by a fixed step on every call of step(), independent of the wall clock
+        def __init__(self):
+            self.now = QDateTime.currentDateTime()
+
+        def step(self, msecs):
+            self.now = self.now.addMSecs(msecs)
+
+        def qdatetime(self):
+            return self.now
+
+    clock = SteppedTime()
+    widget = ClockWidget()
+    widget.setExternalTick(True)
+    widget.setTimeSource(clock)
+    widget.resize(args.size, args.size)
+    widget.setSweepBudget(args.budget)
+    widget.show()
+    app.processEvents()
+
+    def run(step, frame):
+        frames = []
+        for i in range(args.frames):
+            clock.step(step)
+            widget.paintTime = -1.0
+            frame()
+            app.processEvents()
+            if widget.paintTime >= 0:
+                frames.append((widget.paintOps, widget.paintTime))
+        return frames
+
+    def sweep():
+        widget.sweep()
+
+    print("%-16s %8s %12s %12s %12s" % ("", "frames", "ops/frame", "ms/frame", "max ms"))
+    for name, mode, seconds, step, frame in (("digital", 1, False, 500, widget.tick),
+                                             ("digital seconds", 1, True, 500, widget.tick),
+                                             ("analog", 0, False, 500, widget.tick),
+                                             ("analog sweep", 0, False, 100, sweep)):
+        widget.setClockMode(mode)
+        widget.setShowSeconds(seconds)
+        app.processEvents()
+        frames = run(step, frame)
+        if not frames:
+            print("%-16s %8d" % (name, 0))
+            continue
+        print("%-16s %8d %12.1f %12.3f %12.3f" % (name, len(frames), statistics.mean(ops for ops, ms in frames),
+                                                  statistics.mean(ms for ops, ms in frames),
+                                                  max(ms for ops, ms in frames)))
+    print("sweep: %d of %d fps, frame rate halved %d times over the %g ms budget, doubled %d times" % (
+        widget.sweepFpsEffective, widget.sweepFps, widget.sweepBudgetDrops, widget.sweepBudget,
+        widget.sweepRecoveries))
+
+
+def bench_weather(args):
+    # paint time of the weather widget per frame, with and without the scaled background and shadowed label caches
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from settings_store import SettingsStore
+    from weatherwidget import ShadowLabel, WeatherWidget
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = WeatherWidget()
+    widget.setConfig(SettingsStore())
+    widget.updateTimer.stop()
+    widget.resize(args.width, args.height)
+    widget.show()
+    app.processEvents()
+    conditions = [("01d", "clear sky"), ("02n", "few clouds"), ("09d", "light rain"), ("13n", "snow")]
+
+    def run(cache_size, cached_shadows):
+        widget.backgroundCacheSize = cache_size
+        widget.invalidateBackground()
+        widget.backgroundSources.clear()
+        widget.backgroundDecodes = widget.backgroundScales = 0
+        for label in widget.shadowLabels:
+            label.setShadowCached(cached_shadows)
+        ShadowLabel.shadowCache.clear()
+        ShadowLabel.shadowRenders = 0
+        app.processEvents()
+        start = time.perf_counter()
+        for i in range(args.frames):
+            if i % args.change == 0:
+                # a new condition every --change frames, like the 10 minute weather updates
+                icon, condition = conditions[i // args.change % len(conditions)]
+                widget.setData("London", "%d°C" % (i // args.change), condition, icon=icon, background=icon)
+            widget.repaint()
+        return (time.perf_counter() - start) / args.frames, widget.backgroundDecodes, ShadowLabel.shadowRenders
+
+    print("%-12s %12s %8s %8s" % ("", "ms per frame", "decodes", "shadows"))
+    for name, cache_size, cached_shadows in (("uncached", 0, False), ("backgrounds", 8, False),
+                                             ("cached", 8, True)):
+        frame_time, decodes, shadows = run(cache_size, cached_shadows)
+        print("%-12s %12.3f %8d %8d" % (name, frame_time * 1000, decodes, shadows))
+
+    # rotation through several cities, switching with and without pre-rendered panels
+    keys = [("%d" % city, widget.owmUnit, widget.owmLanguage) for city in range(1, args.cities + 1)]
+    widget.owmCityIDs = [key[0] for key in keys]
+    for i, key in enumerate(keys):
+        icon, condition = conditions[i % len(conditions)]
+        widget.weatherData.cache[key] = {"time": time.time(), "data": {
+            "name": "City %d" % i, "main": {"temp": i}, "weather": [{"description": condition, "icon": icon}]}}
+    print("%-12s %12s %8s" % ("", "ms per switch", "renders"))
+    for name, panels in (("labels", False), ("panels", True)):
+        widget.panels.clear()
+        widget.panelRenders = 0
+        if panels:
+            widget.renderPanels()
+        start = time.perf_counter()
+        for i in range(args.frames):
+            if panels:
+                widget.rotate()
+            else:
+                widget.location = (widget.location + 1) % len(keys)
+                widget.showWeather(widget.weatherData.cached(widget.weatherKey()))
+            widget.repaint()
+        print("%-12s %12.3f %8d" % (name, (time.perf_counter() - start) / args.frames * 1000, widget.panelRenders))
+
+
+def bench_weatherdata(args):
+    # weather data cache against a local stand-in OWM server: de-duplication, TTL, disk persistence and errors
+    # exits with 1 if one of the checks fails
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import tempfile
+    import owm_responder
+    from weather_data import WeatherData
+    app = QApplication.instance() or QApplication(sys.argv)
+    responder = owm_responder.make_server(owm_responder.parser.parse_args(["-p", "0", "-d", str(args.delay)]))
+    threading.Thread(target=responder.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/data/2.5/weather" % responder.server_address[1]
+    key = ("2643743", "metric", "en")
+    replies = []
+    errors = []
+    failed = []
+
+    def wait(count, timeout=5.0):
+        deadline = time.perf_counter() + timeout
+        while len(replies) + len(errors) < count and time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        return time.perf_counter()
+
+    def check(name, ok, detail):
+        print("%-36s %-4s %s" % (name, "ok" if ok else "FAIL", detail))
+        if not ok:
+            failed.append(name)
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "weather.json")
+        data = WeatherData(fileName=file_name)
+        data.sigWeather.connect(lambda key, weather: replies.append(weather))
+        data.sigError.connect(lambda key, error: errors.append(error))
+
+        start = time.perf_counter()
+        for i in range(args.clients):
+            data.fetch(key, "test", url)
+        network_time = wait(1) - start
+        wait(2, args.delay / 1000 + 0.2)
+        check("%d concurrent fetches" % args.clients, responder.requests == 1 and len(replies) == 1,
+              "%d request(s), first data after %.1f ms" % (responder.requests, network_time * 1000))
+
+        data.fetch(key, "test", url)
+        wait(2, args.delay / 1000 + 0.2)
+        check("fetch within TTL", responder.requests == 1 and data.hits == 1, "%d request(s)" % responder.requests)
+
+        data.fetch(key, "test", url, force=True)
+        wait(2)
+        check("forced fetch", responder.requests == 2 and len(replies) == 2, "%d request(s)" % responder.requests)
+
+        data.fetch(("2950159", "metric", "de"), "", url)
+        wait(3)
+        check("invalid API key", len(errors) == 1 and len(data.cache) == 1, errors[0] if errors else "no error")
+
+        cities = [(city, "metric", "en") for city in ("2643743", "2950159", "2867714", "5128581")]
+        requests = responder.requests
+        for i in range(args.clients):
+            data.fetch_group(cities, "test", url)
+        wait(len(replies) + len(errors) + len(cities))
+        check("group of %d cities" % len(cities), responder.requests == requests + 1 and
+              all(data.cached(key) for key in cities), "%d request(s)" % (responder.requests - requests))
+
+        data.fetch_group(cities, "test", url)
+        check("group within TTL", responder.requests == requests + 1, "%d request(s)" % (responder.requests - requests))
+
+        start = time.perf_counter()
+        restarted = WeatherData(fileName=file_name)
+        weather = restarted.cached(key)
+        cache_time = time.perf_counter() - start
+        check("restart shows cached data", weather is not None and weather["name"] == "London",
+              "data after %.1f ms without network" % (cache_time * 1000))
+    responder.shutdown()
+    if failed:
+        sys.exit(1)
+
+
+def bench_ntp(args):
+    # NTP monitor of an offscreen instance against a local stand-in NTP server and a port nobody answers on
+    # exits with 1 if one of the checks fails
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import ntp_responder
+    import start as oas
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    responder_args = ntp_responder.parser.parse_args(["-p", "0", "-o", str(args.offset)])
+    responder = ntp_responder.make_socket(responder_args)
+    threading.Thread(target=ntp_responder.serve, args=(responder_args, responder), daemon=True).start()
+    server = "127.0.0.1:%d" % responder.getsockname()[1]
+    unused = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    unused.bind(("127.0.0.1", 0))
+    dead = "127.0.0.1:%d" % unused.getsockname()[1]
+    unused.close()
+    failed = []
+
+    def check(name, ok, detail):
+        print("%-36s %-4s %s" % (name, "ok" if ok else "FAIL", detail))
+        if not ok:
+            failed.append(name)
+
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    main_screen.config.config["NTP"]["ntpcheck"] = True
+    main_screen.config.config["NTP"]["ntpcheckserver"] = "%s,%s" % (server, dead)
+    main_screen.update_ntp_monitor()
+
+    # backoff after each failure of the dead server, as seen right after the failure
+    backoffs = {}
+    deadline = time.perf_counter() + args.timeout
+    while time.perf_counter() < deadline and len(backoffs) < 3:
+        oas.app.processEvents()
+        state = main_screen.ntpMonitor.history()["servers"][dead]
+        if state["failures"] and state["failures"] not in backoffs and state["next_check_in"] is not None:
+            backoffs[state["failures"]] = state["next_check_in"]
+        time.sleep(0.01)
+    # the warning is taken over on the next clock tick
+    for i in range(150):
+        oas.app.processEvents()
+        time.sleep(0.01)
+
+    warning = main_screen.warnings[0]
+    check("offset %+g s raises a warning" % args.offset, "offset too big" in warning, repr(warning))
+    delays = [backoffs[failures] for failures in sorted(backoffs)]
+    check("dead server backs off", len(delays) >= 2 and delays == sorted(delays) and delays[0] < delays[-1],
+          "retries after %s s" % ", ".join("%.1f" % delay for delay in delays))
+
+    connection = http.client.HTTPConnection("127.0.0.1", main_screen.config.value("Network", "httpport"), timeout=5)
+    connection.request("GET", "/ntp")
+    reply = json.loads(connection.getresponse().read())
+    connection.close()
+    samples = reply["servers"].get(server, {}).get("samples", [])
+    history = main_screen.ntpMonitor.history()["servers"][server]["samples"]
+    check("history() and /ntp have samples",
+          samples and samples == history and abs(samples[-1]["offset"] - args.offset) < 0.1,
+          "%d sample(s), offset %s" % (len(samples), "%+.3f s" % samples[-1]["offset"] if samples else "-"))
+    main_screen.quit_oas()
+    responder.close()
+    if failed:
+        sys.exit(1)
+
+
+def bench_config(args):
+    # config reads on the hot paths of an offscreen instance: clock ticks, commands and HTTP requests
+    # exits with 1 if the backing config file is parsed again
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import start as oas
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    main_screen = oas.MainScreen()
+    main_screen.show()
+    oas.app.processEvents()
+    config = main_screen.config
+    port = config.value("Network", "httpport")
+    failed = []
+
+    def check(name, ok, detail):
+        print("%-36s %-4s %s" % (name, "ok" if ok else "FAIL", detail))
+        if not ok:
+            failed.append(name)
+
+    def run(name, function):
+        before = config.stats()
+        start = time.perf_counter()
+        for i in range(args.iterations):
+            function(i)
+        oas.app.processEvents()
+        elapsed = time.perf_counter() - start
+        after = config.stats()
+        check(name, after["backend_reads"] == before["backend_reads"],
+              "%d reads, %d parses, %.1f us per call" % (after["reads"] - before["reads"],
+                                                         after["backend_reads"] - before["backend_reads"],
+                                                         elapsed / args.iterations * 1e6))
+
+    commands = [b"LED1:ON", b"LED1:OFF", b"AIR1:ON", b"AIR1:OFF", b"NOW:config", b"WARN:config", b"WARN:"]
+
+    def command(i):
+        main_screen.parse_cmd(commands[i % len(commands)])
+        main_screen.flush_commands()
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+
+    def get(i):
+        connection.request("GET", ("/status", "/timers")[i % 2])
+        connection.getresponse().read()
+
+    # the HTTP server is started in its own thread
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            oas.app.processEvents()
+            time.sleep(0.01)
+
+    run("clock ticks", lambda i: main_screen.half_second_tick(i % 2 == 0))
+    run("LED/AIR/NOW/WARN commands", command)
+    run("HTTP /status and /timers", get)
+    connection.close()
+    main_screen.quit_oas()
+    if failed:
+        sys.exit(1)
+
+
+def rss_kib():
+    # resident memory of this process
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def startup_child(args):
+    # one startup in this process, prints the timings as JSON
+    from PyQt5.QtCore import QEvent, QObject
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    import start as oas
+    imported = time.perf_counter()
+    oas.app = QApplication.instance() or QApplication(sys.argv)
+    painted = []
+
+    class PaintWatch(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint and not painted:
+                painted.append(time.perf_counter())
+            return False
+
+    main_screen = oas.MainScreen()
+    if args.eager:
+        main_screen.get_settings()
+    constructed = time.perf_counter()
+    watch = PaintWatch()
+    main_screen.installEventFilter(watch)
+    main_screen.show()
+    while not painted:
+        oas.app.processEvents()
+    # the first frame is counted from the end of the imports, which are the same in both modes
+    result = {"import": imported - start, "construct": constructed - imported, "first_frame": painted[0] - imported,
+              "rss": rss_kib()}
+    dialog_start = time.perf_counter()
+    main_screen.get_settings()
+    result["settings"] = time.perf_counter() - dialog_start
+    result["rss_settings"] = rss_kib()
+    main_screen.quit_oas()
+    print(json.dumps(result))
+
+
+def bench_startup(args):
+    # time to the first frame and resident memory of fresh processes, with a lazy and an eager settings dialog
+    if args.child:
+        startup_child(args)
+        return
+    print("%-6s %10s %12s %14s %10s %15s %17s" % ("", "import ms", "construct ms", "first frame ms", "RSS MiB",
+                                                  "settings ms", "RSS w/ settings"))
+    for name, eager in (("lazy", False), ("eager", True)):
+        runs = []
+        for i in range(args.runs):
+            command = [sys.executable, os.path.abspath(__file__), "startup", "--child"] + (["--eager"] if eager else [])
+            output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+            runs.append(json.loads([line for line in output.decode().splitlines() if line.startswith("{")][-1]))
+
+        def median(key):
+            return statistics.median(run[key] for run in runs)
+
+        print("%-6s %10.1f %12.1f %14.1f %10.1f %15.1f %17.1f" % (
+            name, median("import") * 1000, median("construct") * 1000, median("first_frame") * 1000,
+            median("rss") / 1024, median("settings") * 1000, median("rss_settings") / 1024))
+
+
+parser = argparse.ArgumentParser(description='OnAirScreen micro benchmarks.')
+subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+indicators_parser = subparsers.add_parser("indicators",
+                                          help="LED/AIR indicator state switching, stylesheet vs. palette")
+indicators_parser.add_argument("-n", "--iterations", type=int, help="number of state switches (default: 2000)",
+                               default=2000)
+indicators_parser.set_defaults(func=bench_indicators)
+
+commands_parser = subparsers.add_parser("commands", help="UDP command throughput, text vs. binary batches "
+                                                         "(needs the generated UI modules, see Makefile)")
+commands_parser.add_argument("-n", "--iterations", type=int, help="number of batches (default: 500)", default=500)
+commands_parser.add_argument("-b", "--batch", type=int, help="commands per batch (default: 24)", default=24)
+commands_parser.add_argument("-d", "--decode-only", help="only measure decoding, no MainScreen",
+                             action='store_true')
+commands_parser.set_defaults(func=bench_commands)
+
+flood_parser = subparsers.add_parser("flood", help="burst of NOW/NEXT/LED/AIR commands, shows how many are "
+                                                   "coalesced (needs the generated UI modules, see Makefile)")
+flood_parser.add_argument("-c", "--commands", type=int, help="number of commands (default: 500)", default=500)
+flood_parser.set_defaults(func=bench_flood)
+
+http_parser = subparsers.add_parser("http", help="HTTP API load test against a running instance, "
+                                                 "requests/s and p50/p99 latency")
+http_parser.add_argument("-u", "--url", type=str, help="OnAirScreen HTTP API (default: http://127.0.0.1:8010)",
+                         default="http://127.0.0.1:8010")
+http_parser.add_argument("-n", "--requests", type=int, help="number of requests per run (default: 2000)",
+                         default=2000)
+http_parser.add_argument("-c", "--clients", type=lambda text: [int(clients) for clients in text.split(",")],
+                         help="comma separated concurrent clients per run (default: 1,10,100)", default=[1, 10, 100])
+http_parser.add_argument("-b", "--batch", type=int, help="commands per request, more than 1 uses POST (default: 1)",
+                         default=1)
+http_parser.add_argument("--command", type=str, help="command to send (default: NOW:benchmark)",
+                         default="NOW:benchmark")
+http_parser.add_argument("--path", type=str, help="GET this path instead of sending a command, e.g. /status")
+http_parser.set_defaults(func=bench_http)
+
+tcp_parser = subparsers.add_parser("tcp", help="pipelined commands over persistent TCP connections of a running "
+                                               "instance, commands/s and p50/p99 ack latency")
+tcp_parser.add_argument("--host", type=str, help="OnAirScreen host (default: 127.0.0.1)", default="127.0.0.1")
+tcp_parser.add_argument("-p", "--port", type=int, help="OnAirScreen TCP port (default: 3310)", default=3310)
+tcp_parser.add_argument("-n", "--commands", type=int, help="number of commands per run (default: 20000)",
+                        default=20000)
+tcp_parser.add_argument("-c", "--clients", type=lambda text: [int(clients) for clients in text.split(",")],
+                        help="comma separated concurrent connections per run (default: 1,10)", default=[1, 10])
+tcp_parser.add_argument("-w", "--window", type=int, help="unacknowledged commands per connection, 1 disables "
+                                                         "pipelining (default: 64)", default=64)
+tcp_parser.add_argument("--command", type=str, help="command to send (default: NOW:benchmark)",
+                        default="NOW:benchmark")
+tcp_parser.set_defaults(func=bench_tcp)
+
+latency_parser = subparsers.add_parser("latency", help="command to pixel latency of an offscreen instance, "
+                                                       "optionally under load (needs the generated UI modules, "
+                                                       "see Makefile)")
+latency_parser.add_argument("-n", "--commands", type=int, help="number of commands (default: 200)", default=200)
+latency_parser.add_argument("-i", "--interval", type=float, help="ms between commands (default: 40)", default=40)
+latency_parser.add_argument("--flood", type=float, help="background NOW commands per second (default: 0)",
+                            default=0)
+latency_parser.add_argument("--busy", type=int, help="background threads with CPU bound work (default: 0)",
+                            default=0)
+latency_parser.add_argument("--budget", type=float, help="fail if the p99 paint latency of a command is over "
+                                                         "BUDGET ms")
+latency_parser.set_defaults(func=bench_latency)
+
+clock_parser = subparsers.add_parser("clock", help="draw operations and paint time per frame of the clock widget "
+                                                   "in digital and analog mode")
+clock_parser.add_argument("-f", "--frames", type=int, help="number of frames per mode (default: 500)", default=500)
+clock_parser.add_argument("--size", type=int, help="widget width and height (default: 400)", default=400)
+clock_parser.add_argument("--budget", type=float, help="max. paint time per sweep frame in ms (default: 10)",
+                          default=10.0)
+clock_parser.set_defaults(func=bench_clock)
+
+weather_parser = subparsers.add_parser("weather", help="paint time per frame of the weather widget "
+                                                       "(needs the generated resources module, see Makefile)")
+weather_parser.add_argument("-f", "--frames", type=int, help="number of frames (default: 500)", default=500)
+weather_parser.add_argument("-c", "--change", type=int, help="frames between condition changes (default: 50)",
+                            default=50)
+weather_parser.add_argument("--width", type=int, help="widget width (default: 480)", default=480)
+weather_parser.add_argument("--height", type=int, help="widget height (default: 270)", default=270)
+weather_parser.add_argument("--cities", type=int, help="cities in rotation (default: 4)", default=4)
+weather_parser.set_defaults(func=bench_weather)
+
+weatherdata_parser = subparsers.add_parser("weatherdata", help="weather data cache against a local stand-in OWM "
+                                                               "server, see utils/owm_responder.py")
+weatherdata_parser.add_argument("-c", "--clients", type=int, help="concurrent fetches of the same city (default: 20)",
+                                default=20)
+weatherdata_parser.add_argument("-d", "--delay", type=float, help="ms the stand-in server waits before answering "
+                                                                  "(default: 200)", default=200)
+weatherdata_parser.set_defaults(func=bench_weatherdata)
+
+startup_parser = subparsers.add_parser("startup", help="time to the first frame and resident memory of an offscreen "
+                                                       "instance (needs the generated UI modules, see Makefile)")
+startup_parser.add_argument("-r", "--runs", type=int, help="fresh processes per mode (default: 5)", default=5)
+startup_parser.add_argument("--eager", help=argparse.SUPPRESS, action='store_true')
+startup_parser.add_argument("--child", help=argparse.SUPPRESS, action='store_true')
+startup_parser.set_defaults(func=bench_startup)
+
+ntp_parser = subparsers.add_parser("ntp", help="NTP monitor of an offscreen instance against a local stand-in NTP "
+                                               "server, see utils/ntp_responder.py (needs the generated UI modules, "
+                                               "see Makefile)")
+ntp_parser.add_argument("-o", "--offset", type=float, help="seconds the stand-in server is ahead (default: 1)",
+                        default=1.0)
+ntp_parser.add_argument("-t", "--timeout", type=float, help="seconds to wait for the failures of the dead server "
+                                                            "(default: 20)", default=20.0)
+ntp_parser.set_defaults(func=bench_ntp)
+
+config_parser = subparsers.add_parser("config", help="config reads on the hot paths of an offscreen instance, "
+                                                     "fails if the config file is parsed again (needs the "
+                                                     "generated UI modules, see Makefile)")
+config_parser.add_argument("-n", "--iterations", type=int, help="calls per hot path (default: 1000)", default=1000)
+config_parser.set_defaults(func=bench_config)
+
+events_parser = subparsers.add_parser("events", help="fan-out of state changes to Server-Sent Events subscribers "
+                                                     "of a running instance")
+events_parser.add_argument("-u", "--url", type=str, help="OnAirScreen HTTP API (default: http://127.0.0.1:8010)",
+                           default="http://127.0.0.1:8010")
+events_parser.add_argument("-s", "--subscribers", type=int, help="number of subscribers (default: 200)", default=200)
+events_parser.add_argument("-m", "--messages", type=int, help="number of state changes (default: 200)", default=200)
+events_parser.set_defaults(func=bench_events)
+
+if __name__ == "__main__":
+    # benchmarks run without a display by default
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    args = parser.parse_args()
+    args.func(args)
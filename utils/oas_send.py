@@ -36,20 +36,272 @@
 #############################################################################
 
 import argparse
+import collections
+import http.client
+import json
 import socket
+import sys
+import threading
+import time
+import urllib.parse
 
-parser = argparse.ArgumentParser(description='Send an UDP API command to OnAirScreen.')
-parser.add_argument("-i", "--ip", type=str, help="OnAirScreen target IP (default: 127.0.0.1)", default="127.0.0.1")
-parser.add_argument("-p", "--port", type=int, help="OnAirScreen target port (default: 3310)", default="3310")
-parser.add_argument("-s", "--silent", help="do not print any information, except for errors", action='store_true')
-parser.add_argument('message', type=str, help="API message to send")
-args = parser.parse_args()
-
-UDP_IP = args.ip
-UDP_PORT = args.port
-MESSAGE = args.message
-
-if not args.silent:
-    print("IP:", UDP_IP, "| PORT:", UDP_PORT, "| Message:", MESSAGE)
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.sendto(bytes(MESSAGE, "utf-8"), (UDP_IP, UDP_PORT))
+# upper bounds of the latency histogram buckets in ms
+HISTOGRAM_BUCKETS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+DEFAULT_PORTS = {"udp": 3310, "tcp": 3310, "http": 8010}
+
+
+class UdpSender:
+    # fire and forget, a batch is one datagram
+    def __init__(self, args):
+        self.address = (args.ip, args.port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.latencies = []
+        self.errors = 0
+
+    def send(self, commands):
+        self.sock.sendto("\n".join(commands).encode("utf-8"), self.address)
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpSender:
+    # one persistent connection, up to window commands wait for their ack
+    def __init__(self, args):
+        self.sock = socket.create_connection((args.ip, args.port), timeout=10)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.acks = self.sock.makefile("rb")
+        self.windowSize = args.window
+        self.window = threading.Semaphore(args.window)
+        self.unacked = collections.deque()
+        self.latencies = []
+        self.errors = 0
+        self.verbose = args.verbose
+        self.reader = threading.Thread(target=self.read_acks, daemon=True)
+        self.reader.start()
+
+    def send(self, commands):
+        data = b""
+        for command in commands:
+            self.window.acquire()
+            self.unacked.append((time.perf_counter(), command))
+            data += command.encode("utf-8") + b"\n"
+        self.sock.sendall(data)
+
+    def read_acks(self):
+        for ack in self.acks:
+            sent, command = self.unacked.popleft()
+            self.latencies.append(time.perf_counter() - sent)
+            if not ack.startswith(b"OK"):
+                self.errors += 1
+                print("ERROR:", command, "->", ack.decode("utf-8", "replace").strip(), file=sys.stderr)
+            elif self.verbose:
+                print(ack.decode("utf-8", "replace").strip())
+            self.window.release()
+
+    def close(self):
+        # wait for all acks, OnAirScreen does not answer commands that are still in flight when we close
+        for i in range(self.windowSize):
+            if not self.window.acquire(timeout=10):
+                print("ERROR: %d commands were not acknowledged" % len(self.unacked), file=sys.stderr)
+                break
+        self.sock.shutdown(socket.SHUT_RDWR)
+        self.reader.join()
+        self.sock.close()
+
+
+class HttpSender:
+    # one keep-alive connection, a single command is a GET, a batch a POST
+    def __init__(self, args):
+        self.connection = http.client.HTTPConnection(args.ip, args.port, timeout=10)
+        self.latencies = []
+        self.errors = 0
+        self.verbose = args.verbose
+
+    def send(self, commands):
+        start = time.perf_counter()
+        if len(commands) == 1:
+            self.connection.request("GET", "/?cmd=" + urllib.parse.quote(commands[0]))
+        else:
+            self.connection.request("POST", "/", body="\n".join(commands).encode("utf-8"),
+                                    headers={"Content-Type": "text/plain; charset=utf-8"})
+        reply = self.connection.getresponse()
+        body = reply.read()
+        self.latencies.append(time.perf_counter() - start)
+        if reply.status != 200:
+            self.errors += len(commands)
+            print("ERROR: HTTP", reply.status, reply.reason, file=sys.stderr)
+            return
+        results = json.loads(body)["results"]
+        for result in results:
+            if result["status"] != "ok":
+                self.errors += 1
+                print("ERROR:", result["command"], "->", result["status"], file=sys.stderr)
+        if self.verbose:
+            print(body.decode("utf-8").strip())
+
+    def close(self):
+        self.connection.close()
+
+
+SENDERS = {"udp": UdpSender, "tcp": TcpSender, "http": HttpSender}
+
+
+def read_commands(source):
+    # non-empty lines of a file or stdin, read as they come so pipes are streamed
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with stream:
+        for line in stream:
+            line = line.rstrip("\r\n")
+            if line:
+                yield line
+
+
+def read_log(source):
+    # (seconds, command) from a log written with --record
+    for line in read_commands(source):
+        try:
+            seconds, command = line.split("\t", 1)
+            yield float(seconds), command
+        except ValueError:
+            print("ERROR: invalid log line:", line, file=sys.stderr)
+
+
+def schedule(args):
+    # (seconds after start or None for as soon as possible, command)
+    if args.replay:
+        first = None
+        for seconds, command in read_log(args.replay):
+            if first is None:
+                first = seconds
+            yield (seconds - first) / args.speed, command
+        return
+    for i in range(args.repeat):
+        if args.message:
+            commands = args.message
+        else:
+            commands = read_commands(args.file)
+        for command in commands:
+            if args.target:
+                command = "@%s:%s" % (args.target, command)
+            yield None, command
+
+
+def batches(args):
+    # (seconds after start or None, list of commands), --rate paces commands and not batches
+    batch = []
+    due = None
+    count = 0
+    for seconds, command in schedule(args):
+        if not batch:
+            due = seconds
+            if args.rate:
+                due = count / args.rate
+        batch.append(command)
+        count += 1
+        if len(batch) >= args.batch or args.replay:
+            yield due, batch
+            batch = []
+    if batch:
+        yield due, batch
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+def print_histogram(latencies):
+    latencies = sorted(latencies)
+    print("latency: p50 %.2f ms, p90 %.2f ms, p99 %.2f ms, max %.2f ms" % (
+        percentile(latencies, 0.5), percentile(latencies, 0.9), percentile(latencies, 0.99), latencies[-1] * 1000))
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for latency in latencies:
+        bucket = 0
+        while bucket < len(HISTOGRAM_BUCKETS) and latency * 1000 >= HISTOGRAM_BUCKETS[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+    widest = max(counts)
+    for bucket, count in enumerate(counts):
+        if not count:
+            continue
+        if bucket < len(HISTOGRAM_BUCKETS):
+            label = "< %g ms" % HISTOGRAM_BUCKETS[bucket]
+        else:
+            label = ">= %g ms" % HISTOGRAM_BUCKETS[-1]
+        print("%12s %8d %s" % (label, count, "#" * max(1, count * 40 // widest)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Send API commands to OnAirScreen, from the command line, a file or stdin, '
+                    'as a load generator or by replaying a recorded command log.')
+    parser.add_argument("-i", "--ip", type=str, help="OnAirScreen target IP or UDP multicast group "
+                                                     "(default: 127.0.0.1)", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, help="OnAirScreen target port (default: 3310, 8010 for http)")
+    parser.add_argument("-t", "--transport", choices=SENDERS, help="udp, tcp with an ack per command or http "
+                                                                    "(default: udp)", default="udp")
+    parser.add_argument("-s", "--silent", help="do not print any information, except for errors",
+                        action='store_true')
+    parser.add_argument("-v", "--verbose", help="print every ack or reply", action='store_true')
+    parser.add_argument("-f", "--file", type=str, help="read commands from FILE, one per line, - for stdin "
+                                                       "(default if no message is given)", default="-")
+    parser.add_argument("-n", "--repeat", type=int, help="send the commands N times (default: 1)", default=1)
+    parser.add_argument("-r", "--rate", type=float, help="commands per second (default: as fast as possible)")
+    parser.add_argument("-b", "--batch", type=int, help="commands per UDP datagram or HTTP request (default: 1)",
+                        default=1)
+    parser.add_argument("-w", "--window", type=int, help="TCP commands waiting for their ack (default: 64)",
+                        default=64)
+    parser.add_argument("-T", "--target", type=str, help="only screens with one of these comma separated ids or tags "
+                                                         "apply the commands, e.g. studio2,screen7")
+    parser.add_argument("--record", type=str, help="write the sent commands with their time to a log for --replay")
+    parser.add_argument("--replay", type=str, help="send the commands of a recorded log with their original timing")
+    parser.add_argument("--speed", type=float, help="replay speed factor (default: 1.0)", default=1.0)
+    parser.add_argument('message', type=str, nargs="*", help="API messages to send")
+    args = parser.parse_args()
+    if args.port is None:
+        args.port = DEFAULT_PORTS[args.transport]
+    if args.batch > 1 and args.transport == "tcp":
+        parser.error("--batch is not available for tcp, commands are pipelined, see --window")
+
+    if not args.silent:
+        print("IP:", args.ip, "| PORT:", args.port, "| Transport:", args.transport,
+              "| Message:", " ".join(args.message) if args.message else args.replay or args.file)
+    sender = SENDERS[args.transport](args)
+    record = open(args.record, "w", encoding="utf-8") if args.record else None
+    sent = 0
+    lateness = 0.0
+    start = time.perf_counter()
+    try:
+        for due, commands in batches(args):
+            if due is not None:
+                wait = start + due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    lateness = max(lateness, -wait)
+            if record:
+                elapsed = time.perf_counter() - start
+                record.writelines("%.6f\t%s\n" % (elapsed, command) for command in commands)
+            sender.send(commands)
+            sent += len(commands)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sender.close()
+        if record:
+            record.close()
+    elapsed = time.perf_counter() - start
+
+    if args.silent or sent <= 1:
+        return
+    print("%d commands in %.3f s, %.0f commands/s, %d errors" % (sent, elapsed, sent / elapsed, sender.errors))
+    if args.rate or args.replay:
+        print("max. %.2f ms behind schedule" % (lateness * 1000))
+    if sender.latencies:
+        print_histogram(sender.latencies)
+    elif args.transport == "udp":
+        print("no latency over udp, there are no acks")
+
+
+if __name__ == "__main__":
+    main()
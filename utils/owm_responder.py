@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# owm_responder.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CITIES = {"2643743": "London", "2950159": "Berlin", "2867714": "München", "5128581": "New York"}
+DESCRIPTIONS = {"de": "Leichter Regen", "en": "light rain"}
+
+parser = argparse.ArgumentParser(description='Local stand-in for the OpenWeatherMap current weather and group API, for '
+                                             'testing the OnAirScreen weather widget, e.g. with '
+                                             'owmURL=http://127.0.0.1:8020/data/2.5/weather.')
+parser.add_argument("-b", "--bind", type=str, help="address to listen on (default: 127.0.0.1)", default="127.0.0.1")
+parser.add_argument("-p", "--port", type=int, help="HTTP port (default: 8020)", default=8020)
+parser.add_argument("-d", "--delay", type=float, help="ms to wait before answering (default: 0)", default=0.0)
+parser.add_argument("--fail", type=float, help="fraction of requests answered with HTTP 500 (default: 0)",
+                    default=0.0)
+parser.add_argument("-i", "--icon", type=str, help="condition icon and background in the answers (default: 10d)",
+                    default="10d")
+parser.add_argument("-t", "--temperature", type=float, help="temperature in °C (default: 12.3)", default=12.3)
+parser.add_argument("-v", "--verbose", help="print every request", action='store_true')
+
+
+def weather(city, query, args, position=0):
+    # current weather like api.openweathermap.org/data/2.5/weather answers it, a degree warmer per group position
+    units = query.get("units", [""])[0]
+    temperature = args.temperature + position
+    if units == "imperial":
+        temperature = temperature * 9 / 5 + 32
+    elif units != "metric":
+        temperature += 273.15
+    return {
+        "weather": [{"id": 500, "main": "Rain", "icon": args.icon,
+                     "description": DESCRIPTIONS.get(query.get("lang", ["en"])[0], DESCRIPTIONS["en"])}],
+        "main": {"temp": temperature, "humidity": 81},
+        "dt": int(time.time()),
+        "id": int(city) if city.isdigit() else 0,
+        "name": CITIES.get(city, "City %s" % city),
+        "cod": 200,
+    }
+
+
+def make_server(args):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            with server.lock:
+                server.requests += 1
+            if args.verbose:
+                print(self.path)
+            if args.delay:
+                time.sleep(args.delay / 1000)
+            if url.path not in ("/data/2.5/weather", "/data/2.5/group"):
+                self.answer(404, {"cod": "404", "message": "Internal error"})
+            elif not query.get("appid", [""])[0]:
+                self.answer(401, {"cod": 401, "message": "Invalid API key."})
+            elif random.random() < args.fail:
+                self.answer(500, {"cod": 500, "message": "Internal server error"})
+            elif url.path == "/data/2.5/group":
+                cities = query.get("id", [""])[0].split(",")
+                items = [weather(city, query, args, position) for position, city in enumerate(cities)]
+                self.answer(200, {"cnt": len(items), "list": items})
+            else:
+                self.answer(200, weather(query.get("id", [""])[0], query, args))
+
+        def answer(self, status, data):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((args.bind, args.port), Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    return server
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    server = make_server(args)
+    print("OWM responder on http://%s:%d/data/2.5/weather" % server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+# OnAirScreen
+# Copyright (c) 2012-2020 Sascha Ludwig, astrastudio.de
+# All rights reserved.
+#
+# weather_data.py
+# This file is part of OnAirScreen
+#
+# You may use this file under the terms of the BSD license as follows:
+#
+# "Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in
+#     the documentation and/or other materials provided with the
+#     distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."
+#
+#############################################################################
+
+import json
+import os
+import time
+from urllib.parse import urlencode
+
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from settings_store import SettingsStore
+
+OWM_URL = "http://api.openweathermap.org/data/2.5/weather"
+# cached weather is fetched again after WEATHER_TTL seconds, a bit less than the 10 minute update interval
+WEATHER_TTL = 9 * 60
+# weather older than WEATHER_MAX_AGE seconds is not shown anymore, also after a restart
+WEATHER_MAX_AGE = 24 * 60 * 60
+WEATHER_TIMEOUT = 10
+WEATHER_CACHE_FILE = "weather.json"
+# cities per OWM group request
+OWM_GROUP_MAX = 20
+
+
+def owm_url(city, units, language, api_key, url=OWM_URL):
+    return url + "?" + urlencode({"id": city, "units": units, "lang": language, "appid": api_key})
+
+
+def owm_group_url(cities, units, language, api_key, url=OWM_URL):
+    # several cities in one request, the group endpoint lives next to the weather endpoint
+    if url.endswith("/weather"):
+        url = url[:-len("weather")] + "group"
+    return owm_url(",".join(cities), units, language, api_key, url=url)
+
+
+class WeatherData(QObject):
+    """
+    OpenWeatherMap client with one long-lived network manager and a cache of the last good data
+
+    Weather is cached per (city, units, language) for WEATHER_TTL seconds and persisted next to the config file,
+    so a restart shows the last good data at once. Concurrent requests for the same key share one network request,
+    fetch_group() gets several cities with one request.
+    """
+
+    # emitted with the key and the OWM JSON data on every fresh reply
+    sigWeather = pyqtSignal(tuple, dict)
+    # emitted with the key and an error string if a request failed
+    sigError = pyqtSignal(tuple, str)
+
+    shared = None
+
+    @classmethod
+    def instance(cls):
+        if cls.shared is None:
+            cls.shared = cls()
+        return cls.shared
+
+    def __init__(self, parent=None, fileName=None):
+        super(WeatherData, self).__init__(parent)
+        self.manager = QNetworkAccessManager(self)
+        if fileName is None:
+            fileName = os.path.join(os.path.dirname(SettingsStore.open().fileName()), WEATHER_CACHE_FILE)
+        self.fileName = fileName
+        # key -> {"time": wall clock of the reply, "data": OWM JSON}
+        self.cache = {}
+        # key -> reply in flight
+        self.pending = {}
+        self.requests = 0
+        self.hits = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.fileName, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+            self.cache = {tuple(entry["key"]): {"time": entry["time"], "data": entry["data"]} for entry in entries}
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            if not isinstance(error, FileNotFoundError):
+                print("Weather cache not loaded:", error)
+
+    def save(self):
+        entries = [{"key": list(key), "time": entry["time"], "data": entry["data"]}
+                   for key, entry in self.cache.items()]
+        temp_name = self.fileName + ".tmp"
+        try:
+            with open(temp_name, "w", encoding="utf-8") as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(temp_name, self.fileName)
+        except OSError as error:
+            print("Weather cache not saved:", error)
+
+    def cached(self, key):
+        # last good data of a key if it is not too old to be shown, else None
+        entry = self.cache.get(key)
+        if entry is None or time.time() - entry["time"] > WEATHER_MAX_AGE:
+            return None
+        return entry["data"]
+
+    def fresh(self, key):
+        entry = self.cache.get(key)
+        return entry is not None and 0 <= time.time() - entry["time"] < WEATHER_TTL
+
+    def fetch(self, key, api_key, url=OWM_URL, force=False):
+        # request fresh weather for key = (city, units, language) unless the cached data is fresh enough
+        if not force and self.fresh(key):
+            self.hits += 1
+            return False
+        if key in self.pending:
+            return True
+        self.request([key], QUrl(owm_url(*key, api_key, url=url)))
+        return True
+
+    def fetch_group(self, keys, api_key, url=OWM_URL, force=False):
+        # like fetch() for several keys with the same units and language, all stale cities in one request
+        stale = [key for key in keys if (force or not self.fresh(key)) and key not in self.pending]
+        if not stale:
+            if not any(key in self.pending for key in keys):
+                self.hits += 1
+            return False
+        for start in range(0, len(stale), OWM_GROUP_MAX):
+            batch = stale[start:start + OWM_GROUP_MAX]
+            units, language = batch[0][1:]
+            self.request(batch, QUrl(owm_group_url([key[0] for key in batch], units, language, api_key, url=url)))
+        return True
+
+    def request(self, keys, url):
+        request = QNetworkRequest(url)
+        request.setTransferTimeout(WEATHER_TIMEOUT * 1000)
+        reply = self.manager.get(request)
+        for key in keys:
+            self.pending[key] = reply
+        self.requests += 1
+        reply.finished.connect(lambda: self.finished(keys, reply))
+
+    def finished(self, keys, reply):
+        for key in keys:
+            self.pending.pop(key, None)
+        reply.deleteLater()
+        if reply.error() != QNetworkReply.NoError:
+            for key in keys:
+                self.sigError.emit(key, "Error occured: {}, {}".format(reply.error(), reply.errorString()))
+            return
+        try:
+            data = json.loads(str(reply.readAll(), "utf-8"))
+            # a group reply lists the weather of every city
+            items = data["list"] if "list" in data else [data]
+            # only data the widget can show is cached
+            for item in items:
+                if not item["weather"] or "temp" not in item["main"]:
+                    raise ValueError("no weather or temperature")
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            for key in keys:
+                self.sigError.emit(key, "Invalid weather data: {}".format(error))
+            return
+        by_city = {str(item.get("id")): item for item in items}
+        now = time.time()
+        received = []
+        for key in keys:
+            item = by_city.get(key[0], items[0] if len(keys) == 1 and items else None)
+            if item is None:
+                self.sigError.emit(key, "No weather data for city {}".format(key[0]))
+                continue
+            self.cache[key] = {"time": now, "data": item}
+            received.append((key, item))
+        # all cities of a group are saved together
+        self.save()
+        for key, item in received:
+            self.sigWeather.emit(key, item)
+
+    def stats(self):
+        return {"requests": self.requests, "hits": self.hits, "pending": len(self.pending), "cached": len(self.cache)}
@@ -37,8 +37,112 @@
 
 
 from PyQt5 import QtCore, QtGui, QtWidgets
-import PyQt5.QtNetwork as QtNetwork
-import json
+import collections
+
+from weather_data import OWM_URL, WeatherData
+
+
+class ShadowLabel(QtWidgets.QLabel):
+    """
+    QLabel with a black drop shadow like QGraphicsDropShadowEffect
+
+    The label and its blurred shadow are rendered once per content and size and painted by the parent widget,
+    the shadow extends beyond the label. With setShadowCached(False) a live QGraphicsDropShadowEffect is used.
+    """
+
+    # shadowed images by content, least recently used first
+    shadowCache = collections.OrderedDict()
+    shadowCacheSize = 32
+    shadowRenders = 0
+
+    def __init__(self, parent, blurRadius):
+        super(ShadowLabel, self).__init__(parent)
+        self.blurRadius = blurRadius
+        self.shadowColor = QtGui.QColor("#000")
+        self.shadowCached = True
+        self.rendering = False
+
+    def setShadowCached(self, cached):
+        self.shadowCached = cached
+        if cached:
+            self.setGraphicsEffect(None)
+        else:
+            effect = QtWidgets.QGraphicsDropShadowEffect()
+            effect.setBlurRadius(self.blurRadius)
+            effect.setColor(self.shadowColor)
+            effect.setOffset(0, 0)
+            self.setGraphicsEffect(effect)
+        self.updateShadow()
+
+    def updateShadow(self):
+        # the shadow is painted by the parent and reaches beyond the label
+        if self.parentWidget():
+            self.parentWidget().update()
+
+    def setText(self, text):
+        super(ShadowLabel, self).setText(text)
+        self.updateShadow()
+
+    def setPixmap(self, pixmap):
+        super(ShadowLabel, self).setPixmap(pixmap)
+        self.updateShadow()
+
+    def moveEvent(self, event):
+        super(ShadowLabel, self).moveEvent(event)
+        self.updateShadow()
+
+    def resizeEvent(self, event):
+        super(ShadowLabel, self).resizeEvent(event)
+        self.updateShadow()
+
+    def paintEvent(self, event):
+        if self.rendering or not self.shadowCached:
+            super(ShadowLabel, self).paintEvent(event)
+
+    def shadowed(self):
+        # cached image of label and shadow and its margin around the label
+        pixmap = self.pixmap()
+        key = (self.text(), pixmap.cacheKey() if pixmap else None, self.font().key(),
+               self.palette().color(QtGui.QPalette.WindowText).rgba(), int(self.alignment()), self.width(),
+               self.height(), self.devicePixelRatioF(), self.blurRadius, self.shadowColor.rgba())
+        shadowed = self.shadowCache.get(key)
+        if shadowed is None:
+            shadowed = self.renderShadow()
+            self.shadowCache[key] = shadowed
+            while len(self.shadowCache) > self.shadowCacheSize:
+                self.shadowCache.popitem(last=False)
+        else:
+            self.shadowCache.move_to_end(key)
+        return shadowed
+
+    def renderShadow(self):
+        ShadowLabel.shadowRenders += 1
+        dpr = self.devicePixelRatioF()
+        source = QtGui.QPixmap(round(self.width() * dpr), round(self.height() * dpr))
+        source.setDevicePixelRatio(dpr)
+        source.fill(QtCore.Qt.transparent)
+        self.rendering = True
+        self.render(source, QtCore.QPoint(), QtGui.QRegion(), QtWidgets.QWidget.DrawChildren)
+        self.rendering = False
+
+        # blur once with the same filter as QGraphicsDropShadowEffect, in device pixels
+        source.setDevicePixelRatio(1)
+        margin = self.blurRadius
+        scene = QtWidgets.QGraphicsScene()
+        item = scene.addPixmap(source)
+        effect = QtWidgets.QGraphicsDropShadowEffect()
+        effect.setBlurRadius(self.blurRadius * dpr)
+        effect.setColor(self.shadowColor)
+        effect.setOffset(0, 0)
+        item.setGraphicsEffect(effect)
+        rect = QtCore.QRectF(source.rect()).adjusted(-margin * dpr, -margin * dpr, margin * dpr, margin * dpr)
+        shadowed = QtGui.QPixmap(round(rect.width()), round(rect.height()))
+        shadowed.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(shadowed)
+        scene.render(painter, QtCore.QRectF(shadowed.rect()), rect)
+        painter.end()
+        shadowed.setDevicePixelRatio(dpr)
+        return shadowed, margin
 
 
 class WeatherWidget(QtWidgets.QWidget):
@@ -54,14 +158,37 @@ class WeatherWidget(QtWidgets.QWidget):
 
     def __init__(self, parent=None):
         super(WeatherWidget, self).__init__(parent)
-        self.nam = None
         self.bg = None
+        # decoded backgrounds per condition and pre-scaled backgrounds per (condition, size, dpr), least recently
+        # used first, a size of 0 disables caching
+        self.backgroundCacheSize = 8
+        self.backgroundSources = collections.OrderedDict()
+        self.backgroundCache = collections.OrderedDict()
+        self.backgroundDecodes = 0
+        self.backgroundScales = 0
         self.widgetEnabled = None
         self.owmAPIKey = None
         self.owmCityID = None
         self.owmLanguage = None
         self.owmUnit = None
-        self.readConfig()
+        self.owmURL = None
+        self.owmCityIDs = []
+        self.owmRotation = None
+        # index of the shown city, with several cities each one is pre-rendered as a panel, see renderPanels()
+        self.location = 0
+        self.panels = {}
+        self.panel = None
+        self.panelRenders = 0
+        self.rotationTimer = QtCore.QTimer(self)
+        self.rotationTimer.timeout.connect(self.rotate)
+        self.panelTimer = QtCore.QTimer(self)
+        self.panelTimer.setSingleShot(True)
+        self.panelTimer.timeout.connect(self.renderPanels)
+        # SettingsStore of the main screen, see setConfig()
+        self.config = None
+        self.weatherData = WeatherData.instance()
+        self.weatherData.sigWeather.connect(self.handleWeather)
+        self.weatherData.sigError.connect(self.handleWeatherError)
 
         self.verticalLayout_3 = QtWidgets.QVBoxLayout(self)
         self.verticalLayout_3.setContentsMargins(2, 2, 2, 2)
@@ -73,7 +200,7 @@ class WeatherWidget(QtWidgets.QWidget):
         # self.verticalLayout.addItem(spacerItem)
 
         # city label
-        self.cityLabel = QtWidgets.QLabel(self)
+        self.cityLabel = ShadowLabel(self, 10)
         font = QtGui.QFont()
         font.setPointSize(22)
         font.setBold(True)
@@ -81,25 +208,15 @@ class WeatherWidget(QtWidgets.QWidget):
         self.cityLabel.setFont(font)
         self.cityLabel.setStyleSheet("color: #fff;")
         self.cityLabel.setAlignment(QtCore.Qt.AlignCenter)
-        cityfx = QtWidgets.QGraphicsDropShadowEffect()
-        cityfx.setBlurRadius(10)
-        cityfx.setColor(QtGui.QColor("#000"))
-        cityfx.setOffset(0, 0)
-        self.cityLabel.setGraphicsEffect(cityfx)
         self.verticalLayout.addWidget(self.cityLabel)
 
         # weather label
-        self.weatherLabel = QtWidgets.QLabel(self)
+        self.weatherLabel = ShadowLabel(self, 10)
         font = QtGui.QFont()
         font.setPointSize(14)
         self.weatherLabel.setFont(font)
         self.weatherLabel.setStyleSheet("color: #fff")
         self.weatherLabel.setAlignment(QtCore.Qt.AlignCenter)
-        weatherfx = QtWidgets.QGraphicsDropShadowEffect()
-        weatherfx.setBlurRadius(10)
-        weatherfx.setColor(QtGui.QColor("#000"))
-        weatherfx.setOffset(0, 0)
-        self.weatherLabel.setGraphicsEffect(weatherfx)
         self.verticalLayout.addWidget(self.weatherLabel)
 
         # spacer
@@ -111,67 +228,63 @@ class WeatherWidget(QtWidgets.QWidget):
         self.horizontalLayout.setSpacing(0)
 
         # weather icon
-        self.weatherIcon = QtWidgets.QLabel(self)
+        self.weatherIcon = ShadowLabel(self, 20)
         iconPixmap = QtGui.QPixmap()
         self.weatherIcon.setPixmap(iconPixmap)
         self.weatherIcon.setAlignment(QtCore.Qt.AlignCenter)
-        iconfx = QtWidgets.QGraphicsDropShadowEffect()
-        iconfx.setBlurRadius(20)
-        iconfx.setColor(QtGui.QColor("#000"))
-        iconfx.setOffset(0, 0)
-        self.weatherIcon.setGraphicsEffect(iconfx)
         self.horizontalLayout.addWidget(self.weatherIcon)
 
         self.verticalLayout_2 = QtWidgets.QVBoxLayout()
         self.verticalLayout_2.setSpacing(0)
 
         # temperature label
-        self.temperatureLabel = QtWidgets.QLabel(self)
+        self.temperatureLabel = ShadowLabel(self, 20)
         font = QtGui.QFont()
         font.setPointSize(45)
         font.setWeight(75)
         self.temperatureLabel.setFont(font)
         self.temperatureLabel.setStyleSheet("color: #fff;")
         self.temperatureLabel.setAlignment(QtCore.Qt.AlignCenter)
-        tempfx = QtWidgets.QGraphicsDropShadowEffect()
-        tempfx.setBlurRadius(20)
-        tempfx.setColor(QtGui.QColor("#000"))
-        tempfx.setOffset(0, 0)
-        self.temperatureLabel.setGraphicsEffect(tempfx)
         self.verticalLayout_2.addWidget(self.temperatureLabel)
 
         # condition label
-        self.conditionLabel = QtWidgets.QLabel(self)
+        self.conditionLabel = ShadowLabel(self, 10)
         font = QtGui.QFont()
         font.setPointSize(13)
         self.conditionLabel.setFont(font)
         self.conditionLabel.setStyleSheet("color: #fff")
         self.conditionLabel.setAlignment(QtCore.Qt.AlignCenter)
-        condfx = QtWidgets.QGraphicsDropShadowEffect()
-        condfx.setBlurRadius(10)
-        condfx.setColor(QtGui.QColor("#000"))
-        condfx.setOffset(0, 0)
-        self.conditionLabel.setGraphicsEffect(condfx)
         self.verticalLayout_2.addWidget(self.conditionLabel)
 
         self.horizontalLayout.addLayout(self.verticalLayout_2)
         self.verticalLayout_3.addLayout(self.horizontalLayout)
 
+        self.shadowLabels = [self.cityLabel, self.weatherLabel, self.weatherIcon, self.temperatureLabel,
+                             self.conditionLabel]
+
         # set demo text
         self.setData("", "", "")
-        self.updateWeather()
 
         # start timer for background update every 10 minutes
         self.updateTimer = QtCore.QTimer()
         self.updateTimer.timeout.connect(self.updateWeather)
         self.updateTimer.start(10 * 60 * 1000)
 
+    def setConfig(self, config):
+        # the widget is created by the generated UI, the config store is handed over afterwards
+        self.config = config
+        self.readConfig()
+        self.updateWeather()
+
     def updateWeather(self):
+        if self.config is None:
+            return
         print("update weather called")
         self.makeOWMApiCall()
 
     def setData(self, city, temperature, condition, icon="01d", background=None, label="WEATHER"):
         print("Weather:", icon, background)
+        self.panel = None
         self.cityLabel.setText(city)
         self.temperatureLabel.setText(temperature)
         self.conditionLabel.setText(condition)
@@ -185,55 +298,177 @@ class WeatherWidget(QtWidgets.QWidget):
         self.weatherIcon.setPixmap(icon_pixmap)
 
     def setWeatherBackground(self, background):
-        self.bg = ":/weather_backgrounds/images/weather_backgrounds/{}.jpg".format(background)
-        self.repaint()
+        bg = ":/weather_backgrounds/images/weather_backgrounds/{}.jpg".format(background)
+        if bg != self.bg:
+            self.bg = bg
+            self.update()
+
+    def cached(self, cache, key, create):
+        # small LRU cache, the least recently used entry is dropped first
+        value = cache.get(key)
+        if value is None:
+            value = create()
+            if self.backgroundCacheSize > 0:
+                cache[key] = value
+                while len(cache) > self.backgroundCacheSize:
+                    cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return value
+
+    def decodeBackground(self):
+        self.backgroundDecodes += 1
+        return QtGui.QPixmap(self.bg)
+
+    def scaleBackground(self, dpr):
+        self.backgroundScales += 1
+        source = self.cached(self.backgroundSources, self.bg, self.decodeBackground)
+        if source.isNull():
+            return source
+        pixmap = source.scaled(round(self.width() * dpr), round(self.height() * dpr), QtCore.Qt.IgnoreAspectRatio,
+                               QtCore.Qt.SmoothTransformation)
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+    def background(self):
+        # background of the current condition, scaled to the widget size
+        dpr = self.devicePixelRatioF()
+        return self.cached(self.backgroundCache, (self.bg, self.width(), self.height(), dpr),
+                           lambda: self.scaleBackground(dpr))
+
+    def invalidateBackground(self):
+        self.backgroundCache.clear()
+
+    def resizeEvent(self, event):
+        # backgrounds and panels rendered for the old size are of no use anymore
+        self.invalidateBackground()
+        self.panels.clear()
+        if self.panel is not None:
+            self.showLocation(self.location)
+            self.panelTimer.start()
+        super(WeatherWidget, self).resizeEvent(event)
+
+    def showEvent(self, event):
+        super(WeatherWidget, self).showEvent(event)
+        self.panelTimer.start()
+
+    def weatherKeys(self):
+        return [(city, self.owmUnit, self.owmLanguage) for city in self.owmCityIDs]
+
+    def weatherKey(self):
+        # key of the shown city
+        keys = self.weatherKeys()
+        return keys[self.location % len(keys)]
 
     def makeOWMApiCall(self):
-        print("OWM API Call")
-        url = "http://api.openweathermap.org/data/2.5/weather?id=" + self.owmCityID + "&units=" + self.owmUnit + "&lang=" + self.owmLanguage + "&appid=" + self.owmAPIKey
-        req = QtNetwork.QNetworkRequest(QtCore.QUrl(url))
-        self.nam = QtNetwork.QNetworkAccessManager()
-        self.nam.finished.connect(self.handleOWMResponse)
-        self.nam.get(req)
-
-    def handleOWMResponse(self, reply):
-        er = reply.error()
-        if er == QtNetwork.QNetworkReply.NoError:
-            bytes_string = reply.readAll()
-            replyString = str(bytes_string, 'utf-8')
-            weatherJson = (json.loads(replyString))
-            main_weather = weatherJson["weather"][0]["main"]
-            condition = weatherJson["weather"][0]["description"]
-            city = weatherJson["name"]
-            unit_symbol = self.owm_units_abbrev.get(self.owmUnit)
-            temp = "{:.0f}{}".format(weatherJson["main"]["temp"], unit_symbol)
-            icon = weatherJson["weather"][0]["icon"]
-            background = icon
-            if self.owmLanguage == "de":
-                label = "WETTER"
-            else:
-                label = "WEATHER"
-            self.setData(city=city, condition=condition, temperature=temp, icon=icon, background=background,
-                         label=label)
+        if not self.widgetEnabled:
+            # hidden, nothing to fetch or rotate
+            self.rotationTimer.stop()
+            return
+        keys = self.weatherKeys()
+        if self.location >= len(keys):
+            self.location = 0
+        self.panels = {key: panel for key, panel in self.panels.items() if key in keys}
+        # show the last good data at once, fresh data comes via handleWeather
+        self.showLocation(self.location)
+        if len(keys) > 1:
+            if not self.rotationTimer.isActive() or self.rotationTimer.interval() != self.owmRotation * 1000:
+                self.rotationTimer.start(self.owmRotation * 1000)
+            # all cities with one request
+            fetching = self.weatherData.fetch_group(keys, self.owmAPIKey, self.owmURL)
+        else:
+            self.rotationTimer.stop()
+            fetching = self.weatherData.fetch(keys[0], self.owmAPIKey, self.owmURL)
+        if fetching:
+            print("OWM API Call")
+
+    def showLocation(self, index):
+        self.location = index
+        key = self.weatherKey()
+        data = self.weatherData.cached(key)
+        if data is None:
+            return
+        panel = self.panels.get(key)
+        if panel is not None and panel[0] is data and panel[1] == self.size():
+            # pre-rendered, switching is a single blit
+            self.panel = panel[2]
+            self.update()
+        else:
+            self.showWeather(data)
+
+    def rotate(self):
+        # next city with data
+        keys = self.weatherKeys()
+        for step in range(1, len(keys) + 1):
+            index = (self.location + step) % len(keys)
+            if self.weatherData.cached(keys[index]) is not None:
+                self.showLocation(index)
+                return
+
+    def renderPanels(self):
+        # render every city with data once, the labels are left with the last rendered city
+        keys = self.weatherKeys()
+        if len(keys) < 2 or not self.isVisible():
+            return
+        for key in keys:
+            data = self.weatherData.cached(key)
+            panel = self.panels.get(key)
+            if data is None or panel is not None and panel[0] is data and panel[1] == self.size():
+                continue
+            self.showWeather(data)
+            self.layout().activate()
+            self.panels[key] = (data, self.size(), self.grab())
+            self.panelRenders += 1
+        self.showLocation(self.location)
+
+    def handleWeather(self, key, data):
+        if key == self.weatherKey():
+            self.showLocation(self.location)
+        if len(self.owmCityIDs) > 1 and key in self.weatherKeys():
+            # coalesce the cities of a group reply
+            self.panelTimer.start()
+
+    def handleWeatherError(self, key, error):
+        if key == self.weatherKey():
+            print(error)
+
+    def showWeather(self, weatherJson):
+        condition = weatherJson["weather"][0]["description"]
+        city = weatherJson["name"]
+        unit_symbol = self.owm_units_abbrev.get(self.owmUnit)
+        temp = "{:.0f}{}".format(weatherJson["main"]["temp"], unit_symbol)
+        icon = weatherJson["weather"][0]["icon"]
+        background = icon
+        if self.owmLanguage == "de":
+            label = "WETTER"
         else:
-            errorString = "Error occured: {}, {}".format(er, reply.errorString())
-            print(errorString)
+            label = "WEATHER"
+        self.setData(city=city, condition=condition, temperature=temp, icon=icon, background=background, label=label)
 
     def readConfig(self):
-        # settings
-        settings = QtCore.QSettings(QtCore.QSettings.UserScope, "astrastudio", "OnAirScreen")
-        settings.beginGroup("WeatherWidget")
-        self.widgetEnabled = settings.value('owmWidgetEnabled', False, type=bool)
-        self.owmAPIKey = settings.value('owmAPIKey', "")
-        self.owmCityID = settings.value('owmCityID', "2643743")
-        self.owmLanguage = self.owm_languages.get(settings.value('owmLanguage', "English"))
-        self.owmUnit = self.owm_units.get(settings.value('owmUnit', "Celsius"))
-        settings.endGroup()
+        # settings, read from the in-memory config of the main screen
+        config = self.config
+        self.widgetEnabled = config.value("WeatherWidget", "owmWidgetEnabled")
+        self.owmAPIKey = config.value("WeatherWidget", "owmAPIKey")
+        self.owmCityID = config.value("WeatherWidget", "owmCityID")
+        # several comma separated cities are shown in rotation
+        self.owmCityIDs = [city.strip() for city in self.owmCityID.split(",") if city.strip()] or [""]
+        self.owmRotation = max(1, config.value("WeatherWidget", "owmRotation"))
+        self.owmLanguage = self.owm_languages.get(config.value("WeatherWidget", "owmLanguage"))
+        self.owmUnit = self.owm_units.get(config.value("WeatherWidget", "owmUnit"))
+        self.owmURL = config.value("WeatherWidget", "owmURL") or OWM_URL
 
     def paintEvent(self, event):
         painter = QtGui.QPainter(self)
-        painter.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
-        painter.drawPixmap(0, 0, self.width(), self.height(), QtGui.QPixmap(self.bg))
+        if self.panel is not None:
+            painter.drawPixmap(0, 0, self.panel)
+            return
+        painter.drawPixmap(0, 0, self.background())
+        # the labels don't paint themselves, their cached shadowed images are painted here
+        for label in self.shadowLabels:
+            if label.isVisible() and label.shadowCached:
+                pixmap, margin = label.shadowed()
+                painter.drawPixmap(label.x() - margin, label.y() - margin, pixmap)
 
 
 import resources_rc